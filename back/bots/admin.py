@@ -1,14 +1,20 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
+from django.db.models import Avg, Count, Max, Q, Sum
 
 from .models import (
+    AgentRun,
+    AgentStep,
     AiModel,
     Bot,
     Chat,
+    ChatJob,
+    DailyUsage,
     Deck,
     Device,
     Flashcard,
+    IdempotencyKey,
     Message,
     Profile,
     RevenueCatWebhookEvent,
@@ -22,9 +28,19 @@ class UsageLimitHitAdmin(admin.ModelAdmin):
         return ['created_at', 'modified_at']
     
     def get_list_display(self, request):
-        return ['user_account', 'subscription_level', 'total_input_tokens', 'total_output_tokens'] + list(super().get_list_display(request))
+        return ['user_account', 'day', 'hit_count', 'subscription_level', 'total_input_tokens', 'total_output_tokens'] + list(super().get_list_display(request))
     
 
+class DailyUsageAdmin(admin.ModelAdmin):
+    list_filter = ['day', 'model_id']
+
+    def get_readonly_fields(self, request, obj=None):
+        return ['modified_at']
+
+    def get_list_display(self, request):
+        return ['user', 'day', 'model_id', 'input_tokens', 'output_tokens', 'cache_read_tokens', 'cache_write_tokens']
+
+
 class AiModelAdmin(admin.ModelAdmin):
     def get_readonly_fields(self, request, obj=None):
         return ['created_at', 'modified_at', 'model_id']
@@ -39,6 +55,69 @@ class ChatAdmin(admin.ModelAdmin):
     def get_list_display(self, request):
         return ['chat_id', 'created_at', 'modified_at'] + list(super().get_list_display(request))
 
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    def get_readonly_fields(self, request, obj=None):
+        return ['created_at', 'modified_at', 'request_hash', 'message']
+
+    def get_list_display(self, request):
+        return ['key', 'user', 'status', 'response_status', 'expires_at'] + list(super().get_list_display(request))
+
+class AgentStepInline(admin.TabularInline):
+    model = AgentStep
+    extra = 0
+    can_delete = False
+    fields = ['order', 'kind', 'name', 'started_ms', 'duration_ms', 'input_tokens', 'output_tokens', 'result_size', 'error']
+
+    def get_readonly_fields(self, request, obj=None):
+        return self.fields
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+class AgentRunAdmin(admin.ModelAdmin):
+    inlines = [AgentStepInline]
+    list_filter = ['model_id']
+
+    def get_readonly_fields(self, request, obj=None):
+        return ['run_id', 'chat', 'message', 'model_id', 'iterations', 'duration_ms',
+                'input_tokens', 'output_tokens', 'error', 'created_at']
+
+    def get_list_display(self, request):
+        return ['run_id', 'model_id', 'iterations', 'duration_ms', 'input_tokens', 'output_tokens', 'created_at'] + list(super().get_list_display(request))
+
+class AgentStepAdmin(admin.ModelAdmin):
+    """Step list with a per-model/per-tool summary (count, mean and max wall time, errors) of the filtered rows."""
+    change_list_template = 'admin/bots/agentstep/change_list.html'
+    list_filter = ['kind', 'name']
+
+    def get_readonly_fields(self, request, obj=None):
+        return [field.name for field in AgentStep._meta.fields]
+
+    def get_list_display(self, request):
+        return ['run', 'order', 'kind', 'name', 'duration_ms', 'result_size', 'error'] + list(super().get_list_display(request))
+
+    def changelist_view(self, request, extra_context=None):
+        response = super().changelist_view(request, extra_context)
+        try:
+            queryset = response.context_data['cl'].queryset
+        except (AttributeError, KeyError):
+            return response  # redirects and errors have no change list
+        response.context_data['summary'] = queryset.order_by().values('kind', 'name').annotate(
+            calls=Count('id'),
+            avg_ms=Avg('duration_ms'),
+            max_ms=Max('duration_ms'),
+            total_ms=Sum('duration_ms'),
+            errors=Count('id', filter=~Q(error='')),
+        ).order_by('-total_ms')
+        return response
+
+class ChatJobAdmin(admin.ModelAdmin):
+    def get_readonly_fields(self, request, obj=None):
+        return ['created_at', 'modified_at', 'job_id', 'locked_at']
+
+    def get_list_display(self, request):
+        return ['job_id', 'chat', 'status', 'attempts', 'created_at', 'modified_at'] + list(super().get_list_display(request))
+
 class MessageAdmin(admin.ModelAdmin):
     def get_readonly_fields(self, request, obj=None):
         return ['created_at', 'modified_at', 'message_id']
@@ -98,13 +177,18 @@ class UserAdmin(BaseUserAdmin):
     ordering = ['-date_joined']
 
 admin.site.register(Chat, ChatAdmin)
+admin.site.register(ChatJob, ChatJobAdmin)
+admin.site.register(AgentRun, AgentRunAdmin)
+admin.site.register(AgentStep, AgentStepAdmin)
 admin.site.register(Message, MessageAdmin)
 admin.site.register(Profile, ProfileAdmin)
 admin.site.register(Bot, BotAdmin)
 admin.site.register(Device, DeviceAdmin)
 admin.site.register(UserAccount, UserAccountAdmin)
 admin.site.register(AiModel, AiModelAdmin)
+admin.site.register(IdempotencyKey, IdempotencyKeyAdmin)
 admin.site.register(UsageLimitHit, UsageLimitHitAdmin)
+admin.site.register(DailyUsage, DailyUsageAdmin)
 admin.site.register(RevenueCatWebhookEvent, RevenueCatWebhookEventAdmin)
 admin.site.register(Deck, DeckAdmin)
 admin.site.register(Flashcard, FlashcardAdmin)
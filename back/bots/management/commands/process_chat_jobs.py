@@ -0,0 +1,57 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from bots.models import ChatJob
+
+
+class Command(BaseCommand):
+    help = 'Process queued assistant replies (see the Prefer: respond-async mode of /api/chats/<chat_id>)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=settings.CHAT_JOB_CONCURRENCY,
+                            help='Number of jobs to process at the same time')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once the queue is empty instead of polling for new jobs')
+
+    def handle(self, *args, **options):
+        self.stop = threading.Event()
+        self.once = options['once']
+        self.poll_interval = options['poll_interval']
+        concurrency = max(options['concurrency'], 1)
+
+        if concurrency == 1:
+            self.work()
+            return
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            workers = [pool.submit(self.work_in_thread) for _ in range(concurrency)]
+            try:
+                for worker in workers:
+                    worker.result()
+            except KeyboardInterrupt:
+                self.stdout.write('Stopping after the jobs in progress finish...')
+                self.stop.set()
+
+    def work_in_thread(self):
+        try:
+            self.work()
+        finally:
+            connection.close()
+
+    def work(self):
+        while not self.stop.is_set():
+            job = ChatJob.claim_next()
+            if job is None:
+                if self.once:
+                    return
+                time.sleep(self.poll_interval)
+                continue
+            job.run()
+            self.stdout.write(f'Job {job.job_id} {job.status}')
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:01
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_next_message_order(apps, schema_editor):
+    Chat = apps.get_model('bots', 'Chat')
+    Message = apps.get_model('bots', 'Message')
+    last_order = Message.objects.filter(chat=OuterRef('pk')).order_by('-order').values('order')[:1]
+    Chat.objects.update(next_message_order=Coalesce(Subquery(last_order) + 1, 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bots', '0039_chatjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chat',
+            name='next_message_order',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_next_message_order, migrations.RunPython.noop),
+    ]
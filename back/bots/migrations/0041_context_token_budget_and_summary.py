@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bots', '0040_chat_next_message_order'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aimodel',
+            name='context_token_budget',
+            field=models.PositiveIntegerField(default=8000),
+        ),
+        migrations.AddField(
+            model_name='chat',
+            name='summary',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='chat',
+            name='summary_message_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
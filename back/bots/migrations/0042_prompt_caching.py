@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:09
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bots', '0041_context_token_budget_and_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aimodel',
+            name='cache_read_token_cost',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(0.0)]),
+        ),
+        migrations.AddField(
+            model_name='aimodel',
+            name='cache_write_token_cost',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(0.0)]),
+        ),
+        migrations.AddField(
+            model_name='aimodel',
+            name='supports_prompt_caching',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='chat',
+            name='cache_read_tokens',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='chat',
+            name='cache_write_tokens',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='cache_read_tokens',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='cache_write_tokens',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:22
+
+import uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bots', '0043_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgentRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('run_id', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('model_id', models.CharField(blank=True, max_length=255)),
+                ('iterations', models.IntegerField(default=0)),
+                ('duration_ms', models.IntegerField(default=0)),
+                ('input_tokens', models.IntegerField(default=0)),
+                ('output_tokens', models.IntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('chat', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='agent_runs', to='bots.chat')),
+                ('message', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='agent_runs', to='bots.message')),
+            ],
+            options={
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AgentStep',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order', models.IntegerField(default=0)),
+                ('kind', models.CharField(choices=[('model', 'Model'), ('tool', 'Tool')], max_length=10)),
+                ('name', models.CharField(max_length=255)),
+                ('started_ms', models.IntegerField(default=0)),
+                ('duration_ms', models.IntegerField(default=0)),
+                ('input_tokens', models.IntegerField(default=0)),
+                ('output_tokens', models.IntegerField(default=0)),
+                ('result_size', models.IntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='steps', to='bots.agentrun')),
+            ],
+            options={
+                'ordering': ['run', 'order'],
+                'indexes': [models.Index(fields=['kind', 'name'], name='bots_agents_kind_d4a4c4_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bots', '0044_agentrun_agentstep'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='usage_breakdown',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
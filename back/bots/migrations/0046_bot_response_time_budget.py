@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bots', '0045_message_usage_breakdown'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bot',
+            name='response_time_budget',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
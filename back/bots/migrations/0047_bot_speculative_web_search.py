@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bots', '0046_bot_response_time_budget'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bot',
+            name='speculative_web_search',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:55
+
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+
+def local_day(hit):
+    try:
+        user_timezone = ZoneInfo(hit.user_account.timezone)
+    except (ZoneInfoNotFoundError, ValueError):
+        user_timezone = ZoneInfo('UTC')
+    return hit.created_at.astimezone(user_timezone).date()
+
+
+def collapse_hits_per_day(apps, schema_editor):
+    """Fold each user-day's hits into its first row: a count, the last hit time and the latest totals."""
+    UsageLimitHit = apps.get_model('bots', 'UsageLimitHit')
+    kept = {}
+    duplicates = []
+    hits = UsageLimitHit.objects.select_related('user_account').order_by('created_at', 'id')
+    for hit in hits.iterator(chunk_size=BATCH_SIZE):
+        day = local_day(hit)
+        first = kept.get((hit.user_account_id, day))
+        if first is None:
+            hit.day = day
+            kept[(hit.user_account_id, day)] = hit
+            continue
+        first.hit_count += 1
+        first.modified_at = hit.modified_at
+        first.subscription_level = hit.subscription_level
+        first.total_input_tokens = hit.total_input_tokens
+        first.total_output_tokens = hit.total_output_tokens
+        duplicates.append(hit.pk)
+
+    UsageLimitHit.objects.bulk_update(
+        kept.values(),
+        ['day', 'hit_count', 'modified_at', 'subscription_level', 'total_input_tokens', 'total_output_tokens'],
+        batch_size=BATCH_SIZE,
+    )
+    for start in range(0, len(duplicates), BATCH_SIZE):
+        UsageLimitHit.objects.filter(pk__in=duplicates[start:start + BATCH_SIZE]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bots', '0048_dailyusage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usagelimithit',
+            name='day',
+            field=models.DateField(null=True),
+        ),
+        migrations.AddField(
+            model_name='usagelimithit',
+            name='hit_count',
+            field=models.IntegerField(default=1),
+        ),
+        migrations.RunPython(collapse_hits_per_day, migrations.RunPython.noop),
+    ]
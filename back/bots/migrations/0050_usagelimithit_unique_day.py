@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bots', '0049_usagelimithit_day_hit_count'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='usagelimithit',
+            name='day',
+            field=models.DateField(),
+        ),
+        migrations.AddConstraint(
+            model_name='usagelimithit',
+            constraint=models.UniqueConstraint(fields=('user_account', 'day'), name='unique_usage_limit_hit_per_day'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_user_and_ai_model(apps, schema_editor):
+    """Copy each message's chat owner, and give old replies their bot's model (or the default model)."""
+    AiModel = apps.get_model('bots', 'AiModel')
+    Chat = apps.get_model('bots', 'Chat')
+    Message = apps.get_model('bots', 'Message')
+    chat = Chat.objects.filter(pk=OuterRef('chat_id'))
+    Message.objects.update(user=Subquery(chat.values('user')[:1]))
+
+    bot_model = Subquery(chat.values('bot__ai_model')[:1])
+    default = AiModel.objects.filter(is_default=True).first()
+    Message.objects.filter(role='assistant').update(
+        ai_model=Coalesce(bot_model, Value(default.pk)) if default else bot_model
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bots', '0050_usagelimithit_unique_day'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='ai_model',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='messages', to='bots.aimodel'),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='user',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='messages', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['user', 'created_at'], name='bots_messag_user_id_77701b_idx'),
+        ),
+        migrations.RunPython(backfill_user_and_ai_model, migrations.RunPython.noop),
+    ]
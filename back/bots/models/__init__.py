@@ -1,21 +1,31 @@
+from .agent_run import AgentRun
+from .agent_step import AgentStep
 from .ai_model import AiModel
 from .bot import Bot
 from .chat import Chat
+from .chat_job import ChatJob
+from .daily_usage import DailyUsage
 from .deck import Deck
 from .device import Device
 from .flashcard import Flashcard
+from .idempotency_key import IdempotencyKey
 from .message import Message
 from .profile import Profile
 from .usage_limit_hit import UsageLimitHit
 from .user_account import RevenueCatWebhookEvent, UserAccount
 
 __all__ = [
+    'AgentRun',
+    'AgentStep',
     'AiModel',
     'Bot',
     'Chat',
+    'ChatJob',
+    'DailyUsage',
     'Deck',
     'Device',
     'Flashcard',
+    'IdempotencyKey',
     'Message',
     'Profile',
     'RevenueCatWebhookEvent',
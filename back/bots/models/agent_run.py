@@ -0,0 +1,49 @@
+import uuid
+
+from django.db import models, transaction
+
+from .chat import Chat
+from .message import Message
+
+
+class AgentRun(models.Model):
+    """One assistant reply produced by ChatAgentService, with its model calls and tool calls as steps."""
+
+    run_id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    chat = models.ForeignKey(Chat, related_name='agent_runs', on_delete=models.CASCADE)
+    message = models.ForeignKey(Message, related_name='agent_runs', on_delete=models.SET_NULL, null=True, blank=True)
+    model_id = models.CharField(max_length=255, blank=True)
+    iterations = models.IntegerField(default=0)
+    duration_ms = models.IntegerField(default=0)
+    input_tokens = models.IntegerField(default=0)
+    output_tokens = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-id']
+
+    def __str__(self):
+        return f'{self.run_id} - {self.model_id}'
+
+    @classmethod
+    def record(cls, chat, model_id, trace):
+        """Write a finished trace (see ``bots.services.agent_trace``) as a run and its steps."""
+        from .agent_step import AgentStep
+
+        steps = sorted(trace.steps, key=lambda step: step['started_ms'])
+        model_steps = [step for step in steps if step['kind'] == AgentStep.MODEL]
+        with transaction.atomic():
+            run = cls.objects.create(
+                chat=chat,
+                model_id=model_id,
+                iterations=len(model_steps),
+                duration_ms=trace.elapsed_ms(),
+                input_tokens=sum(step.get('input_tokens', 0) for step in model_steps),
+                output_tokens=sum(step.get('output_tokens', 0) for step in model_steps),
+                error=trace.error,
+            )
+            AgentStep.objects.bulk_create([
+                AgentStep(run=run, order=order, **step) for order, step in enumerate(steps)
+            ])
+        return run
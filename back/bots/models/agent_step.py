@@ -0,0 +1,32 @@
+from django.db import models
+
+from .agent_run import AgentRun
+
+
+class AgentStep(models.Model):
+    MODEL = 'model'
+    TOOL = 'tool'
+    KIND_CHOICES = [
+        (MODEL, 'Model'),
+        (TOOL, 'Tool'),
+    ]
+
+    run = models.ForeignKey(AgentRun, related_name='steps', on_delete=models.CASCADE)
+    order = models.IntegerField(default=0)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    name = models.CharField(max_length=255)
+    started_ms = models.IntegerField(default=0)
+    duration_ms = models.IntegerField(default=0)
+    input_tokens = models.IntegerField(default=0)
+    output_tokens = models.IntegerField(default=0)
+    result_size = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['run', 'order']
+        indexes = [
+            models.Index(fields=['kind', 'name'])
+        ]
+
+    def __str__(self):
+        return f'{self.kind} {self.name} ({self.duration_ms} ms)'
@@ -1,6 +1,8 @@
 from django.core.validators import MinValueValidator
 from django.db import models
 
+DEFAULT_CONTEXT_TOKEN_BUDGET = 8000
+
 
 class AiModel(models.Model):
     model_id = models.CharField(max_length=255, unique=True, db_index=True)
@@ -13,14 +15,41 @@ class AiModel(models.Model):
         default=1.0,
         validators=[MinValueValidator(0.0)]
     )
+    cache_read_token_cost = models.FloatField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(0.0)]
+    )
+    cache_write_token_cost = models.FloatField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(0.0)]
+    )
+    supports_prompt_caching = models.BooleanField(default=False)
     is_default = models.BooleanField(default=False)
     supported_input_modalities = models.JSONField(default=list)
+    context_token_budget = models.PositiveIntegerField(default=DEFAULT_CONTEXT_TOKEN_BUDGET)
 
     created_at = models.DateTimeField(auto_now_add=True)
     modified_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
+
+    def cost(self, input_tokens, output_tokens, cache_read_tokens=0, cache_write_tokens=0):
+        """Price a token count; ``input_tokens`` includes cache reads and writes, as usage is recorded.
+
+        Cache tokens fall back to the regular input price when no cache price is set.
+        """
+        cache_read_cost = self.input_token_cost if self.cache_read_token_cost is None else self.cache_read_token_cost
+        cache_write_cost = self.input_token_cost if self.cache_write_token_cost is None else self.cache_write_token_cost
+        uncached_tokens = input_tokens - cache_read_tokens - cache_write_tokens
+        return (
+            uncached_tokens * self.input_token_cost
+            + cache_read_tokens * cache_read_cost
+            + cache_write_tokens * cache_write_cost
+            + output_tokens * self.output_token_cost
+        )
     class Meta:
         ordering = ['name']
         constraints = [
@@ -26,6 +26,9 @@ class Bot(models.Model):
     restrict_language = models.BooleanField(default=True)
     restrict_adult_topics = models.BooleanField(default=True)
     enable_web_search = models.BooleanField(default=False)
+    # Start a web search on question-like messages while the model is still deciding whether to search
+    speculative_web_search = models.BooleanField(default=False)
+    response_time_budget = models.PositiveIntegerField(null=True, blank=True)
     color = models.CharField(max_length=7, null=True, blank=True)
     icon = models.CharField(max_length=255, null=True, blank=True)
 
@@ -1,17 +1,28 @@
+import asyncio
 import base64
 import logging
 import uuid
 
 import boto3
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.db import models
-from langchain_aws import ChatBedrock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import F
+from langchain_aws import ChatBedrockConverse
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 
-from bots.services.chat_agent import ChatAgentService
+from bots.services.ai_clients import client_registry
+from bots.services.ai_model_catalog import aget_catalog, get_catalog
+from bots.services.background import run_in_background
+from bots.services.chat_agent import ChatAgentService, with_cached_input
+from bots.services.context_cache import ConversationContext, context_cache
+from bots.services.deadline import Deadline
 
-from .ai_model import AiModel
+from .ai_model import DEFAULT_CONTEXT_TOKEN_BUDGET
 from .bot import Bot
+from .daily_usage import DailyUsage
 from .profile import Profile
 
 logger = logging.getLogger(__name__)
@@ -19,16 +30,46 @@ logger = logging.getLogger(__name__)
 S3_CLIENT = boto3.client('s3')
 S3_BUCKET = settings.AWS_STORAGE_BUCKET_NAME
 
+# Upper bound on rows loaded per turn; the window itself is trimmed to the model's token budget
+MAX_CONTEXT_MESSAGES = 50
+MAX_SUMMARY_FOLD_MESSAGES = 20
+# Seconds a summary update holds its chat's lock at most, in case its thread dies
+SUMMARY_LOCK_TIMEOUT = 120
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation. Update the current summary with the new messages. "
+    "Keep names, facts, decisions and open questions. Reply with the updated summary only, in 200 words or less."
+)
+
+LIMIT_EXCEEDED_MESSAGE = "You have exceeded your daily limit. Please try again tomorrow or upgrade your subscription."
+
 class AiClientWrapper:
     def __init__(self, model_id, client=None):
         self.model_id = model_id
+        self.shared = client is None
+        self.prompt_caching = False
         if client:
             self.client = client
         else:
-            self.client = ChatBedrock(model_id=model_id)
+            self.client = client_registry.get_client(model_id)
+
+    def invoke(self, message_list, **kwargs):
+        return self.client.invoke(message_list, **kwargs)
+
+    async def ainvoke(self, message_list, **kwargs):
+        return await self.client.ainvoke(message_list, **kwargs)
 
-    def invoke(self, message_list):
-        return self.client.invoke(message_list)
+    def stream(self, message_list, **kwargs):
+        return self.client.stream(message_list, **kwargs)
+
+    def bind_tools(self, tools):
+        if self.shared:
+            return client_registry.get_bound_client(self.model_id, tools)
+        return self.client.bind_tools(tools)
+
+    @property
+    def uses_converse_api(self):
+        return isinstance(self.client, ChatBedrockConverse) or getattr(self.client, 'beta_use_converse_api', False) is True
 
 class Chat(models.Model):
     user = models.ForeignKey(
@@ -42,65 +83,200 @@ class Chat(models.Model):
     title = models.CharField(max_length=100, blank=True)
     input_tokens = models.IntegerField(default=0)
     output_tokens = models.IntegerField(default=0)
+    cache_read_tokens = models.IntegerField(default=0)
+    cache_write_tokens = models.IntegerField(default=0)
+    next_message_order = models.IntegerField(default=0)
+    summary = models.TextField(blank=True, default='')
+    summary_message_id = models.BigIntegerField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     modified_at = models.DateTimeField(auto_now=True)
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.ai = None
+        self.window_start_id = None
 
     def __str__(self):
         return self.title if self.user is None else self.user.email + ' - ' + self.title
 
-    def use_default_model(self, ai=None):
-        try:
-            default_model = AiModel.objects.get(is_default=True)
-        except AiModel.DoesNotExist:
+    def use_default_model(self, ai=None, catalog=None):
+        default_model = (catalog or get_catalog()).default
+        if default_model is None:
             raise ValueError("No default AI model configured in the system")
         
         self.ai = AiClientWrapper(model_id=default_model.model_id, client=ai)
 
-    def get_response(self, ai=None):
-        if self.bot and self.bot.ai_model:
-            self.ai = AiClientWrapper(model_id=self.bot.ai_model.model_id, client=ai)
+    def select_model(self, catalog, ai=None, contains_image=False):
+        bot_model = catalog.get_by_pk(self.bot.ai_model_id) if self.bot else None
+        if bot_model is None or (contains_image and 'image' not in bot_model.supported_input_modalities):
+            self.use_default_model(ai, catalog)
         else:
-            self.use_default_model(ai)
-        
-        message_list, contains_image = self.get_input()
+            self.ai = AiClientWrapper(model_id=bot_model.model_id, client=ai)
+
+    def time_budget(self, requested=None):
+        """Seconds allowed for a reply: the bot's budget, else AGENT_TIME_BUDGET.
+
+        A budget requested by the client can shorten this but never extend it.
+        """
+        budget = (self.bot.response_time_budget if self.bot else None) or settings.AGENT_TIME_BUDGET or None
+        if requested and (budget is None or requested < budget):
+            return requested
+        return budget
+
+    def get_response(self, ai=None, time_budget=None, reply_to=None):
+        """Answer the chat's latest message, or ``reply_to`` while ignoring any message sent after it."""
+        deadline = Deadline(self.time_budget(time_budget))
+        message_list = self.prepare_input(ai, until_id=reply_to.id if reply_to else None)
 
-        if contains_image and self.bot and self.bot.ai_model and 'image' not in self.bot.ai_model.supported_input_modalities:
-            self.use_default_model(ai)
-        
         if self.user.user_account.over_limit():
-            return "You have exceeded your daily limit. Please try again tomorrow or upgrade your subscription."
-        
-        response_text, usage_metadata = ChatAgentService(self, self.ai.client).respond(message_list)
-        
-        message_order = self.messages.count()
-        
+            return LIMIT_EXCEEDED_MESSAGE
+
+        agent = ChatAgentService(self, self.ai, deadline)
+        response_text, usage_metadata = agent.respond(message_list)
+        self.save_response(response_text, usage_metadata, agent.run)
+        self.schedule_summary_update()
+        return response_text
+
+    async def aget_response(self, ai=None, time_budget=None):
+        await self.aload_related()
+        deadline = Deadline(self.time_budget(time_budget))
+        message_list = await self.aprepare_input(ai)
+
+        if await sync_to_async(self.user.user_account.over_limit)():
+            return LIMIT_EXCEEDED_MESSAGE
+
+        agent = ChatAgentService(self, self.ai, deadline)
+        response_text, usage_metadata = await agent.arespond(message_list)
+        await sync_to_async(self.save_response)(response_text, usage_metadata, agent.run)
+        await sync_to_async(self.schedule_summary_update)()
+        return response_text
+
+    def stream_response(self, ai=None, time_budget=None):
+        deadline = Deadline(self.time_budget(time_budget))
+        message_list = self.prepare_input(ai)
+
+        if self.user.user_account.over_limit():
+            yield "token", {"text": LIMIT_EXCEEDED_MESSAGE}
+            yield "done", {"response": LIMIT_EXCEEDED_MESSAGE, "chat_id": str(self.chat_id)}
+            return
+
+        agent = ChatAgentService(self, self.ai, deadline)
+        response_text, usage_metadata = yield from agent.stream(message_list)
+        message = self.save_response(response_text, usage_metadata, agent.run)
+        self.schedule_summary_update()
+        yield "done", {
+            "response": response_text,
+            "chat_id": str(self.chat_id),
+            "message_id": str(message.message_id),
+            "input_tokens": message.input_tokens,
+            "output_tokens": message.output_tokens,
+        }
+
+    def prepare_input(self, ai=None, until_id=None):
+        catalog = get_catalog()
+        message_list, contains_image = self.get_input(self.context_token_budget(catalog), until_id)
+        self.select_model(catalog, ai, contains_image)
+        return self.mark_cache_points(message_list, catalog)
+
+    async def aload_related(self):
+        """Fetch the relations used while responding, since async code cannot lazy-load them."""
+        if self.bot_id:
+            self.bot = await Bot.objects.aget(pk=self.bot_id)
+        if self.user_id:
+            self.user = await User.objects.select_related('user_account').aget(pk=self.user_id)
+
+    async def aprepare_input(self, ai=None):
+        catalog = await aget_catalog()
+        message_list, contains_image = await self.aget_input(self.context_token_budget(catalog))
+        self.select_model(catalog, ai, contains_image)
+        return self.mark_cache_points(message_list, catalog)
+
+    def mark_cache_points(self, message_list, catalog):
+        """Mark the bot's prompt as a cacheable prefix when the selected model supports prompt caching.
+
+        The rolling summary changes on most turns of a long chat, so it follows the cache point
+        in its own block instead of being part of the cached prefix. The agent marks the end of
+        the history itself (see ``ChatAgentService``).
+        """
+        ai_model = catalog.get(self.ai.model_id)
+        if not (ai_model and ai_model.supports_prompt_caching):
+            return message_list
+
+        self.ai.prompt_caching = True
+        prompt, *rest = self.system_message_parts()
+        text_block = {"type": "text", "text": prompt}
+        if self.ai.uses_converse_api:
+            content = [text_block, {"cachePoint": {"type": "default"}}]
+        else:
+            content = [{**text_block, "cache_control": {"type": "ephemeral"}}]
+        content += [{"type": "text", "text": part} for part in rest]
+        # Cached history messages are shared between turns, so replace rather than modify
+        return [SystemMessage(content=content), *message_list[1:]]
+
+    def save_response(self, response_text, usage_metadata, agent_run=None):
         input_tokens = usage_metadata.get('input_tokens', 0)
         output_tokens = usage_metadata.get('output_tokens', 0)
-        
-        self.messages.create(
-            text=response_text, 
-            role='assistant', 
-            order=message_order,
-            input_tokens=input_tokens,
-            output_tokens=output_tokens
-        )
-        self.input_tokens += input_tokens
-        self.output_tokens += output_tokens
-        self.save()
-        return response_text
+        token_details = usage_metadata.get('input_token_details') or {}
+        cache_read_tokens = token_details.get('cache_read', 0)
+        cache_write_tokens = token_details.get('cache_creation', 0)
+
+        ai_model = get_catalog().get(self.ai.model_id)
+
+        with transaction.atomic():
+            message = self.add_message(
+                text=response_text,
+                role='assistant',
+                ai_model_id=ai_model.pk if ai_model else None,
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                cache_read_tokens=cache_read_tokens,
+                cache_write_tokens=cache_write_tokens,
+                usage_breakdown=usage_metadata.get('iterations', [])
+            )
+            self.input_tokens = F('input_tokens') + input_tokens
+            self.output_tokens = F('output_tokens') + output_tokens
+            self.cache_read_tokens = F('cache_read_tokens') + cache_read_tokens
+            self.cache_write_tokens = F('cache_write_tokens') + cache_write_tokens
+            self.save(update_fields=[
+                'input_tokens', 'output_tokens', 'cache_read_tokens', 'cache_write_tokens', 'modified_at'
+            ])
+            self.record_usage(
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                cache_read_tokens=cache_read_tokens,
+                cache_write_tokens=cache_write_tokens,
+            )
+            if agent_run is not None:
+                agent_run.message = message
+                agent_run.save(update_fields=['message'])
+        self.refresh_from_db(fields=['input_tokens', 'output_tokens', 'cache_read_tokens', 'cache_write_tokens'])
+        return message
+
+    def record_usage(self, **tokens):
+        """Add tokens to the user's daily ledger and take their cost off the cached remaining budget."""
+        if self.user is None:
+            return
+        DailyUsage.record(self.user, self.ai.model_id, **tokens)
+        self.user.user_account.charge(self.ai.model_id, **tokens)
+
+    def add_message(self, **fields):
+        """Create a message at the next order position, claimed with an atomic counter increment."""
+        with transaction.atomic():
+            Chat.objects.filter(pk=self.pk).update(next_message_order=F('next_message_order') + 1)
+            self.refresh_from_db(fields=['next_message_order'])
+            return self.messages.create(order=self.next_message_order - 1, user=self.user, **fields)
 
-    def setup_human_message_content(self, message):
+    async def aadd_message(self, **fields):
+        return await sync_to_async(self.add_message)(**fields)
+
+    def setup_human_message_content(self, message, images):
         if self.has_image(message):
             return [
                 {"type": "text", "text": message.text},
                 {
                     "type": "image_url",
                     "image_url": {
-                        "url": f"data:image/jpeg;base64,{self.get_image_data(message.image_filename)}"
+                        "url": f"data:image/jpeg;base64,{images[message.image_filename]}"
                     }
                 }
             ]
@@ -109,28 +285,162 @@ class Chat(models.Model):
     def has_image(self, message: HumanMessage):
         return hasattr(message, 'image_filename') and message.image_filename
 
-    def get_input(self):
+    def recent_messages(self, after_id=None, until_id=None):
+        messages = self.messages.exclude(role='system')
+        if after_id is not None:
+            messages = messages.filter(id__gt=after_id)
+        if until_id is not None:
+            messages = messages.filter(id__lte=until_id)
+        return messages.order_by('-id')[:MAX_CONTEXT_MESSAGES]
+
+    def context_token_budget(self, catalog=None):
+        catalog = catalog or get_catalog()
+        ai_model = (catalog.get_by_pk(self.bot.ai_model_id) if self.bot else None) or catalog.default
+        return ai_model.context_token_budget if ai_model else DEFAULT_CONTEXT_TOKEN_BUDGET
+
+    def get_input(self, token_budget=None, until_id=None):
+        token_budget = token_budget or self.context_token_budget()
+        context = self.cached_context(token_budget, until_id)
+        messages = sorted(self.recent_messages(context.last_message_id, until_id), key=lambda message: message.id)
+        window = context.fit(messages, token_budget)
+        images = {filename: self.get_image_data(filename) for filename in self.missing_images(window, context)}
+        return self.build_input(self.extend_context(context, window, images, token_budget))
+
+    async def aget_input(self, token_budget=None):
+        token_budget = token_budget or self.context_token_budget(await aget_catalog())
+        context = self.cached_context(token_budget)
+        messages = sorted(
+            [message async for message in self.recent_messages(context.last_message_id)],
+            key=lambda message: message.id,
+        )
+        window = context.fit(messages, token_budget)
+        filenames = self.missing_images(window, context)
+        get_image_data = sync_to_async(self.get_image_data, thread_sensitive=False)
+        image_data = await asyncio.gather(*(get_image_data(filename) for filename in filenames))
+        return self.build_input(self.extend_context(context, window, dict(zip(filenames, image_data)), token_budget))
+
+    def cached_context(self, token_budget, until_id=None):
+        context = context_cache.get(self.chat_id)
+        if context is None or context.token_budget != token_budget:
+            return ConversationContext()
+        if until_id is not None and context.last_message_id is not None and context.last_message_id > until_id:
+            # The cached window already holds messages sent after the one being answered
+            return ConversationContext()
+        return context
+
+    def missing_images(self, messages, context):
+        return list({
+            message.image_filename for message in messages
+            if self.has_image(message) and message.image_filename not in context.images
+        })
+
+    def extend_context(self, context, window, images, token_budget):
+        """Cache the new window, converting only messages that were not already in the cached one."""
+        images = {**context.images, **images}
+        context = context.extend(
+            window, images, token_budget, lambda message: self.to_langchain_message(message, images)
+        )
+        context_cache.put(self.chat_id, context)
+        return context
+
+    def to_langchain_message(self, message, images):
+        if message.role == "user":
+            return HumanMessage(content=self.setup_human_message_content(message, images))
+        if message.role == "assistant":
+            return AIMessage(content=message.text)
+        return None
+
+    def build_input(self, context):
         contains_image = False
-        messages = self.messages.exclude(role='system').order_by('-id')[:10]
-        messages = sorted(messages, key=lambda message: message.id)
         message_list = []
+        self.window_start_id = None
 
-        for message in messages:
+        for message, langchain_message in context.window:
             if self.has_image(message):
                 contains_image = True
-            if message.role == "user":
-                human_message_content = self.setup_human_message_content(message)
-                message_list.append(HumanMessage(content=human_message_content))
-            elif message.role == "assistant":
-                if len(message_list) > 0: # need to start with a user message
-                    message_list.append(AIMessage(content=message.text))
+            if langchain_message is None:
+                continue
+            if isinstance(langchain_message, AIMessage) and not message_list:
+                continue  # need to start with a user message
+            if self.window_start_id is None:
+                self.window_start_id = message.id
+            message_list.append(langchain_message)
 
         system_message = SystemMessage(content=self.get_system_message())
         message_list.insert(0, system_message)
 
         return message_list, contains_image
-    
+
+    def summary_overflow(self):
+        """Messages that have left the context window since the summary was last updated."""
+        if self.window_start_id is None:
+            return []
+        messages = self.messages.exclude(role='system').filter(id__lt=self.window_start_id)
+        if self.summary_message_id is not None:
+            messages = messages.filter(id__gt=self.summary_message_id)
+        # Chats that predate summaries only fold their most recent overflow, not their whole history
+        return sorted(messages.order_by('-id')[:MAX_SUMMARY_FOLD_MESSAGES], key=lambda message: message.id)
+
+    def schedule_summary_update(self):
+        """Update the summary on a background thread, so its model call does not delay the reply."""
+        if self.window_start_id is not None:
+            run_in_background(Chat.update_summary_for, self.pk, self.window_start_id, self.ai)
+
+    @classmethod
+    def update_summary_for(cls, pk, window_start_id, ai):
+        """Fold a turn's overflow into a fresh copy of the chat, skipping it while another fold is running.
+
+        A skipped fold is not lost: the next turn folds everything after ``summary_message_id``.
+        """
+        lock_key = f'summary_update:{pk}'
+        if not cache.add(lock_key, True, SUMMARY_LOCK_TIMEOUT):
+            return
+        try:
+            chat = cls.objects.select_related('user__user_account').get(pk=pk)
+            chat.window_start_id = window_start_id
+            chat.ai = ai
+            chat.update_summary()
+        finally:
+            cache.delete(lock_key)
+
+    def update_summary(self):
+        """Fold messages that fell out of this turn's window into the chat's rolling summary."""
+        overflow = self.summary_overflow()
+        if not overflow:
+            return
+
+        transcript = "\n".join(f"{message.role}: {message.text}" for message in overflow)
+        prompt = f"Current summary:\n{self.summary or '(none)'}\n\nNew messages:\n{transcript}"
+        try:
+            response = self.ai.invoke([SystemMessage(content=SUMMARY_PROMPT), HumanMessage(content=prompt)])
+        except Exception:
+            logger.exception("Failed to update summary for chat %s", self.chat_id)
+            return
+
+        usage = with_cached_input(response.usage_metadata or {}, self.ai.uses_converse_api)
+        self.summary = response.content if isinstance(response.content, str) else \
+            "".join(block.get("text", "") for block in response.content if isinstance(block, dict))
+        self.summary_message_id = overflow[-1].id
+        self.input_tokens = F('input_tokens') + usage.get('input_tokens', 0)
+        self.output_tokens = F('output_tokens') + usage.get('output_tokens', 0)
+        with transaction.atomic():
+            self.save(update_fields=['summary', 'summary_message_id', 'input_tokens', 'output_tokens'])
+            self.record_usage(
+                input_tokens=usage.get('input_tokens', 0),
+                output_tokens=usage.get('output_tokens', 0),
+            )
+        self.refresh_from_db(fields=['input_tokens', 'output_tokens'])
+
     def get_system_message(self):
+        return "\n\n".join(self.system_message_parts())
+
+    def system_message_parts(self):
+        parts = [self.default_system_prompt()]
+        if self.summary:
+            parts.append(f"Summary of the earlier conversation:\n{self.summary}")
+        return parts
+
+    def default_system_prompt(self):
         if self.bot and self.bot.system_prompt:
             return self.bot.system_prompt
         return "You are chatting with a teen. Please keep the conversation appropriate and respectful. Your responses should be 200 words or less."
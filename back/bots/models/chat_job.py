@@ -0,0 +1,113 @@
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+
+from .chat import Chat
+from .message import Message
+
+
+class ChatJob(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    job_id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    chat = models.ForeignKey(Chat, related_name='jobs', on_delete=models.CASCADE)
+    message = models.ForeignKey(Message, related_name='jobs', on_delete=models.CASCADE)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    response = models.TextField(blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.IntegerField(default=0)
+    locked_at = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    modified_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'id'])
+        ]
+
+    def __str__(self):
+        return f'{self.job_id} - {self.status}'
+
+    @property
+    def finished(self):
+        return self.status in (self.DONE, self.FAILED)
+
+    @classmethod
+    def enqueue(cls, chat, message):
+        return cls.objects.create(chat=chat, message=message)
+
+    @classmethod
+    def claim_next(cls):
+        """Atomically mark the oldest runnable job as running, returning it (or None if the queue is empty).
+
+        Jobs whose worker died are picked up again once their lock is older than
+        CHAT_JOB_LOCK_TIMEOUT, until they have used CHAT_JOB_MAX_ATTEMPTS; then they fail.
+        A chat never has two jobs running at once: the claim locks the chat's row, then
+        re-checks for a running job in the update itself.
+        """
+        stale = timezone.now() - timedelta(seconds=settings.CHAT_JOB_LOCK_TIMEOUT)
+        abandoned = Q(status=cls.RUNNING, locked_at__lt=stale)
+        cls.objects.filter(abandoned, attempts__gte=settings.CHAT_JOB_MAX_ATTEMPTS).update(
+            status=cls.FAILED,
+            error='The worker stopped responding on every attempt',
+            locked_at=None,
+            modified_at=timezone.now(),
+        )
+        busy = cls.objects.filter(chat=OuterRef('chat'), status=cls.RUNNING, locked_at__gte=stale)
+        runnable = cls.objects.filter(
+            Q(status=cls.QUEUED) | (abandoned & Q(attempts__lt=settings.CHAT_JOB_MAX_ATTEMPTS))
+        ).filter(~Exists(busy)).order_by('id')
+
+        for candidate in runnable.values('id', 'chat_id', 'status', 'locked_at')[:5]:
+            with transaction.atomic():
+                cls._lock_chat(candidate['chat_id'])
+                claimed = cls.objects.filter(**candidate).filter(~Exists(busy)).update(
+                    status=cls.RUNNING,
+                    locked_at=timezone.now(),
+                    attempts=F('attempts') + 1,
+                    modified_at=timezone.now(),
+                )
+            if claimed:
+                return cls.objects.select_related('chat', 'message').get(pk=candidate['id'])
+        return None
+
+    @staticmethod
+    def _lock_chat(chat_id):
+        """Wait for other workers' claims on this chat to commit, so the claiming update sees them."""
+        list(Chat.objects.select_for_update().filter(pk=chat_id).values_list('pk'))
+
+    def run(self):
+        try:
+            self.response = self.chat.get_response(reply_to=self.message)
+            self.status = self.DONE
+            self.error = ''
+        except Exception as e:
+            self.error = str(e)
+            self.status = self.FAILED if self.attempts >= settings.CHAT_JOB_MAX_ATTEMPTS else self.QUEUED
+        self.locked_at = None
+        self.save(update_fields=['response', 'status', 'error', 'locked_at', 'modified_at'])
+        return self
+
+    def wait(self, timeout, poll_interval=0.5):
+        """Poll until the job finishes or ``timeout`` seconds pass (used for long-polling)."""
+        deadline = time.monotonic() + timeout
+        while not self.finished and time.monotonic() < deadline:
+            time.sleep(min(poll_interval, max(deadline - time.monotonic(), 0)))
+            self.refresh_from_db(fields=['status', 'response', 'error', 'modified_at'])
+        return self
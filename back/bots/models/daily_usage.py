@@ -0,0 +1,56 @@
+import pytz
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import models
+from django.db.models import F
+from django.utils import timezone
+
+TOKEN_FIELDS = ('input_tokens', 'output_tokens', 'cache_read_tokens', 'cache_write_tokens')
+
+
+def local_date(timezone_name):
+    return timezone.now().astimezone(pytz.timezone(timezone_name)).date()
+
+
+class DailyUsage(models.Model):
+    """Tokens a user spent on one model during one day of their own timezone.
+
+    Kept up to date as replies are saved, so limit checks read a few rows
+    instead of aggregating over chats.
+    """
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='daily_usage', on_delete=models.CASCADE)
+    day = models.DateField()
+    model_id = models.CharField(max_length=255)
+    input_tokens = models.BigIntegerField(default=0)
+    output_tokens = models.BigIntegerField(default=0)
+    cache_read_tokens = models.BigIntegerField(default=0)
+    cache_write_tokens = models.BigIntegerField(default=0)
+    modified_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'day', 'model_id'], name='unique_daily_usage')
+        ]
+
+    def __str__(self):
+        return f'{self.user} - {self.day} - {self.model_id}'
+
+    @property
+    def tokens(self):
+        return {field: getattr(self, field) for field in TOKEN_FIELDS}
+
+    @classmethod
+    def record(cls, user, model_id, **tokens):
+        """Add tokens to the user's row for today, creating it on the first reply of the day."""
+        if user is None or not any(tokens.values()):
+            return
+        try:
+            timezone_name = user.user_account.timezone
+        except ObjectDoesNotExist:
+            timezone_name = 'UTC'
+        usage, _ = cls.objects.get_or_create(user=user, day=local_date(timezone_name), model_id=model_id)
+        cls.objects.filter(pk=usage.pk).update(
+            modified_at=timezone.now(),
+            **{field: F(field) + count for field, count in tokens.items()},
+        )
@@ -1,6 +1,7 @@
 import uuid
 
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Max
 
 
 class Deck(models.Model):
@@ -16,5 +17,44 @@ class Deck(models.Model):
     def card_count(self):
         return self.flashcards.count()
 
+    @classmethod
+    def for_chat(cls, chat, name):
+        """The chat profile's deck called ``name``, created (linked to the chat) if it does not exist."""
+        deck = cls.objects.filter(profile=chat.profile, name=name).first()
+        if deck is None:
+            deck = cls.objects.create(profile=chat.profile, chat=chat, name=name, description="")
+        return deck
+
+    @classmethod
+    def create_with_cards(cls, cards, **fields):
+        """Create a deck and its cards in one transaction, validating every card before writing anything."""
+        cards = cls.validate_cards(cards)
+        with transaction.atomic():
+            deck = cls.objects.create(**fields)
+            deck.add_cards(cards, start_order=0)
+        return deck
+
+    @staticmethod
+    def validate_cards(cards):
+        if not isinstance(cards, list):
+            raise ValueError("Flashcards must be a list")
+        for position, card in enumerate(cards, start=1):
+            if not isinstance(card, dict) or not str(card.get('front') or '').strip() or not str(card.get('back') or '').strip():
+                raise ValueError(f"Flashcard {position} needs a front and a back")
+        return cards
+
+    def add_cards(self, cards, start_order=None):
+        """Append ``cards`` (dicts with ``front`` and ``back``) after the deck's last card with one insert."""
+        from .flashcard import Flashcard
+
+        cards = self.validate_cards(cards)
+        if start_order is None:
+            max_order = self.flashcards.aggregate(Max('order'))['order__max']
+            start_order = 0 if max_order is None else max_order + 1
+        return Flashcard.objects.bulk_create([
+            Flashcard(deck=self, front=card['front'], back=card['back'], order=start_order + i)
+            for i, card in enumerate(cards)
+        ])
+
     def __str__(self):
         return self.name
\ No newline at end of file
@@ -0,0 +1,127 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
+
+from .message import Message
+
+
+class IdempotencyKey(models.Model):
+    """The outcome of a request sent with an ``Idempotency-Key`` header, replayed to retries of it."""
+
+    IN_PROGRESS = 'in_progress'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (IN_PROGRESS, 'In progress'),
+        (COMPLETED, 'Completed'),
+        (FAILED, 'Failed'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='idempotency_keys', on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=IN_PROGRESS)
+    response_status = models.IntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    response_headers = models.JSONField(default=dict, blank=True)
+    # The user message the request stored, reused by a retry after a failure instead of adding it again
+    message = models.ForeignKey(Message, related_name='+', on_delete=models.SET_NULL, null=True, blank=True)
+    expires_at = models.DateTimeField()
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    modified_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key_per_user')
+        ]
+        indexes = [
+            models.Index(fields=['expires_at'])
+        ]
+
+    def __str__(self):
+        return f'{self.key} - {self.status}'
+
+    @property
+    def finished(self):
+        return self.status == self.COMPLETED
+
+    @property
+    def failed(self):
+        return self.status == self.FAILED
+
+    @property
+    def abandoned(self):
+        """An in-progress key whose request has run far longer than any response takes (e.g. the worker died)."""
+        stale = timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT)
+        return not self.finished and self.modified_at < stale
+
+    @classmethod
+    def begin(cls, user, key, request_hash):
+        """Claim ``key`` for a new request, returning ``(record, created)``.
+
+        When the key is already taken, the existing record is returned so the
+        caller can replay or wait on it. Expired keys are replaced. Failed and
+        abandoned keys of the same request are claimed again, keeping the user
+        message the earlier attempt stored.
+        """
+        cls.objects.filter(user=user, expires_at__lte=timezone.now()).delete()
+        for _attempt in range(2):
+            existing = cls.objects.filter(user=user, key=key).select_related('message__chat').first()
+            if existing and existing.request_hash == request_hash and (existing.failed or existing.abandoned):
+                if existing.retry():
+                    return existing, True
+                continue  # another retry claimed it first
+            if existing:
+                return existing, False
+            try:
+                with transaction.atomic():
+                    return cls.objects.create(
+                        user=user,
+                        key=key,
+                        request_hash=request_hash,
+                        expires_at=timezone.now() + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+                    ), True
+            except IntegrityError:
+                continue  # another request claimed the key first; return its record
+        return cls.objects.get(user=user, key=key), False
+
+    def complete(self, response_status, response_body, response_headers=None):
+        self.status = self.COMPLETED
+        self.response_status = response_status
+        self.response_body = response_body
+        self.response_headers = response_headers or {}
+        self.save(update_fields=['status', 'response_status', 'response_body', 'response_headers', 'modified_at'])
+
+    def retry(self):
+        """Claim a failed or abandoned key for a new attempt; False if another request claimed it first."""
+        claimed = IdempotencyKey.objects.filter(
+            pk=self.pk, status=self.status, modified_at=self.modified_at
+        ).update(status=self.IN_PROGRESS, modified_at=timezone.now())
+        if claimed:
+            self.refresh_from_db(fields=['status', 'modified_at'])
+        return bool(claimed)
+
+    def attach(self, message):
+        self.message = message
+        self.save(update_fields=['message', 'modified_at'])
+
+    def fail(self):
+        """Mark the request failed so a retry runs it again, reusing the stored user message."""
+        self.status = self.FAILED
+        self.save(update_fields=['status', 'modified_at'])
+
+    def wait(self, timeout, poll_interval=0.5):
+        """Poll until the original request finishes or fails, or ``timeout`` seconds pass."""
+        deadline = time.monotonic() + timeout
+        while not (self.finished or self.failed) and time.monotonic() < deadline:
+            time.sleep(min(poll_interval, max(deadline - time.monotonic(), 0)))
+            try:
+                self.refresh_from_db()
+            except IdempotencyKey.DoesNotExist:
+                return None
+        return self
@@ -1,22 +1,37 @@
 import uuid
 
+from django.conf import settings
 from django.db import models
 
+from .ai_model import AiModel
 from .chat import Chat
 
 
 class Message(models.Model):
     chat = models.ForeignKey(Chat, related_name='messages', on_delete=models.CASCADE)
+    # The chat's owner, copied here so usage queries can use the (user, created_at) index
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='messages', on_delete=models.CASCADE, null=True)
+    # The model that wrote an assistant reply
+    ai_model = models.ForeignKey(AiModel, related_name='messages', on_delete=models.SET_NULL, null=True, blank=True)
     message_id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     text = models.TextField()
     role = models.CharField(max_length=50, default='user')
     order = models.IntegerField(default=0)
     input_tokens = models.IntegerField(default=0)
     output_tokens = models.IntegerField(default=0)
+    cache_read_tokens = models.IntegerField(default=0)
+    cache_write_tokens = models.IntegerField(default=0)
+    # Per model call token counts of an assistant reply (see ChatAgentService._turn_usage)
+    usage_breakdown = models.JSONField(default=list, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     modified_at = models.DateTimeField(auto_now=True)
     image_filename = models.CharField(max_length=255, blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at']),
+        ]
+
     def __str__(self):
         user_str = getattr(self.chat.user, 'email', 'unknown')
         profile_str = getattr(self.chat.profile, 'name', 'unknown')
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import F
+from django.utils import timezone
 
 from .user_account import UserAccount
 
@@ -8,11 +10,40 @@ class UsageLimitHit(models.Model):
                                      on_delete=models.CASCADE,
                                      related_name='usage_limit_hits')
 
+    # One row per user-day in the user's timezone: created_at is the first blocked
+    # request of the day, modified_at the latest, hit_count how many there were
+    day = models.DateField()
+    hit_count = models.IntegerField(default=1)
     created_at = models.DateTimeField(auto_now_add=True)
     modified_at = models.DateTimeField(auto_now=True)
     subscription_level = models.IntegerField(default=0)
     total_input_tokens = models.IntegerField(default=0)
     total_output_tokens = models.IntegerField(default=0)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user_account', 'day'], name='unique_usage_limit_hit_per_day')
+        ]
+
     def __str__(self):
-        return self.user_account.user.email + ' - ' + str(self.created_at)
\ No newline at end of file
+        return self.user_account.user.email + ' - ' + str(self.created_at)
+
+    @classmethod
+    def record(cls, user_account, day, total_input_tokens, total_output_tokens):
+        """Record the first blocked request of the day, or count another one if a concurrent request got there first."""
+        hit, created = cls.objects.get_or_create(user_account=user_account, day=day, defaults={
+            'subscription_level': user_account.subscription_level,
+            'total_input_tokens': total_input_tokens,
+            'total_output_tokens': total_output_tokens,
+        })
+        if not created:
+            cls.record_repeat(user_account, day)
+
+    @classmethod
+    def record_repeat(cls, user_account, day):
+        """Count another blocked request on a day that already has a hit; False if it has none yet."""
+        return cls.objects.filter(user_account=user_account, day=day).update(
+            hit_count=F('hit_count') + 1,
+            subscription_level=user_account.subscription_level,
+            modified_at=timezone.now(),
+        ) > 0
@@ -1,12 +1,17 @@
-from datetime import datetime, time
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
 
-import pytz
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.db import models
-from django.utils import timezone
+from django.db.models import F, FloatField, Sum, Value
+from django.db.models.functions import Coalesce, TruncDay, TruncWeek
 
-from .ai_model import AiModel
-from .chat import Chat
+from bots.services.ai_model_catalog import get_catalog
+
+from .daily_usage import local_date
+from .message import Message
 
 MAX_COST_DAILY = {
     0: 0.01 / 31,
@@ -14,6 +19,9 @@ MAX_COST_DAILY = {
     2: 5.0 / 31,
 }
 
+# The cached remaining budget is an integer so the cache can decrement it atomically
+NANO_DOLLARS = 1_000_000_000
+
 class UserAccount(models.Model):
     user = models.OneToOneField(User, 
                                 on_delete=models.CASCADE,
@@ -27,53 +35,125 @@ class UserAccount(models.Model):
 
     def over_limit(self):
         from .usage_limit_hit import UsageLimitHit
+        if self.remaining_budget() > 0:
+            return False
+        today = self.today()
+        # Already blocked today: count the request without pricing the day again
+        if UsageLimitHit.record_repeat(self, today):
+            return True
         total, total_input_tokens, total_output_tokens = self.cost_for_today()
         if total >= MAX_COST_DAILY[self.subscription_level]:
-            UsageLimitHit.objects.create(user_account=self,
-                                         subscription_level=self.subscription_level,
-                                         total_input_tokens=total_input_tokens,
-                                         total_output_tokens=total_output_tokens)
+            UsageLimitHit.record(self, today, total_input_tokens, total_output_tokens)
             return True
         return False
 
     def cost_for_today(self):
-        supported_models = AiModel.objects.all()
+        catalog = get_catalog()
         total = 0.0
         total_input_tokens = 0
         total_output_tokens = 0
-        for model in supported_models:
-            input_tokens = self.input_tokens_today(model.model_id)
-            output_tokens = self.output_tokens_today(model.model_id)
-            total += input_tokens * model.input_token_cost + output_tokens * model.output_token_cost
-            total_input_tokens += input_tokens
-            total_output_tokens += output_tokens
-            
-            if model.is_default:
-                # Add costs for chats with no specified bot (using the default model)
-                input_tokens = self.input_tokens_today(None)
-                output_tokens = self.output_tokens_today(None)
-                total += input_tokens * model.input_token_cost + output_tokens * model.output_token_cost
-                total_input_tokens += input_tokens
-                total_output_tokens += output_tokens
+        for usage in self.user.daily_usage.filter(day=self.today()):
+            # Usage of a model that has since been removed is priced as the default model
+            model = catalog.get(usage.model_id) or catalog.default
+            total += model.cost(**usage.tokens)
+            total_input_tokens += usage.input_tokens
+            total_output_tokens += usage.output_tokens
 
         return total, total_input_tokens, total_output_tokens
-    
-    def input_tokens_today(self, model_id):
-        chats = self.chats_today(model_id)
-        return chats.aggregate(models.Sum('input_tokens'))['input_tokens__sum'] or 0
-    
-    def output_tokens_today(self, model_id):
-        chats = self.chats_today(model_id)
-        return chats.aggregate(models.Sum('output_tokens'))['output_tokens__sum'] or 0
-        
-    def chats_today(self, model_id):
-        user_timezone = pytz.timezone(self.timezone)
-        today = timezone.now().astimezone(user_timezone).date()
-        start_of_day = user_timezone.localize(datetime.combine(today, time.min))
-        start_of_day_utc = start_of_day.astimezone(pytz.UTC)
-        return Chat.objects.filter(user=self.user,
-                                    bot__ai_model__model_id=model_id,
-                                    modified_at__gte=start_of_day_utc)
+
+    def today(self):
+        return local_date(self.timezone)
+
+    def remaining_budget_key(self):
+        return f'remaining_budget:{self.user_id}:{self.today()}'
+
+    def remaining_budget(self):
+        """Nano-dollars left to spend today, seeded from the usage ledger on a cache miss."""
+        key = self.remaining_budget_key()
+        remaining = cache.get(key)
+        if remaining is None:
+            total, _, _ = self.cost_for_today()
+            remaining = round((MAX_COST_DAILY[self.subscription_level] - total) * NANO_DOLLARS)
+            if not cache.add(key, remaining, timeout=settings.USAGE_BUDGET_CACHE_TTL):
+                remaining = cache.get(key, remaining)
+        return remaining
+
+    def charge(self, model_id, **tokens):
+        """Take a reply's cost off the cached remaining budget.
+
+        Without a cached entry there is nothing to do: the next check seeds one
+        from the ledger, which already includes this reply.
+        """
+        catalog = get_catalog()
+        model = catalog.get(model_id) or catalog.default
+        if model is None:
+            return
+        try:
+            cache.decr(self.remaining_budget_key(), round(model.cost(**tokens) * NANO_DOLLARS))
+        except ValueError:
+            pass
+
+    def invalidate_remaining_budget(self):
+        cache.delete(self.remaining_budget_key())
+
+    def usage_report(self, start, end, granularity='day', group_by='model'):
+        """Tokens and cost of the user's replies per period and group, from ``start`` to ``end`` inclusive.
+
+        Dates and periods are in the user's timezone. Everything is aggregated in
+        the database; replies are priced at the model that wrote them, or the
+        default model when that is unknown.
+        """
+        user_timezone = ZoneInfo(self.timezone)
+        default = get_catalog().default
+        model = 'ai_model__'
+
+        def price(field, *fallbacks):
+            # As in AiModel.cost, a missing cache price falls back to the input price
+            default_price = getattr(default, field, None)
+            if default_price is None:
+                default_price = getattr(default, 'input_token_cost', 0.0)
+            return Coalesce(F(model + field), *fallbacks, Value(default_price), output_field=FloatField())
+
+        model_input_price = F(model + 'input_token_cost')
+
+        groups = {
+            'profile': (F('chat__profile__profile_id'), F('chat__profile__name')),
+            'bot': (F('chat__bot__bot_id'), F('chat__bot__name')),
+            'model': (Coalesce(F(model + 'model_id'), Value(getattr(default, 'model_id', None))),
+                      Coalesce(F(model + 'name'), Value(getattr(default, 'name', None)))),
+        }
+        group_id, group_name = groups[group_by]
+        trunc = TruncWeek if granularity == 'week' else TruncDay
+
+        return (
+            Message.objects
+            .filter(
+                user=self.user,
+                role='assistant',
+                created_at__gte=datetime.combine(start, time.min, user_timezone),
+                created_at__lt=datetime.combine(end + timedelta(days=1), time.min, user_timezone),
+            )
+            .annotate(
+                period=trunc('created_at', tzinfo=user_timezone, output_field=models.DateField()),
+                group_id=group_id,
+                group_name=group_name,
+            )
+            .values('period', 'group_id', 'group_name')
+            .annotate(
+                total_input_tokens=Sum('input_tokens'),
+                total_output_tokens=Sum('output_tokens'),
+                total_cache_read_tokens=Sum('cache_read_tokens'),
+                total_cache_write_tokens=Sum('cache_write_tokens'),
+                cost=Sum(
+                    (F('input_tokens') - F('cache_read_tokens') - F('cache_write_tokens')) * price('input_token_cost')
+                    + F('cache_read_tokens') * price('cache_read_token_cost', model_input_price)
+                    + F('cache_write_tokens') * price('cache_write_token_cost', model_input_price)
+                    + F('output_tokens') * price('output_token_cost'),
+                    output_field=FloatField(),
+                ),
+            )
+            .order_by('period', F('group_name').asc(nulls_first=True), 'group_id')
+        )
 
 class RevenueCatWebhookEvent(models.Model):
     raw_event = models.JSONField()
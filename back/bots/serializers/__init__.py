@@ -1,5 +1,6 @@
 from .ai_model_serializer import AiModelSerializer
 from .bot_serializer import BotSerializer
+from .chat_job_serializer import ChatJobSerializer
 from .chat_serializer import ChatListSerializer, ChatSerializer
 from .device_serializer import DeviceSerializer
 from .flashcard_serializer import (
@@ -13,6 +14,7 @@ from .profile_serializer import ProfileIdSerializer, ProfileSerializer
 __all__ = [
     'AiModelSerializer',
     'BotSerializer',
+    'ChatJobSerializer',
     'ChatListSerializer',
     'ChatSerializer',
     'DeckListSerializer',
@@ -1,10 +1,30 @@
+from django.utils.encoding import smart_str
 from rest_framework import serializers
 
 from bots.models import AiModel, Bot
+from bots.services.ai_model_catalog import get_catalog
+
+
+class AiModelField(serializers.SlugRelatedField):
+    """Reads and writes ``ai_model`` by model_id using the cached AiModel catalog."""
+
+    def to_internal_value(self, data):
+        try:
+            ai_model = get_catalog().get(data)
+        except TypeError:
+            self.fail('invalid')
+        if ai_model is None:
+            self.fail('does_not_exist', slug_name=self.slug_field, value=smart_str(data))
+        return ai_model
+
+    def get_attribute(self, instance):
+        if instance.ai_model_id is None:
+            return None
+        return get_catalog().get_by_pk(instance.ai_model_id) or super().get_attribute(instance)
 
 
 class BotSerializer(serializers.HyperlinkedModelSerializer):
-    ai_model = serializers.SlugRelatedField(
+    ai_model = AiModelField(
         queryset=AiModel.objects.all(),
         slug_field='model_id',
     )
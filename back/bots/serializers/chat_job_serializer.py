@@ -0,0 +1,21 @@
+from rest_framework import serializers
+
+from bots.models import ChatJob
+
+
+class ChatJobSerializer(serializers.ModelSerializer):
+    chat_id = serializers.UUIDField(source='chat.chat_id', read_only=True)
+    message_id = serializers.UUIDField(source='message.message_id', read_only=True)
+
+    class Meta:
+        model = ChatJob
+        fields = [
+            'job_id',
+            'chat_id',
+            'message_id',
+            'status',
+            'response',
+            'error',
+            'created_at',
+            'modified_at',
+        ]
@@ -0,0 +1,49 @@
+import time
+from contextlib import contextmanager
+
+
+class AgentTrace:
+    """Collects timings for one agent turn in memory; ``AgentRun.record`` writes them out in bulk.
+
+    Steps may be recorded from tool threads, so each is appended as a whole
+    when it finishes. ``started_ms`` is relative to the start of the turn.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.steps = []
+        self.error = ''
+
+    def elapsed_ms(self, since=None):
+        return int((time.perf_counter() - (since or self.started)) * 1000)
+
+    def model_step(self, model_id):
+        return self.step('model', model_id)
+
+    def tool_step(self, tool_name):
+        return self.step('tool', tool_name)
+
+    @contextmanager
+    def step(self, kind, name):
+        started = time.perf_counter()
+        step = {'kind': kind, 'name': str(name), 'started_ms': self.elapsed_ms()}
+        try:
+            yield step
+        except Exception as e:
+            step['error'] = str(e)
+            raise
+        finally:
+            step['duration_ms'] = self.elapsed_ms(started)
+            self.steps.append(step)
+
+    @staticmethod
+    def record_model_usage(step, usage):
+        step['input_tokens'] = usage.get('input_tokens', 0)
+        step['output_tokens'] = usage.get('output_tokens', 0)
+
+    @staticmethod
+    def record_tool_result(step, result):
+        step['result_size'] = len(result or '')
+        # Tools report their own failures as "Error ..." results rather than raising
+        if isinstance(result, str) and result.startswith('Error'):
+            step['error'] = result
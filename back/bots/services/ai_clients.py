@@ -0,0 +1,67 @@
+import logging
+import threading
+
+from django.conf import settings
+from langchain_aws import ChatBedrock
+
+logger = logging.getLogger(__name__)
+
+
+def build_client(model_id):
+    if settings.AI_BACKEND == 'fake':
+        from bots.services.fake_chat_model import FakeChatModel
+        return FakeChatModel.from_settings(model_id)
+    return ChatBedrock(model_id=model_id)
+
+
+class AiClientRegistry:
+    """Process-wide cache of chat model clients, one per model id.
+
+    Building a ChatBedrock client sets up a boto3 session, resolves credentials
+    and opens a fresh connection pool, so clients (and their ``bind_tools``
+    results) are kept for the life of the process and shared between threads.
+    """
+
+    def __init__(self, factory=None):
+        self.factory = factory or build_client
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._bound_clients = {}
+
+    def get_client(self, model_id):
+        client = self._clients.get(model_id)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(model_id)
+                if client is None:
+                    logger.info(f"Creating chat client for {model_id}")
+                    client = self._clients[model_id] = self.factory(model_id)
+        return client
+
+    def get_bound_client(self, model_id, tools):
+        key = (model_id, self.tool_signature(tools))
+        bound_client = self._bound_clients.get(key)
+        if bound_client is None:
+            bound_client = self.get_client(model_id).bind_tools(tools)
+            with self._lock:
+                bound_client = self._bound_clients.setdefault(key, bound_client)
+        return bound_client
+
+    def evict(self, model_id):
+        with self._lock:
+            self._clients.pop(model_id, None)
+            for key in [key for key in self._bound_clients if key[0] == model_id]:
+                del self._bound_clients[key]
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+            self._bound_clients.clear()
+
+    @staticmethod
+    def tool_signature(tools):
+        # Tools are rebuilt for every chat, but a given name always has the same schema.
+        return tuple(sorted(tool.name for tool in tools))
+
+
+client_registry = AiClientRegistry()
@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from bots.models.ai_model import AiModel
+
+CACHE_KEY = 'ai_model_catalog'
+
+
+class AiModelCatalog:
+    """Snapshot of the AiModel table: the default model, lookups and the price table.
+
+    The table changes rarely but is read on every chat turn, so the snapshot is
+    kept in the cache framework and dropped by the AiModel save/delete signals.
+    """
+
+    def __init__(self, ai_models):
+        self.ai_models = list(ai_models)
+        self.default = next((ai_model for ai_model in self.ai_models if ai_model.is_default), None)
+        self._by_model_id = {ai_model.model_id: ai_model for ai_model in self.ai_models}
+        self._by_pk = {ai_model.pk: ai_model for ai_model in self.ai_models}
+
+    def get(self, model_id):
+        return self._by_model_id.get(model_id)
+
+    def get_by_pk(self, pk):
+        return self._by_pk.get(pk)
+
+
+def get_catalog():
+    catalog = cache.get(CACHE_KEY)
+    if catalog is None:
+        catalog = AiModelCatalog(AiModel.objects.all())
+        cache.set(CACHE_KEY, catalog, timeout=settings.AI_MODEL_CATALOG_TTL)
+    return catalog
+
+
+async def aget_catalog():
+    catalog = await cache.aget(CACHE_KEY)
+    if catalog is None:
+        catalog = AiModelCatalog([ai_model async for ai_model in AiModel.objects.all()])
+        await cache.aset(CACHE_KEY, catalog, timeout=settings.AI_MODEL_CATALOG_TTL)
+    return catalog
+
+
+def invalidate_catalog():
+    cache.delete(CACHE_KEY)
@@ -0,0 +1,27 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+_background_executor = ThreadPoolExecutor(
+    max_workers=settings.BACKGROUND_TASK_CONCURRENCY, thread_name_prefix='background'
+)
+
+
+def run_in_background(fn, *args, **kwargs):
+    """Run ``fn`` on a shared thread pool once the caller has moved on, e.g. after a reply is sent.
+
+    Each task gets its own database connection, closed when it finishes. Errors are logged, not raised.
+    """
+    def run():
+        try:
+            fn(*args, **kwargs)
+        except Exception:
+            logger.exception("Background task %s failed", getattr(fn, '__qualname__', fn))
+        finally:
+            connection.close()
+
+    return _background_executor.submit(run)
@@ -1,26 +1,182 @@
+import asyncio
+import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.db import transaction
-from langchain_core.messages import AIMessage, ToolMessage
-from langchain_core.tools import tool
-from tavily import TavilyClient
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, ToolMessage
+from langchain_core.messages.ai import add_usage
+from langchain_core.tools import StructuredTool, tool
 
 from bots.models.deck import Deck
-from bots.models.flashcard import Flashcard
+from bots.services.agent_trace import AgentTrace
+from bots.services.deadline import Deadline
+from bots.services.search_cache import web_search_cache
+from bots.services.search_client import search_clients
+from bots.services.speculative_search import SpeculativeSearch, looks_like_search
 
 logger = logging.getLogger(__name__)
 
+TOOL_PROGRESS = {
+    "web_search": "Searching the web",
+    "create_flashcard_deck": "Creating deck",
+    "create_flashcard": "Adding flashcard",
+    "add_flashcards": "Adding flashcards",
+}
+
+# Tools that only make network calls, so calls from one model turn can overlap.
+# The flashcard tools write to the database and run one after another in the request thread.
+CONCURRENT_TOOLS = {"web_search"}
+
+_tool_executor = ThreadPoolExecutor(max_workers=settings.AGENT_TOOL_CONCURRENCY, thread_name_prefix='agent-tool')
+
+
+FINAL_ANSWER_PROMPT = (
+    "You are out of time for tools. Answer now using what you already have, "
+    "and say briefly if anything could not be looked up."
+)
+
+
+def with_cached_input(usage, uses_converse_api):
+    """Usage whose ``input_tokens`` includes cache reads and writes, as the Converse API reports it.
+
+    The invoke API (Anthropic models on ChatBedrock) reports only the uncached input tokens.
+    """
+    if not usage or uses_converse_api:
+        return usage
+    token_details = usage.get("input_token_details") or {}
+    input_tokens = usage.get("input_tokens", 0) + token_details.get("cache_read", 0) \
+        + token_details.get("cache_creation", 0)
+    return {**usage, "input_tokens": input_tokens, "total_tokens": input_tokens + usage.get("output_tokens", 0)}
+
 
 class ChatAgentService:
-    def __init__(self, chat, ai_client):
+    def __init__(self, chat, ai_client, deadline=None):
         self.chat = chat
         self.ai_client = ai_client
+        self.deadline = deadline or Deadline()
+        # Let Bedrock place cache points on the end of the history (and tools, where supported)
+        # so tool-call iterations and the next turn re-read the prefix instead of re-processing it.
+        self.model_kwargs = {"cache_control": {"type": "ephemeral"}} \
+            if getattr(ai_client, 'prompt_caching', False) is True else {}
+        self.model_id = str(getattr(ai_client, 'model_id', ''))
+        self.uses_converse_api = getattr(ai_client, 'uses_converse_api', False) is True
+        self.trace = AgentTrace()
+        self.run = None
+        self.speculation = None
 
     def respond(self, message_list):
+        model_with_tools, tools = self._bind_tools(message_list)
+        turn_start = len(message_list)
+        self._speculate(message_list, tools)
+
+        try:
+            messages = self._run_agent_loop(model_with_tools, message_list, tools)
+        except Exception as e:
+            self.trace.error = str(e)
+            raise
+        finally:
+            self._end_speculation()
+            self._record_run()
+
+        logger.info("🤖 AGENT_LOOP_COMPLETE: extracting final response")
+
+        return self._extract_response(messages, turn_start)
+
+    async def arespond(self, message_list):
+        model_with_tools, tools = self._bind_tools(message_list)
+        turn_start = len(message_list)
+        self._aspeculate(message_list, tools)
+
+        try:
+            messages = await self._arun_agent_loop(model_with_tools, message_list, tools)
+        except Exception as e:
+            self.trace.error = str(e)
+            raise
+        finally:
+            self._end_speculation()
+            await sync_to_async(self._record_run)()
+
+        logger.info("🤖 AGENT_LOOP_COMPLETE: extracting final response")
+
+        return self._extract_response(messages, turn_start)
+
+    def stream(self, message_list):
+        """Run the agent loop, yielding ``(event, data)`` pairs as tokens and tool calls arrive.
+
+        A ``reset`` event means the tokens since the last reset came from a step that went on to
+        call tools; they are not part of the saved reply and the client should discard them.
+        Returns the same ``(response_text, usage_metadata)`` tuple as ``respond``.
+        """
+        model_with_tools, tools = self._bind_tools(message_list)
+        turn_start = len(message_list)
+        self._speculate(message_list, tools)
+
+        try:
+            yield from self._agent_events(model_with_tools, message_list, tools, stream=True)
+        except Exception as e:
+            self.trace.error = str(e)
+            raise
+        finally:
+            self._end_speculation()
+            self._record_run()
+
+        logger.info("🤖 AGENT_STREAM_COMPLETE: extracting final response")
+
+        return self._extract_response(message_list, turn_start)
+
+    def _record_run(self):
+        """Persist the turn's trace; a failure here must not lose the reply."""
+        from bots.models.agent_run import AgentRun
+
+        try:
+            self.run = AgentRun.record(self.chat, self.model_id, self.trace)
+        except Exception:
+            logger.exception("Failed to record agent run")
+
+    def _speculation_query(self, message_list, tools):
+        bot = self.chat.bot
+        if "web_search" not in tools or not (bot and bot.speculative_web_search):
+            return None
+        last_message = message_list[-1]
+        if not isinstance(last_message, HumanMessage) or not looks_like_search(last_message.text):
+            return None
+        return SpeculativeSearch.query_for(last_message.text)
+
+    def _speculate(self, message_list, tools):
+        """Start searching the user's question while the first model call decides whether to search."""
+        query = self._speculation_query(message_list, tools)
+        if query:
+            logger.info(f"🔍 SPECULATIVE_SEARCH_START: query='{query}'")
+            self.speculation = SpeculativeSearch(query, _tool_executor.submit(tools["web_search"].func, query))
+
+    def _aspeculate(self, message_list, tools):
+        query = self._speculation_query(message_list, tools)
+        if query:
+            logger.info(f"🔍 SPECULATIVE_SEARCH_START: query='{query}'")
+            self.speculation = SpeculativeSearch(query, asyncio.ensure_future(tools["web_search"].coroutine(query)))
+
+    def _claim_speculation(self, tool_call):
+        if tool_call["name"] != "web_search" or self.speculation is None:
+            return False
+        args = tool_call["args"]
+        if not self.speculation.claim(args.get("query", "") if isinstance(args, dict) else ""):
+            return False
+        logger.info(f"🔍 SPECULATIVE_SEARCH_HIT: query='{self.speculation.query}'")
+        return True
+
+    def _end_speculation(self):
+        if self.speculation is not None:
+            self.speculation.cancel()
+
+    def _bind_tools(self, message_list):
         tools = {
             "create_flashcard_deck": self._create_flashcard_deck_tool(),
             "create_flashcard": self._create_flashcard_tool(),
+            "add_flashcards": self._add_flashcards_tool(),
         }
 
         web_search = self._create_web_search_tool()
@@ -32,76 +188,260 @@ class ChatAgentService:
             logger.info(f"Invoking agent with flashcard tools only ({len(message_list)} messages)")
             logger.info("🤖 AGENT_INVOKE_START: flashcard tools available (web_search disabled)")
 
-        model_with_tools = self.ai_client.bind_tools(list(tools.values()))
+        return self.ai_client.bind_tools(list(tools.values())), tools
 
-        messages = self._run_agent_loop(model_with_tools, message_list, tools)
+    def _run_agent_loop(self, model_with_tools, messages, tools):
+        for _event in self._agent_events(model_with_tools, messages, tools):
+            pass
+        return messages
 
-        logger.info("🤖 AGENT_LOOP_COMPLETE: extracting final response")
+    def _agent_events(self, model_with_tools, messages, tools, stream=False):
+        max_iterations = 5
+        iteration = 0
+        turn_start = len(messages)
 
-        return self._extract_response(messages)
+        while iteration < max_iterations:
+            iteration += 1
+            logger.info(f"🤖 AGENT_LOOP_ITERATION: {iteration}")
 
-    def _run_agent_loop(self, model_with_tools, messages, tools):
+            final, model, model_input = self._next_model_call(model_with_tools, messages, turn_start)
+            with self.trace.model_step(self.model_id) as step:
+                if stream:
+                    response = yield from self._stream_model(model, model_input)
+                else:
+                    response = model.invoke(model_input, **self.model_kwargs)
+                self.trace.record_model_usage(step, self._usage(response))
+            messages.append(response)
+
+            if final or not response.tool_calls:
+                logger.info(f"🤖 AGENT_LOOP_COMPLETE: no more tool calls after {iteration} iterations")
+                break
+
+            # The reply is the text of a later step, unless this is the last one (see _extract_response)
+            if stream and iteration < max_iterations and self._message_text(response, strip=False):
+                yield "reset", {}
+            for tool_call in response.tool_calls:
+                self._log_tool_call(tool_call)
+                yield "tool", {"name": tool_call["name"], "status": TOOL_PROGRESS.get(tool_call["name"], tool_call["name"])}
+            tool_results = self._invoke_tools(response.tool_calls, tools)
+            for tool_call, tool_result in zip(response.tool_calls, tool_results):
+                messages.append(self._tool_message(tool_call, tool_result))
+
+        return messages
+
+    async def _arun_agent_loop(self, model_with_tools, messages, tools):
         max_iterations = 5
         iteration = 0
-        has_web_search = "web_search" in tools
+        turn_start = len(messages)
 
         while iteration < max_iterations:
             iteration += 1
             logger.info(f"🤖 AGENT_LOOP_ITERATION: {iteration}")
 
-            response = model_with_tools.invoke(messages)
+            final, model, model_input = self._next_model_call(model_with_tools, messages, turn_start)
+            with self.trace.model_step(self.model_id) as step:
+                response = await model.ainvoke(model_input, **self.model_kwargs)
+                self.trace.record_model_usage(step, self._usage(response))
             messages.append(response)
 
-            if not response.tool_calls:
+            if final or not response.tool_calls:
                 logger.info(f"🤖 AGENT_LOOP_COMPLETE: no more tool calls after {iteration} iterations")
                 break
 
             for tool_call in response.tool_calls:
-                tool_name = tool_call["name"]
-                tool_args = tool_call["args"]
-                logger.info(
-                    "🔍 AGENT_TOOL_CALL: %s with arg keys: %s",
-                    tool_name,
-                    list(tool_args.keys()) if isinstance(tool_args, dict) else type(tool_args).__name__,
+                self._log_tool_call(tool_call)
+            tool_results = await self._ainvoke_tools(response.tool_calls, tools)
+            for tool_call, tool_result in zip(response.tool_calls, tool_results):
+                messages.append(self._tool_message(tool_call, tool_result))
+
+        return messages
+
+    @staticmethod
+    def _log_tool_call(tool_call):
+        tool_args = tool_call["args"]
+        logger.info(
+            "🔍 AGENT_TOOL_CALL: %s with arg keys: %s",
+            tool_call["name"],
+            list(tool_args.keys()) if isinstance(tool_args, dict) else type(tool_args).__name__,
+        )
+
+    @staticmethod
+    def _unavailable_tool_result(tool_name, tools):
+        if tool_name == "web_search" and "web_search" not in tools:
+            return "Web search is not available."
+        if tool_name not in tools:
+            return f"Unknown tool: {tool_name}"
+        return None
+
+    @staticmethod
+    def _split_tool_calls(tool_calls):
+        concurrent = [index for index, tool_call in enumerate(tool_calls) if tool_call["name"] in CONCURRENT_TOOLS]
+        serial = [index for index in range(len(tool_calls)) if index not in concurrent]
+        return concurrent, serial
+
+    def _next_model_call(self, model_with_tools, messages, turn_start):
+        """Pick the model and input for the next iteration: ``(final, model, model_input)``.
+
+        When the time budget is nearly spent, ask for a final answer from the model without tools.
+        """
+        if not self.deadline.expired(settings.AGENT_FINAL_ANSWER_RESERVE):
+            return False, model_with_tools, messages
+        logger.info("⏱️ AGENT_DEADLINE: forcing a final answer without tools")
+        return True, self.ai_client, self._final_answer_input(messages, turn_start)
+
+    @staticmethod
+    def _final_answer_input(messages, turn_start):
+        """The history before this turn's tool calls, then one user message with the calls and results as text.
+
+        Bedrock rejects tool_use and tool_result blocks in a request that defines no tools.
+        """
+        notes = []
+        for message in messages[turn_start:]:
+            if isinstance(message, ToolMessage):
+                notes.append(f"{message.name} returned:\n{message.content}")
+            elif isinstance(message, AIMessage):
+                notes.extend(
+                    f"You called {tool_call['name']} with {json.dumps(tool_call['args'], default=str)}."
+                    for tool_call in message.tool_calls
                 )
+        return [*messages[:turn_start], HumanMessage(content="\n\n".join([*notes, FINAL_ANSWER_PROMPT]))]
 
-                if tool_name == "web_search" and not has_web_search:
-                    tool_result = "Web search is not available."
-                elif tool_name in tools:
-                    tool_result = tools[tool_name].invoke(tool_args)
-                else:
-                    tool_result = f"Unknown tool: {tool_name}"
+    def _tool_time_left(self):
+        return self.deadline.remaining(settings.AGENT_FINAL_ANSWER_RESERVE)
 
-                logger.info(f"🔍 AGENT_TOOL_RESULT: {tool_result[:100]}")
+    @staticmethod
+    def _timed_out_result(tool_call):
+        logger.info(f"⏱️ AGENT_TOOL_TIMEOUT: {tool_call['name']}")
+        return f"{tool_call['name']} is unavailable: it did not finish in time."
+
+    def _invoke_tools(self, tool_calls, tools):
+        """Run one turn's tool calls, overlapping the network-only ones. Results keep the calls' order.
+
+        Network tools run on the shared pool so they can be abandoned when the time budget runs out.
+        """
+        concurrent, serial = self._split_tool_calls(tool_calls)
+        futures = {
+            index: _tool_executor.submit(self._invoke_tool, tool_calls[index], tools)
+            for index in concurrent if not self.deadline.expired(settings.AGENT_FINAL_ANSWER_RESERVE)
+        }
+        results = {
+            index: self._timed_out_result(tool_calls[index])
+            if self.deadline.expired(settings.AGENT_FINAL_ANSWER_RESERVE)
+            else self._invoke_tool(tool_calls[index], tools)
+            for index in serial
+        }
+        for index in concurrent:
+            try:
+                results[index] = futures[index].result(timeout=self._tool_time_left())
+            except (KeyError, FutureTimeoutError):
+                results[index] = self._timed_out_result(tool_calls[index])
+        return [results[index] for index in range(len(tool_calls))]
 
-                messages.append(ToolMessage(
-                    content=tool_result,
-                    tool_call_id=tool_call["id"],
-                    name=tool_name
-                ))
+    async def _ainvoke_tools(self, tool_calls, tools):
+        concurrent, serial = self._split_tool_calls(tool_calls)
 
-        return messages
+        async def run_with_timeout(tool_call):
+            try:
+                return await asyncio.wait_for(self._ainvoke_tool(tool_call, tools), timeout=self._tool_time_left())
+            except TimeoutError:
+                return self._timed_out_result(tool_call)
+
+        async def run_serially():
+            return [
+                self._timed_out_result(tool_calls[index])
+                if self.deadline.expired(settings.AGENT_FINAL_ANSWER_RESERVE)
+                else await self._ainvoke_tool(tool_calls[index], tools)
+                for index in serial
+            ]
+
+        concurrent_results, serial_results = await asyncio.gather(
+            asyncio.gather(*(run_with_timeout(tool_calls[index]) for index in concurrent)),
+            run_serially(),
+        )
+        results = dict(zip(concurrent, concurrent_results)) | dict(zip(serial, serial_results))
+        return [results[index] for index in range(len(tool_calls))]
+
+    def _invoke_tool(self, tool_call, tools):
+        with self.trace.tool_step(tool_call["name"]) as step:
+            result = self._unavailable_tool_result(tool_call["name"], tools)
+            if result is None and self._claim_speculation(tool_call):
+                result = self.speculation.pending.result()
+            if result is None:
+                result = tools[tool_call["name"]].invoke(tool_call["args"])
+            self.trace.record_tool_result(step, result)
+        return result
+
+    async def _ainvoke_tool(self, tool_call, tools):
+        with self.trace.tool_step(tool_call["name"]) as step:
+            result = self._unavailable_tool_result(tool_call["name"], tools)
+            if result is None and self._claim_speculation(tool_call):
+                result = await self.speculation.pending
+            if result is None:
+                tool = tools[tool_call["name"]]
+                if tool.coroutine:
+                    result = await tool.ainvoke(tool_call["args"])
+                else:
+                    # Flashcard tools use the ORM, which must run in a sync context.
+                    result = await sync_to_async(tool.invoke)(tool_call["args"])
+            self.trace.record_tool_result(step, result)
+        return result
 
-    def _extract_response(self, messages):
+    @staticmethod
+    def _tool_message(tool_call, tool_result):
+        logger.info(f"🔍 AGENT_TOOL_RESULT: {tool_result[:100]}")
+        return ToolMessage(
+            content=tool_result,
+            tool_call_id=tool_call["id"],
+            name=tool_call["name"]
+        )
+
+    def _stream_model(self, model, messages):
+        response = None
+        for chunk in model.stream(messages, **self.model_kwargs):
+            text = self._message_text(chunk, strip=False)
+            if text:
+                yield "token", {"text": text}
+            response = chunk if response is None else response + chunk
+        return response if response is not None else AIMessageChunk(content="")
+
+    def _extract_response(self, messages, turn_start=0):
         response_text = ""
-        usage_metadata = {"input_tokens": 0, "output_tokens": 0}
-        ai_messages = [msg for msg in reversed(messages) if isinstance(msg, AIMessage)]
+        ai_messages = [msg for msg in reversed(messages[turn_start:]) if isinstance(msg, AIMessage)]
 
         for msg in ai_messages:
             if not msg.tool_calls:
                 response_text = self._message_text(msg)
-                if hasattr(msg, 'usage_metadata') and msg.usage_metadata:
-                    usage_metadata = msg.usage_metadata
                 logger.info(f"🤖 FINAL_RESPONSE: {len(response_text)} chars")
                 break
 
         if not response_text and ai_messages:
             response_text = self._message_text(ai_messages[0])
 
-        return response_text, usage_metadata
+        return response_text, self._turn_usage(reversed(ai_messages))
+
+    def _usage(self, message):
+        return with_cached_input(message.usage_metadata or {}, self.uses_converse_api)
+
+    def _turn_usage(self, ai_messages):
+        """Sum usage over every model call of the turn, keeping each call's numbers under ``iterations``."""
+        usage_metadata = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+        iterations = []
+        for iteration, msg in enumerate(ai_messages, start=1):
+            usage = self._usage(msg)
+            usage_metadata = add_usage(usage_metadata, usage)
+            token_details = usage.get("input_token_details") or {}
+            iterations.append({
+                "iteration": iteration,
+                "input_tokens": usage.get("input_tokens", 0),
+                "output_tokens": usage.get("output_tokens", 0),
+                "cache_read_tokens": token_details.get("cache_read", 0),
+                "cache_write_tokens": token_details.get("cache_creation", 0),
+                "tool_calls": [tool_call["name"] for tool_call in msg.tool_calls],
+            })
+        return {**usage_metadata, "iterations": iterations}
 
     @staticmethod
-    def _message_text(message):
+    def _message_text(message, strip=True):
         if isinstance(message.content, str):
             return message.content
         if isinstance(message.content, list):
@@ -111,7 +451,8 @@ class ChatAgentService:
                     text_parts.append(item.get('text', ''))
                 elif isinstance(item, str):
                     text_parts.append(item)
-            return "".join(text_parts).strip()
+            text = "".join(text_parts)
+            return text.strip() if strip else text
         return ""
 
     def _create_flashcard_deck_tool(self):
@@ -128,25 +469,16 @@ class ChatAgentService:
             """
             logger.info(f"🃏 CREATE_FLASHCARD_DECK_TOOL_INVOKED: name='{name}'")
             try:
-                with transaction.atomic():
-                    deck = Deck.objects.create(
-                        profile=chat.profile,
-                        chat=chat,
-                        name=name,
-                        description=description or ""
-                    )
-                    deck = Deck.objects.select_for_update().get(pk=deck.pk)
-                    created_cards = 0
-                    for i, card in enumerate(flashcards):
-                        Flashcard.objects.create(
-                            deck=deck,
-                            front=card.get('front', ''),
-                            back=card.get('back', ''),
-                            order=i
-                        )
-                        created_cards += 1
-                    logger.info(f"🃏 CREATE_FLASHCARD_DECK_SUCCESS: deck_id={deck.deck_id}, cards={created_cards}")
-                    return f"Created deck '{name}' with {created_cards} flashcards. Deck ID: {deck.deck_id}"
+                deck = Deck.create_with_cards(
+                    flashcards,
+                    profile=chat.profile,
+                    chat=chat,
+                    name=name,
+                    description=description or ""
+                )
+                created_cards = len(flashcards)
+                logger.info(f"🃏 CREATE_FLASHCARD_DECK_SUCCESS: deck_id={deck.deck_id}, cards={created_cards}")
+                return f"Created deck '{name}' with {created_cards} flashcards. Deck ID: {deck.deck_id}"
             except Exception as e:
                 logger.error(f"🃏 CREATE_FLASHCARD_DECK_ERROR: {e!s}")
                 return f"Error creating deck: {e!s}"
@@ -158,7 +490,7 @@ class ChatAgentService:
 
         @tool
         def create_flashcard(deck_name: str, front: str, back: str) -> str:
-            """Add a single flashcard to an existing deck or create a new deck. Use this when the user wants to add flashcards to study.
+            """Add a single flashcard to an existing deck or create a new deck. To add several cards, use add_flashcards instead.
 
             Args:
                 deck_name: The name of the deck to add the card to
@@ -168,22 +500,8 @@ class ChatAgentService:
             logger.info(f"🃏 CREATE_FLASHCARD_TOOL_INVOKED: deck_name='{deck_name}'")
             try:
                 with transaction.atomic():
-                    deck = Deck.objects.filter(profile=chat.profile, name=deck_name).first()
-                    if not deck:
-                        deck = Deck.objects.create(
-                            profile=chat.profile,
-                            chat=chat,
-                            name=deck_name,
-                            description=""
-                        )
-                    last_card = Flashcard.objects.filter(deck=deck).order_by('-order').first()
-                    max_order = last_card.order if last_card else -1
-                    Flashcard.objects.create(
-                        deck=deck,
-                        front=front,
-                        back=back,
-                        order=max_order + 1
-                    )
+                    deck = Deck.for_chat(chat, deck_name)
+                    deck.add_cards([{"front": front, "back": back}])
                     logger.info(f"🃏 CREATE_FLASHCARD_SUCCESS: deck={deck.name}")
                     return f"Added flashcard to deck '{deck_name}'. Deck ID: {deck.deck_id}"
             except Exception as e:
@@ -192,33 +510,72 @@ class ChatAgentService:
 
         return create_flashcard
 
+    def _add_flashcards_tool(self):
+        chat = self.chat
+
+        @tool
+        def add_flashcards(deck_name: str, flashcards: list) -> str:
+            """Add several flashcards at once to an existing deck, or to a new deck if none has this name. Prefer this over repeated create_flashcard calls.
+
+            Args:
+                deck_name: The name of the deck to add the cards to
+                flashcards: List of flashcards, each with 'front' and 'back' keys
+            """
+            logger.info(f"🃏 ADD_FLASHCARDS_TOOL_INVOKED: deck_name='{deck_name}', cards={len(flashcards)}")
+            try:
+                Deck.validate_cards(flashcards)
+                with transaction.atomic():
+                    deck = Deck.for_chat(chat, deck_name)
+                    cards = deck.add_cards(flashcards)
+                logger.info(f"🃏 ADD_FLASHCARDS_SUCCESS: deck={deck.name}, cards={len(cards)}")
+                positions = f"{cards[0].order + 1}-{cards[-1].order + 1}" if cards else "none"
+                return f"Added {len(cards)} flashcards to deck '{deck_name}' (cards {positions}). Deck ID: {deck.deck_id}"
+            except Exception as e:
+                logger.error(f"🃏 ADD_FLASHCARDS_ERROR: {e!s}")
+                return f"Error adding flashcards: {e!s}"
+
+        return add_flashcards
+
     def _create_web_search_tool(self):
         if not (self.chat.bot and self.chat.bot.enable_web_search and settings.TAVILY_API_KEY):
             return None
 
         logger.info(f"Web search enabled for bot {self.chat.bot.name}")
-        tavily_client = TavilyClient(api_key=settings.TAVILY_API_KEY)
 
-        @tool
         def web_search(query: str) -> str:
             """Search the web for current information. Use this when you need up-to-date information or facts that may not be in your training data."""
             logger.info(f"🔍 WEB_SEARCH_TOOL_INVOKED: query='{query}'")
             try:
-                results = tavily_client.search(query=query)
-                num_results = len(results.get('results', []))
-                logger.info(f"🔍 WEB_SEARCH_SUCCESS: returned {num_results} results")
-                if results.get('results'):
-                    formatted = "\n".join([
-                        f"- {r.get('title', 'No title')}: {r.get('content', '')[:200]}"
-                        for r in results['results'][:3]
-                    ])
-                    logger.debug(f"🔍 WEB_SEARCH_FORMATTED_RESULTS:\n{formatted}")
-                    return formatted
-                else:
-                    logger.info("🔍 WEB_SEARCH_NO_RESULTS: empty result set")
-                    return "No results found."
+                return web_search_cache.get_or_search(
+                    query, lambda query: self._format_search_results(search_clients.get().search(query=query))
+                )
             except Exception as e:
                 logger.error(f"🔍 WEB_SEARCH_ERROR: {e!s}")
                 return f"Error during search: {e!s}"
 
-        return web_search
+        async def aweb_search(query: str) -> str:
+            logger.info(f"🔍 WEB_SEARCH_TOOL_INVOKED: query='{query}'")
+            async def search(query):
+                return self._format_search_results(await search_clients.aget().search(query=query))
+
+            try:
+                return await web_search_cache.aget_or_search(query, search)
+            except Exception as e:
+                logger.error(f"🔍 WEB_SEARCH_ERROR: {e!s}")
+                return f"Error during search: {e!s}"
+
+        return StructuredTool.from_function(func=web_search, coroutine=aweb_search)
+
+    @staticmethod
+    def _format_search_results(results):
+        num_results = len(results.get('results', []))
+        logger.info(f"🔍 WEB_SEARCH_SUCCESS: returned {num_results} results")
+        if results.get('results'):
+            formatted = "\n".join([
+                f"- {r.get('title', 'No title')}: {r.get('content', '')[:200]}"
+                for r in results['results'][:3]
+            ])
+            logger.debug(f"🔍 WEB_SEARCH_FORMATTED_RESULTS:\n{formatted}")
+            return formatted
+        logger.info("🔍 WEB_SEARCH_NO_RESULTS: empty result set")
+        return "No results found."
@@ -0,0 +1,108 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+# Rough token estimates used to fit the window to a model's budget without a tokenizer call.
+CHARS_PER_TOKEN = 4
+IMAGE_TOKENS = 1600
+
+
+def estimate_tokens(message):
+    tokens = len(message.text or '') // CHARS_PER_TOKEN + 1
+    if message.image_filename:
+        tokens += IMAGE_TOKENS
+    return tokens
+
+
+class ConversationContext:
+    """The recent message window of a chat, paired with the LangChain messages built from it.
+
+    Contexts are never modified once cached; ``extend`` returns a new one, so
+    concurrent turns can read a shared context safely.
+    """
+
+    def __init__(self, window=(), images=None, token_budget=None):
+        self.window = list(window)
+        self.images = images or {}
+        self.token_budget = token_budget
+
+    @property
+    def last_message_id(self):
+        return self.window[-1][0].id if self.window else None
+
+    @property
+    def size(self):
+        return sum(len(message.text or '') for message, _ in self.window) + \
+            sum(len(image) for image in self.images.values())
+
+    def fit(self, messages, token_budget):
+        """Return the cached and new messages, dropping the oldest until they fit in token_budget.
+
+        The newest message is always kept, even if it alone exceeds the budget.
+        """
+        candidates = [message for message, _ in self.window] + list(messages)
+        kept = []
+        total = 0
+        for message in reversed(candidates):
+            total += estimate_tokens(message)
+            if kept and total > token_budget:
+                break
+            kept.append(message)
+        return kept[::-1]
+
+    def extend(self, messages, images, token_budget, convert):
+        """Build the context for ``messages``, reusing cached conversions and converting the rest."""
+        converted = {message.id: langchain_message for message, langchain_message in self.window}
+        window = [
+            (message, converted[message.id] if message.id in converted else convert(message))
+            for message in messages
+        ]
+        filenames = {message.image_filename for message in messages if message.image_filename}
+        return ConversationContext(window, {filename: images[filename] for filename in filenames}, token_budget)
+
+
+class ConversationContextCache:
+    """Thread-safe LRU of ConversationContext objects keyed by chat, bounded by entry count and size."""
+
+    def __init__(self, max_chats=None, max_bytes=None):
+        self.max_chats = max_chats or settings.CHAT_CONTEXT_CACHE_MAX_CHATS
+        self.max_bytes = max_bytes or settings.CHAT_CONTEXT_CACHE_MAX_BYTES
+        self._lock = threading.Lock()
+        self._contexts = OrderedDict()
+        self._bytes = 0
+
+    def get(self, key):
+        with self._lock:
+            context = self._contexts.get(key)
+            if context is not None:
+                self._contexts.move_to_end(key)
+            return context
+
+    def put(self, key, context):
+        with self._lock:
+            self._discard(key)
+            self._contexts[key] = context
+            self._bytes += context.size
+            while self._contexts and (len(self._contexts) > self.max_chats or self._bytes > self.max_bytes):
+                self._discard(next(iter(self._contexts)))
+
+    def evict(self, key):
+        with self._lock:
+            self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._contexts.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._contexts)
+
+    def _discard(self, key):
+        context = self._contexts.pop(key, None)
+        if context is not None:
+            self._bytes -= context.size
+
+
+context_cache = ConversationContextCache()
@@ -0,0 +1,17 @@
+import time
+
+
+class Deadline:
+    """Wall-clock budget for one reply. ``seconds=None`` means no limit."""
+
+    def __init__(self, seconds=None):
+        self.expires_at = None if seconds is None else time.monotonic() + seconds
+
+    def remaining(self, reserve=0):
+        """Seconds left before ``reserve`` seconds from the end, never negative; None without a limit."""
+        if self.expires_at is None:
+            return None
+        return max(self.expires_at - reserve - time.monotonic(), 0)
+
+    def expired(self, reserve=0):
+        return self.remaining(reserve) == 0
@@ -0,0 +1,161 @@
+import asyncio
+import json
+import random
+import time
+import uuid
+from typing import Any
+
+from django.conf import settings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from bots.services.context_cache import CHARS_PER_TOKEN, IMAGE_TOKENS
+
+WORDS = (
+    "the a learning question answer idea example practice simple story friend "
+    "science history number word reason because first next then finally great "
+    "remember try think about how why what when where together again today"
+).split()
+
+
+class FakeChatModel(BaseChatModel):
+    """Offline stand-in for a Bedrock chat model, selected with ``AI_BACKEND = 'fake'``.
+
+    Replies are derived from the seed, the model id and the conversation, so the
+    same conversation always gets the same reply. ``script`` lists the steps of
+    each turn: the n-th model call after the user's message plays ``script[n]``,
+    either ``{"content": "..."}`` or ``{"tool_calls": [{"name": ..., "args": {...}}]}``.
+    Tool calls are only made for tools that are bound; anything past the end of
+    the script is a generated text reply.
+    """
+
+    model_id: str = "fake"
+    seed: int = 0
+    latency_ms: float = 0
+    latency_jitter_ms: float = 0
+    token_interval_ms: float = 0
+    output_tokens: int = 60
+    output_tokens_jitter: int = 20
+    script: list[dict[str, Any]] = []
+
+    @classmethod
+    def from_settings(cls, model_id):
+        script = []
+        if settings.FAKE_AI_SCRIPT.lstrip().startswith('['):
+            script = json.loads(settings.FAKE_AI_SCRIPT)
+        elif settings.FAKE_AI_SCRIPT:
+            with open(settings.FAKE_AI_SCRIPT) as script_file:
+                script = json.load(script_file)
+        return cls(
+            model_id=model_id,
+            seed=settings.FAKE_AI_SEED,
+            latency_ms=settings.FAKE_AI_LATENCY_MS,
+            latency_jitter_ms=settings.FAKE_AI_LATENCY_JITTER_MS,
+            token_interval_ms=settings.FAKE_AI_TOKEN_INTERVAL_MS,
+            output_tokens=settings.FAKE_AI_OUTPUT_TOKENS,
+            output_tokens_jitter=settings.FAKE_AI_OUTPUT_TOKENS_JITTER,
+            script=script,
+        )
+
+    @property
+    def _llm_type(self):
+        return "fake-chat-model"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        rng = self._rng(messages)
+        time.sleep(self._latency(rng))
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages, rng, kwargs.get("tools")))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        rng = self._rng(messages)
+        await asyncio.sleep(self._latency(rng))
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages, rng, kwargs.get("tools")))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        rng = self._rng(messages)
+        time.sleep(self._latency(rng))
+        reply = self._reply(messages, rng, kwargs.get("tools"))
+        if reply.tool_calls:
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content="",
+                tool_call_chunks=[
+                    {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": index}
+                    for index, call in enumerate(reply.tool_calls)
+                ],
+                usage_metadata=reply.usage_metadata,
+            ))
+            return
+
+        words = reply.content.split(" ")
+        for index, word in enumerate(words):
+            if index:
+                time.sleep(self.token_interval_ms / 1000)
+            last = index == len(words) - 1
+            chunk = AIMessageChunk(
+                content=word if index == 0 else " " + word,
+                usage_metadata=reply.usage_metadata if last else None,
+            )
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.content, chunk=chunk)
+            yield ChatGenerationChunk(message=chunk)
+
+    def _rng(self, messages):
+        last_human = next((message for message in reversed(messages) if isinstance(message, HumanMessage)), None)
+        key = last_human.text if last_human else ""
+        return random.Random(f"{self.seed}:{self.model_id}:{self._step(messages)}:{key}")
+
+    def _latency(self, rng):
+        return max(rng.gauss(self.latency_ms, self.latency_jitter_ms), 0) / 1000
+
+    @staticmethod
+    def _step(messages):
+        step = 0
+        for message in reversed(messages):
+            if isinstance(message, HumanMessage):
+                break
+            if isinstance(message, AIMessage):
+                step += 1
+        return step
+
+    def _reply(self, messages, rng, tools):
+        step = self._step(messages)
+        scripted = self.script[step] if step < len(self.script) else {}
+        bound = {tool["function"]["name"] for tool in tools or []}
+        tool_calls = [
+            {"name": call["name"], "args": call.get("args", {}), "id": f"call_{uuid.UUID(int=rng.getrandbits(128)).hex}"}
+            for call in scripted.get("tool_calls", [])
+            if call["name"] in bound
+        ]
+
+        if tool_calls:
+            content, output_tokens = "", 10 * len(tool_calls)
+        elif "content" in scripted:
+            content = scripted["content"]
+            output_tokens = len(content) // CHARS_PER_TOKEN + 1
+        else:
+            output_tokens = max(round(rng.gauss(self.output_tokens, self.output_tokens_jitter)), 1)
+            content = " ".join(rng.choice(WORDS) for _ in range(output_tokens)).capitalize() + "."
+
+        input_tokens = sum(self._input_tokens(message) for message in messages)
+        return AIMessage(
+            content=content,
+            tool_calls=tool_calls,
+            response_metadata={"model_id": self.model_id, "stop_reason": "tool_use" if tool_calls else "end_turn"},
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+            },
+        )
+
+    @staticmethod
+    def _input_tokens(message):
+        tokens = len(message.text) // CHARS_PER_TOKEN + 1
+        if isinstance(message.content, list):
+            tokens += IMAGE_TOKENS * sum(1 for block in message.content if isinstance(block, dict) and block.get("type") in ("image", "image_url"))
+        return tokens
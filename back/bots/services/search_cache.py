@@ -0,0 +1,111 @@
+import asyncio
+import hashlib
+import logging
+import re
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 0.1
+
+
+def normalize_query(query):
+    """Fold case, whitespace and trailing punctuation so equivalent questions share an entry."""
+    return re.sub(r'\s+', ' ', query).strip().rstrip('?!.').strip().casefold()
+
+
+class WebSearchCache:
+    """Shared cache of formatted web_search results, keyed by normalized query.
+
+    Concurrent misses for the same query are collapsed: the first caller takes
+    a short lock and searches, the others poll for its result. Only successful
+    searches are cached, so errors are retried by the next caller.
+    """
+
+    def __init__(self, alias='web_search'):
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def key(self, query):
+        return 'web_search:' + hashlib.sha256(normalize_query(query).encode()).hexdigest()
+
+    def get_or_search(self, query, search):
+        key = self.key(query)
+        result = self.cache.get(key)
+        if result is None and not self.cache.add(f'{key}:lock', 1, timeout=settings.WEB_SEARCH_CACHE_LOCK_TIMEOUT):
+            result = self._wait_for(key)
+        if result is not None:
+            self._count('hits')
+            return result
+
+        self._count('misses')
+        try:
+            result = search(query)
+            self.cache.set(key, result, timeout=settings.WEB_SEARCH_CACHE_TTL)
+            return result
+        finally:
+            self.cache.delete(f'{key}:lock')
+
+    async def aget_or_search(self, query, search):
+        key = self.key(query)
+        result = await self.cache.aget(key)
+        if result is None and not await self.cache.aadd(
+            f'{key}:lock', 1, timeout=settings.WEB_SEARCH_CACHE_LOCK_TIMEOUT
+        ):
+            result = await self._await(key)
+        if result is not None:
+            await self._acount('hits')
+            return result
+
+        await self._acount('misses')
+        try:
+            result = await search(query)
+            await self.cache.aset(key, result, timeout=settings.WEB_SEARCH_CACHE_TTL)
+            return result
+        finally:
+            await self.cache.adelete(f'{key}:lock')
+
+    def stats(self):
+        counts = self.cache.get_many(['web_search:hits', 'web_search:misses'])
+        return {'hits': counts.get('web_search:hits', 0), 'misses': counts.get('web_search:misses', 0)}
+
+    def _wait_for(self, key):
+        deadline = time.monotonic() + settings.WEB_SEARCH_CACHE_LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            result = self.cache.get(key)
+            if result is not None or self.cache.get(f'{key}:lock') is None:
+                return result
+        return None
+
+    async def _await(self, key):
+        deadline = time.monotonic() + settings.WEB_SEARCH_CACHE_LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(POLL_INTERVAL)
+            result = await self.cache.aget(key)
+            if result is not None or await self.cache.aget(f'{key}:lock') is None:
+                return result
+        return None
+
+    def _count(self, name):
+        key = f'web_search:{name}'
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            self.cache.add(key, 1, timeout=None)
+
+    async def _acount(self, name):
+        key = f'web_search:{name}'
+        try:
+            await self.cache.aincr(key)
+        except ValueError:
+            await self.cache.aadd(key, 1, timeout=None)
+
+
+web_search_cache = WebSearchCache()
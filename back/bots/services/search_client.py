@@ -0,0 +1,111 @@
+import asyncio
+import threading
+import weakref
+
+import httpx
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from tavily import AsyncTavilyClient, TavilyClient
+from urllib3.util.retry import Retry
+
+TAVILY_API_URL = "https://api.tavily.com"
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """Sends every request with the configured (connect, read) timeouts.
+
+    TavilyClient passes a single 60 second timeout of its own, which would let
+    one hung search hold a reply far past its time budget.
+    """
+
+    def __init__(self, timeout, **kwargs):
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+
+class TimeoutAsyncHTTPTransport(httpx.AsyncHTTPTransport):
+    """The async counterpart of TimeoutHTTPAdapter."""
+
+    def __init__(self, timeout, **kwargs):
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    async def handle_async_request(self, request):
+        request.extensions["timeout"] = self.timeout.as_dict()
+        return await super().handle_async_request(request)
+
+
+class SearchClients:
+    """Process-wide Tavily clients that keep their connections alive between searches.
+
+    The sync client's session is shared by every thread. httpx connections are
+    tied to the event loop that opened them, so there is one async client per loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._client = None
+        self._async_clients = weakref.WeakKeyDictionary()
+
+    def get(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = TavilyClient(api_key=settings.TAVILY_API_KEY, session=self._session())
+        return self._client
+
+    def aget(self):
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = self._async_clients[loop] = AsyncTavilyClient(
+                api_key=settings.TAVILY_API_KEY, client=self._async_http_client()
+            )
+        return client
+
+    def clear(self):
+        with self._lock:
+            if self._client is not None:
+                self._client.session.close()
+            self._client = None
+            self._async_clients.clear()
+
+    @staticmethod
+    def _session():
+        retries = Retry(
+            total=settings.WEB_SEARCH_RETRIES,
+            backoff_factor=0.3,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=None,  # searches are safe to repeat, including POSTs
+            raise_on_status=False,
+        )
+        adapter = TimeoutHTTPAdapter(
+            timeout=(settings.WEB_SEARCH_CONNECT_TIMEOUT, settings.WEB_SEARCH_READ_TIMEOUT),
+            max_retries=retries,
+            pool_maxsize=settings.AGENT_TOOL_CONCURRENCY,
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    @staticmethod
+    def _async_http_client():
+        return httpx.AsyncClient(
+            base_url=TAVILY_API_URL,
+            # httpx only retries failed connections, not 5xx responses
+            transport=TimeoutAsyncHTTPTransport(
+                timeout=httpx.Timeout(settings.WEB_SEARCH_READ_TIMEOUT, connect=settings.WEB_SEARCH_CONNECT_TIMEOUT),
+                retries=settings.WEB_SEARCH_RETRIES,
+                limits=httpx.Limits(max_connections=settings.AGENT_TOOL_CONCURRENCY),
+            ),
+        )
+
+
+search_clients = SearchClients()
@@ -0,0 +1,77 @@
+import re
+import threading
+
+from django.conf import settings
+
+from bots.services.search_cache import normalize_query
+
+MAX_QUERY_CHARS = 400
+MIN_QUERY_WORDS = 3
+MAX_QUERY_WORDS = 40
+
+QUESTION_WORDS = {"who", "what", "when", "where", "which", "why", "how", "is", "are", "was", "did", "does", "do", "can"}
+CURRENT_EVENT_WORDS = {
+    "latest", "recent", "recently", "news", "today", "tonight", "yesterday", "tomorrow", "current",
+    "currently", "now", "price", "score", "weather", "won", "winner", "released", "election",
+}
+STOP_WORDS = {
+    "a", "an", "the", "of", "in", "on", "for", "to", "and", "or", "is", "are", "was", "what", "who",
+    "me", "about", "please", "tell", "can", "you", "do", "does", "did",
+}
+
+
+def words(text):
+    return re.findall(r"\w+", normalize_query(text))
+
+
+def looks_like_search(text):
+    """Guess whether a user message is a factual or current-events question worth searching right away."""
+    message_words = words(text)
+    if not MIN_QUERY_WORDS <= len(message_words) <= MAX_QUERY_WORDS:
+        return False
+    return (
+        text.rstrip().endswith("?")
+        or message_words[0] in QUESTION_WORDS
+        or not CURRENT_EVENT_WORDS.isdisjoint(message_words)
+        or any(re.fullmatch(r"(19|20)\d\d", word) for word in message_words)
+    )
+
+
+def query_similarity(first, second):
+    """Jaccard similarity of the two queries' content words."""
+    first_words = set(words(first)) - STOP_WORDS
+    second_words = set(words(second)) - STOP_WORDS
+    if not first_words or not second_words:
+        return 0.0
+    return len(first_words & second_words) / len(first_words | second_words)
+
+
+class SpeculativeSearch:
+    """A web search started on the user's message before the model has asked for one.
+
+    ``pending`` is a concurrent future on the sync path and an asyncio task on
+    the async one. The first similar web_search call of the turn takes its result.
+    """
+
+    def __init__(self, query, pending):
+        self.query = query
+        self.pending = pending
+        self.used = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def query_for(text):
+        return text.strip()[:MAX_QUERY_CHARS]
+
+    def claim(self, query):
+        if query_similarity(self.query, query) < settings.SPECULATIVE_SEARCH_SIMILARITY:
+            return False
+        with self._lock:
+            if self.used:
+                return False
+            self.used = True
+        return True
+
+    def cancel(self):
+        if not self.used:
+            self.pending.cancel()
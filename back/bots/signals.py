@@ -1,8 +1,10 @@
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 from .models import AiModel, Bot, Chat, Message, Profile, UserAccount
+from .services.ai_clients import client_registry
+from .services.ai_model_catalog import get_catalog, invalidate_catalog
 
 PENELOPE_SYSTEM_PROMPT = "Your name is Penelope. You are an expert in writing, guiding students through various writing topics. Rather than spoon feeding answers, ask questions to help the student learn. Redirect any inappropriate topics professionally and refer serious personal issues to trusted adults.\nPlease respond in less than 200 words.\nAlways avoid using foul language.\nAlways avoid discussing adult topics."
 
@@ -28,7 +30,7 @@ def provision_default_content(user):
 
     bot = Bot.objects.filter(user=user, deleted_at=None).first()
     if bot is None:
-        default_model = AiModel.objects.filter(is_default=True).first()
+        default_model = get_catalog().default
         if default_model is None:
             return
         bot = Bot.objects.create(
@@ -46,8 +48,8 @@ def provision_default_content(user):
             bot=bot,
             title="Can you help with writing?"
         )
-        Message.objects.create(chat=chat, role="system", text=PENELOPE_SYSTEM_PROMPT, order=0)
-        Message.objects.create(chat=chat, role="assistant", text=PENELOPE_GREETING, order=1)
+        chat.add_message(role="system", text=PENELOPE_SYSTEM_PROMPT)
+        chat.add_message(role="assistant", text=PENELOPE_GREETING)
 
 @receiver(post_save, sender=Chat)
 def notify_chat(sender, instance, created, **kwargs):
@@ -62,3 +64,11 @@ def notify_message(sender, instance, created, **kwargs):
         devices = instance.chat.user.devices.all()
         for device in devices:
             device.notify_message(instance)
+
+@receiver([post_save, post_delete], sender=AiModel)
+def evict_ai_client(sender, instance, **kwargs):
+    client_registry.evict(instance.model_id)
+
+@receiver([post_save, post_delete], sender=AiModel)
+def invalidate_ai_model_catalog(sender, instance, **kwargs):
+    invalidate_catalog()
@@ -1,6 +1,18 @@
 import pytest
+from django.core.cache import cache, caches
 from django.core.management import call_command
-from django.db import connection
+
+from bots.services.context_cache import context_cache
+from bots.services.search_client import search_clients
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Cached rows (e.g. the AiModel catalog) must not outlive the test database transaction."""
+    cache.clear()
+    caches['web_search'].clear()
+    context_cache.clear()
+    search_clients.clear()
 
 
 @pytest.fixture
@@ -8,13 +20,7 @@ def load_fixture():
     call_command('loaddata', 'ai_models.json')
 
 
-@pytest.fixture
-def backdate_modified_at():
-    """Backdate a Chat's auto_now modified_at field via raw SQL (ORM save would overwrite it)."""
-    def _backdate(chat, when):
-        with connection.cursor() as cursor:
-            cursor.execute(
-                "UPDATE bots_chat SET modified_at = %s WHERE id = %s",
-                [when, chat.id]
-            )
-    return _backdate
+@pytest.fixture(autouse=True)
+def run_background_tasks_inline(monkeypatch):
+    """Background threads use their own connections, which cannot see the test's uncommitted rows."""
+    monkeypatch.setattr('bots.models.chat.run_in_background', lambda fn, *args, **kwargs: fn(*args, **kwargs))
@@ -1,63 +1,122 @@
+from datetime import UTC, date, datetime
+from unittest.mock import patch
+
 import pytest
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.utils import timezone
+from rest_framework.test import APIClient
 
 from bots.models.ai_model import AiModel
-from bots.models.bot import Bot
-from bots.models.chat import Chat
+from bots.models.daily_usage import DailyUsage
+from bots.models.user_account import MAX_COST_DAILY, NANO_DOLLARS
+from bots.services.ai_model_catalog import get_catalog
+
+DEFAULT_MODEL = 'us.amazon.nova-2-lite-v1:0'
 
 
 @pytest.mark.django_db
 def describe_account():
-    def test_cost_single_model(load_fixture, backdate_modified_at):
+    def _yesterday(account):
+        return account.user_account.today() - timezone.timedelta(days=1)
+
+    def test_cost_single_model(load_fixture):
         account = User.objects.create()
-        Chat.objects.create(user=account, input_tokens=1, output_tokens=2)
-        Chat.objects.create(user=account, input_tokens=3, output_tokens=4)
-        chat3 = Chat.objects.create(user=account, 
-                                    input_tokens=5, 
-                                    output_tokens=6)
-        backdate_modified_at(chat3, timezone.now() - timezone.timedelta(days=1))
+        DailyUsage.record(account, DEFAULT_MODEL, input_tokens=1, output_tokens=2)
+        DailyUsage.record(account, DEFAULT_MODEL, input_tokens=3, output_tokens=4)
+        DailyUsage.objects.create(user=account, day=_yesterday(account), model_id=DEFAULT_MODEL,
+                                  input_tokens=5, output_tokens=6)
         expected_cost = (0.00000006 * 4) + (0.00000024 * 6)
         assert account.user_account.cost_for_today() == (expected_cost, 4, 6)
-        
-    def test_cost_single_model_in_hawaii(load_fixture, backdate_modified_at):
+
+    def test_cost_prices_cached_input_tokens(load_fixture):
+        AiModel.objects.filter(is_default=True).update(
+            cache_read_token_cost=0.000000015, cache_write_token_cost=0.0000001
+        )
+        account = User.objects.create()
+        DailyUsage.record(account, DEFAULT_MODEL, input_tokens=10, output_tokens=2,
+                          cache_read_tokens=6, cache_write_tokens=3)
+        expected_cost = (0.00000006 * 1) + (0.000000015 * 6) + (0.0000001 * 3) + (0.00000024 * 2)
+        cost, input_tokens, output_tokens = account.user_account.cost_for_today()
+        assert cost == pytest.approx(expected_cost)
+        assert (input_tokens, output_tokens) == (10, 2)
+
+    def test_cost_single_model_in_hawaii(load_fixture):
         account = User.objects.create()
         account.user_account.timezone = 'Pacific/Honolulu'
-        Chat.objects.create(user=account, input_tokens=1, output_tokens=2)
-        Chat.objects.create(user=account, input_tokens=3, output_tokens=4)
-        chat3 = Chat.objects.create(user=account, 
-                                    input_tokens=5, 
-                                    output_tokens=6)
-        backdate_modified_at(chat3, timezone.now().astimezone(timezone.get_fixed_timezone(-600)) - timezone.timedelta(hours=1))
-        backdate_modified_at(chat3, timezone.now() - timezone.timedelta(days=1))
-        expected_cost = (0.00000006 * 4) + (0.00000024 * 6)
-        assert account.user_account.cost_for_today() == (expected_cost, 4, 6)
+        account.user_account.save()
+        # 08:00 UTC is still the evening before in Honolulu
+        with patch.object(timezone, 'now', return_value=datetime(2026, 1, 15, 8, tzinfo=UTC)):
+            DailyUsage.record(account, DEFAULT_MODEL, input_tokens=1, output_tokens=2)
+            assert account.user_account.cost_for_today() == ((0.00000006 * 1) + (0.00000024 * 2), 1, 2)
+        assert DailyUsage.objects.get(user=account).day == date(2026, 1, 14)
 
-    def test_cost_single_model_in_australia(load_fixture, backdate_modified_at):
+    def test_cost_single_model_in_australia(load_fixture):
         account = User.objects.create()
         account.user_account.timezone = 'Australia/Sydney'
-        Chat.objects.create(user=account, input_tokens=1, output_tokens=2)
-        Chat.objects.create(user=account, input_tokens=3, output_tokens=4)
-        chat3 = Chat.objects.create(user=account, 
-                                    input_tokens=5, 
-                                    output_tokens=6)
-        backdate_modified_at(chat3, timezone.now().astimezone(timezone.get_fixed_timezone(600)) - timezone.timedelta(hours=1))
-        backdate_modified_at(chat3, timezone.now() - timezone.timedelta(days=1))
-        expected_cost = (0.00000006 * 4) + (0.00000024 * 6)
-        assert account.user_account.cost_for_today() == (expected_cost, 4, 6)
-    
-    def test_cost_multiple_models(load_fixture, backdate_modified_at):
+        account.user_account.save()
+        # 14:00 UTC is already the next morning in Sydney
+        with patch.object(timezone, 'now', return_value=datetime(2026, 1, 15, 14, tzinfo=UTC)):
+            DailyUsage.record(account, DEFAULT_MODEL, input_tokens=1, output_tokens=2)
+            assert account.user_account.cost_for_today() == ((0.00000006 * 1) + (0.00000024 * 2), 1, 2)
+        assert DailyUsage.objects.get(user=account).day == date(2026, 1, 16)
+
+    def test_cost_multiple_models(load_fixture):
         account = User.objects.create()
-        nova_micro = AiModel.objects.get(model_id='us.amazon.nova-micro-v1:0')
-        nova_lite = AiModel.objects.get(model_id='us.amazon.nova-lite-v1:0')
-        bot1 = Bot.objects.create(ai_model=nova_micro)
-        Chat.objects.create(user=account, bot=bot1, input_tokens=1, output_tokens=2)
-        bot2 = Bot.objects.create(ai_model=nova_lite)
-        Chat.objects.create(user=account, bot=bot2, input_tokens=3, output_tokens=4)
-        chat3 = Chat.objects.create(user=account, 
-                                    input_tokens=5, 
-                                    output_tokens=6)
-        backdate_modified_at(chat3, timezone.now() - timezone.timedelta(days=1))
+        DailyUsage.record(account, 'us.amazon.nova-micro-v1:0', input_tokens=1, output_tokens=2)
+        DailyUsage.record(account, 'us.amazon.nova-lite-v1:0', input_tokens=3, output_tokens=4)
+        DailyUsage.objects.create(user=account, day=_yesterday(account), model_id=DEFAULT_MODEL,
+                                  input_tokens=5, output_tokens=6)
         expected_cost = (0.000000035 * 1) + (0.00000014 * 2)
         expected_cost += (0.00000006 * 3) + (0.00000024 * 4)
         assert account.user_account.cost_for_today() == (expected_cost, 4, 6)
+
+    def test_cost_of_a_removed_model_uses_default_prices(load_fixture):
+        account = User.objects.create()
+        DailyUsage.record(account, 'retired-model', input_tokens=1, output_tokens=2)
+        assert account.user_account.cost_for_today() == ((0.00000006 * 1) + (0.00000024 * 2), 1, 2)
+
+    def test_cost_is_one_query(load_fixture, django_assert_num_queries):
+        account = User.objects.create()
+        DailyUsage.record(account, 'us.amazon.nova-micro-v1:0', input_tokens=1, output_tokens=2)
+        DailyUsage.record(account, DEFAULT_MODEL, input_tokens=3, output_tokens=4)
+        get_catalog()
+        with django_assert_num_queries(1):
+            account.user_account.cost_for_today()
+
+    def describe_remaining_budget():
+        def it_is_seeded_from_the_ledger_once(load_fixture, django_assert_num_queries):
+            account = User.objects.create()
+            DailyUsage.record(account, DEFAULT_MODEL, input_tokens=1000, output_tokens=100)
+            spent = (0.00000006 * 1000) + (0.00000024 * 100)
+
+            assert account.user_account.remaining_budget() == round((MAX_COST_DAILY[0] - spent) * NANO_DOLLARS)
+            with django_assert_num_queries(0):
+                assert not account.user_account.over_limit()
+
+        def it_is_charged_for_each_reply(load_fixture):
+            account = User.objects.create()
+            before = account.user_account.remaining_budget()
+
+            account.user_account.charge(DEFAULT_MODEL, input_tokens=1000, output_tokens=100)
+
+            assert account.user_account.remaining_budget() == before - 84000
+
+        def it_is_reseeded_after_invalidation(load_fixture):
+            account = User.objects.create()
+            account.user_account.remaining_budget()
+            account.user_account.subscription_level = 2
+            account.user_account.invalidate_remaining_budget()
+
+            assert account.user_account.remaining_budget() == round(MAX_COST_DAILY[2] * NANO_DOLLARS)
+
+        def it_is_reset_when_the_timezone_changes(load_fixture):
+            account = User.objects.create_user(username='traveller', password='pass')
+            key = account.user_account.remaining_budget_key()
+            cache.set(key, 0)
+            client = APIClient()
+            client.force_authenticate(account)
+
+            client.get('/api/user', {'timezone': 'Asia/Tokyo'})
+
+            assert cache.get(key) is None
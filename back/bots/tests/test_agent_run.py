@@ -0,0 +1,75 @@
+from unittest.mock import MagicMock
+
+import pytest
+from django.contrib.auth.models import User
+from langchain_core.messages import AIMessage
+
+from bots.models import AgentRun, AgentStep, Chat
+
+
+@pytest.mark.django_db
+def describe_agent_run():
+    @pytest.fixture
+    def chat():
+        return Chat.objects.create(user=User.objects.create())
+
+    @pytest.fixture
+    def ai():
+        client = MagicMock()
+        client.bind_tools.return_value.invoke.side_effect = [
+            AIMessage(content="", tool_calls=[{"name": "unknown_tool", "args": {}, "id": "call_1"}],
+                      usage_metadata={"input_tokens": 10, "output_tokens": 2, "total_tokens": 12}),
+            AIMessage(content="Done!", usage_metadata={"input_tokens": 15, "output_tokens": 3, "total_tokens": 18}),
+        ]
+        return client
+
+    def it_records_model_and_tool_steps_for_a_reply(load_fixture, chat, ai):
+        chat.messages.create(text="Hello", role="user")
+        chat.get_response(ai=ai)
+
+        run = AgentRun.objects.get(chat=chat)
+        assert run.message == chat.messages.last()
+        assert run.iterations == 2
+        assert (run.input_tokens, run.output_tokens) == (25, 5)
+        assert list(run.steps.values_list('kind', 'name')) == [
+            (AgentStep.MODEL, "us.amazon.nova-2-lite-v1:0"),
+            (AgentStep.TOOL, "unknown_tool"),
+            (AgentStep.MODEL, "us.amazon.nova-2-lite-v1:0"),
+        ]
+        assert run.steps.get(kind=AgentStep.TOOL).result_size == len("Unknown tool: unknown_tool")
+
+    def it_counts_cache_tokens_as_input_like_the_reply(load_fixture, chat, ai):
+        # The invoke API leaves cache reads and writes out of input_tokens
+        ai.bind_tools.return_value.invoke.side_effect = None
+        ai.bind_tools.return_value.invoke.return_value = AIMessage(content="Hi", usage_metadata={
+            "input_tokens": 1, "output_tokens": 2, "total_tokens": 9,
+            "input_token_details": {"cache_read": 6, "cache_creation": 3},
+        })
+        chat.messages.create(text="Hello", role="user")
+        chat.get_response(ai=ai)
+
+        run = AgentRun.objects.get(chat=chat)
+        assert run.input_tokens == run.steps.get().input_tokens == chat.messages.last().input_tokens == 10
+
+    def it_records_failed_replies(load_fixture, chat, ai):
+        ai.bind_tools.return_value.invoke.side_effect = ValueError("throttled")
+        chat.messages.create(text="Hello", role="user")
+
+        with pytest.raises(ValueError):
+            chat.get_response(ai=ai)
+
+        run = AgentRun.objects.get(chat=chat)
+        assert run.error == "throttled"
+        assert run.steps.get().error == "throttled"
+
+    def it_summarizes_steps_in_the_admin(load_fixture, chat, ai, admin_client):
+        chat.messages.create(text="Hello", role="user")
+        chat.get_response(ai=ai)
+
+        response = admin_client.get('/admin/bots/agentstep/')
+
+        assert response.status_code == 200
+        assert {row['name']: row['calls'] for row in response.context['summary']} == {
+            "us.amazon.nova-2-lite-v1:0": 2,
+            "unknown_tool": 1,
+        }
@@ -0,0 +1,69 @@
+from unittest.mock import MagicMock
+
+import pytest
+from langchain_core.tools import tool
+
+from bots.models import AiModel
+from bots.services.ai_clients import AiClientRegistry, client_registry
+
+
+@tool
+def lookup(query: str) -> str:
+    """Look something up."""
+    return query
+
+
+@tool
+def other_lookup(query: str) -> str:
+    """Look something else up."""
+    return query
+
+
+def describe_ai_client_registry():
+    def _build_client(model_id):
+        client = MagicMock(name=model_id)
+        client.bind_tools.side_effect = lambda tools: MagicMock()
+        return client
+
+    @pytest.fixture
+    def factory():
+        return MagicMock(side_effect=_build_client)
+
+    @pytest.fixture
+    def registry(factory):
+        return AiClientRegistry(factory=factory)
+
+    def it_builds_one_client_per_model_id(registry, factory):
+        assert registry.get_client('model-a') is registry.get_client('model-a')
+        assert registry.get_client('model-a') is not registry.get_client('model-b')
+        assert factory.call_count == 2
+
+    def it_caches_bound_clients_per_tool_set(registry):
+        bound = registry.get_bound_client('model-a', [lookup])
+
+        assert registry.get_bound_client('model-a', [lookup]) is bound
+        assert registry.get_bound_client('model-a', [lookup, other_lookup]) is not bound
+        assert registry.get_client('model-a').bind_tools.call_count == 2
+
+    def it_rebuilds_clients_after_eviction(registry, factory):
+        client = registry.get_client('model-a')
+        registry.get_bound_client('model-a', [lookup])
+
+        registry.evict('model-a')
+
+        assert registry.get_client('model-a') is not client
+        assert registry.get_client('model-a').bind_tools.call_count == 0
+        registry.get_bound_client('model-a', [lookup])
+        assert registry.get_client('model-a').bind_tools.call_count == 1
+
+    @pytest.mark.django_db
+    def it_evicts_clients_when_an_ai_model_changes(monkeypatch):
+        monkeypatch.setattr(client_registry, 'evict', MagicMock())
+        ai_model = AiModel.objects.create(model_id='model-a')
+
+        ai_model.name = 'Renamed'
+        ai_model.save()
+        ai_model.delete()
+
+        assert client_registry.evict.call_count == 3
+        client_registry.evict.assert_called_with('model-a')
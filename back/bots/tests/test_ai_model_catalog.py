@@ -0,0 +1,55 @@
+import pytest
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from bots.models import AiModel, Bot
+from bots.services.ai_model_catalog import get_catalog
+
+
+@pytest.mark.django_db
+def describe_ai_model_catalog():
+    def it_looks_up_models(load_fixture):
+        catalog = get_catalog()
+
+        assert catalog.default.model_id == 'us.amazon.nova-2-lite-v1:0'
+        assert catalog.get('us.amazon.nova-micro-v1:0').name == 'Nova Micro'
+        assert catalog.get_by_pk(1).model_id == 'us.amazon.nova-micro-v1:0'
+        assert catalog.get('missing') is None
+
+    def it_serves_repeat_lookups_from_the_cache(load_fixture, django_assert_num_queries):
+        get_catalog()
+
+        with django_assert_num_queries(0):
+            assert get_catalog().default is not None
+
+    def it_is_invalidated_when_a_model_changes(load_fixture):
+        assert get_catalog().get('new-model') is None
+
+        ai_model = AiModel.objects.create(model_id='new-model', name='New')
+        assert get_catalog().get('new-model').name == 'New'
+
+        ai_model.delete()
+        assert get_catalog().get('new-model') is None
+
+    def it_resolves_bot_models_by_model_id(load_fixture):
+        user = User.objects.create_user(username='catalog', password='pass')
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+        get_catalog()
+
+        response = client.post('/api/bots.json', {'name': 'Bot', 'ai_model': 'us.amazon.nova-micro-v1:0'})
+
+        assert response.status_code == 201
+        assert response.json()['ai_model'] == 'us.amazon.nova-micro-v1:0'
+        assert Bot.objects.get(name='Bot').ai_model.model_id == 'us.amazon.nova-micro-v1:0'
+
+    def it_rejects_unknown_models(load_fixture):
+        user = User.objects.create_user(username='catalog', password='pass')
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+
+        response = client.post('/api/bots.json', {'name': 'Bot', 'ai_model': 'missing'})
+
+        assert response.status_code == 400
+        assert 'ai_model' in response.json()
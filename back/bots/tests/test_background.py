@@ -0,0 +1,18 @@
+import threading
+
+from bots.services.background import run_in_background
+
+
+def describe_run_in_background():
+    def it_runs_the_task_on_a_pool_thread():
+        threads = []
+        run_in_background(lambda: threads.append(threading.current_thread().name)).result()
+        assert threads[0].startswith('background')
+
+    def it_logs_failures_instead_of_raising(caplog):
+        def fail():
+            raise ValueError('boom')
+
+        assert run_in_background(fail).result() is None
+        assert 'Background task' in caplog.text
+        assert 'boom' in caplog.text
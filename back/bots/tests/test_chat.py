@@ -1,18 +1,25 @@
+import time
 import uuid
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+from asgiref.sync import async_to_sync
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.management import call_command
 from django.utils import timezone
-from langchain_core.messages import AIMessage
+from langchain_core.messages import AIMessage, AIMessageChunk, ToolMessage
 
 from bots.models.ai_model import AiModel
 from bots.models.bot import Bot
-from bots.models.chat import Chat
+from bots.models.chat import AiClientWrapper, Chat
+from bots.models.daily_usage import DailyUsage
 from bots.models.deck import Deck
 from bots.models.flashcard import Flashcard
 from bots.models.profile import Profile
+from bots.models.user_account import MAX_COST_DAILY, NANO_DOLLARS, UserAccount
+from bots.services.chat_agent import ChatAgentService
+from bots.services.deadline import Deadline
 
 
 @pytest.mark.django_db
@@ -98,6 +105,21 @@ def describe_chat_model():
             assert chat.messages.last().output_tokens == 2
             assert chat.ai.model_id == "my-custom-model"
 
+        def it_should_ignore_messages_sent_after_the_one_it_replies_to(load_fixture, chat, ai):
+            first = chat.messages.create(text="First", role="user")
+            chat.messages.create(text="Second", role="user")
+            chat.get_input()  # caches a window that already holds the second message
+            chat.get_response(ai=ai, reply_to=first)
+            messages = ai.bind_tools.return_value.invoke.call_args.args[0]
+            assert messages[-2].content[0]["text"] == "First"
+
+        def it_should_record_the_owner_and_model_on_the_reply(load_fixture, chat, ai):
+            chat.messages.create(text="Hello", role="user")
+            chat.get_response(ai=ai)
+            reply = chat.messages.last()
+            assert reply.user == chat.user
+            assert reply.ai_model == AiModel.objects.get(model_id="us.amazon.nova-2-lite-v1:0")
+
         def it_should_fall_back_to_default_model_when_bot_has_no_model_and_message_has_image(load_fixture, chat, ai):
             chat.bot = Bot(system_prompt="How can I help you?")
             chat.bot.save()
@@ -107,6 +129,169 @@ def describe_chat_model():
             assert chat.messages.last().text == "Hello! How can I assist you today?"
             assert chat.ai.model_id == "us.amazon.nova-2-lite-v1:0"
 
+        def it_should_record_cache_tokens(load_fixture, chat, ai):
+            ai.beta_use_converse_api = True
+            ai.bind_tools.return_value.invoke.return_value = AIMessage(
+                content="Hi",
+                usage_metadata={
+                    "input_tokens": 10,
+                    "output_tokens": 2,
+                    "total_tokens": 12,
+                    "input_token_details": {"cache_read": 6, "cache_creation": 3},
+                }
+            )
+            chat.messages.create(text="Hello", role="user")
+            chat.get_response(ai=ai)
+            message = chat.messages.last()
+            assert (message.cache_read_tokens, message.cache_write_tokens) == (6, 3)
+            assert (chat.cache_read_tokens, chat.cache_write_tokens) == (6, 3)
+            assert (message.input_tokens, chat.input_tokens) == (10, 10)
+
+        def it_should_count_cache_tokens_as_input_on_the_invoke_api(load_fixture, chat, ai):
+            # The invoke API leaves cache reads and writes out of input_tokens; Converse includes them
+            ai.bind_tools.return_value.invoke.return_value = AIMessage(
+                content="Hi",
+                usage_metadata={
+                    "input_tokens": 1,
+                    "output_tokens": 2,
+                    "total_tokens": 9,
+                    "input_token_details": {"cache_read": 6, "cache_creation": 3},
+                }
+            )
+            chat.messages.create(text="Hello", role="user")
+            chat.get_response(ai=ai)
+            message = chat.messages.last()
+            assert (message.input_tokens, message.cache_read_tokens, message.cache_write_tokens) == (10, 6, 3)
+            assert chat.input_tokens == 10
+            assert message.usage_breakdown[0]["input_tokens"] == 10
+            usage = chat.user.daily_usage.get()
+            assert (usage.input_tokens, usage.cache_read_tokens, usage.cache_write_tokens) == (10, 6, 3)
+            cost, _, _ = chat.user.user_account.cost_for_today()
+            assert cost == pytest.approx(0.00000006 * 10 + 0.00000024 * 2)
+
+        def it_should_mark_cache_points_when_the_model_supports_prompt_caching(load_fixture, chat, ai):
+            ai_model = AiModel.objects.get(is_default=True)
+            ai_model.supports_prompt_caching = True
+            ai_model.save()
+            ai.beta_use_converse_api = True
+            chat.messages.create(text="Hello", role="user")
+            chat.get_response(ai=ai)
+            messages, = ai.bind_tools.return_value.invoke.call_args.args
+            assert messages[0].content[-1] == {"cachePoint": {"type": "default"}}
+            assert ai.bind_tools.return_value.invoke.call_args.kwargs == {"cache_control": {"type": "ephemeral"}}
+
+        def it_should_keep_the_summary_out_of_the_cached_prefix(load_fixture, chat, ai):
+            ai_model = AiModel.objects.get(is_default=True)
+            ai_model.supports_prompt_caching = True
+            ai_model.save()
+            chat.summary = "They talked about cats."
+            chat.save()
+            chat.messages.create(text="Hello", role="user")
+            chat.get_response(ai=ai)
+            messages, = ai.bind_tools.return_value.invoke.call_args.args
+            prompt, summary = messages[0].content
+            assert prompt["cache_control"] == {"type": "ephemeral"}
+            assert "cats" not in prompt["text"]
+            assert summary == {"type": "text", "text": "Summary of the earlier conversation:\nThey talked about cats."}
+
+        def it_should_not_mark_cache_points_by_default(load_fixture, chat, ai):
+            chat.messages.create(text="Hello", role="user")
+            chat.get_response(ai=ai)
+            messages, = ai.bind_tools.return_value.invoke.call_args.args
+            assert isinstance(messages[0].content, str)
+            assert ai.bind_tools.return_value.invoke.call_args.kwargs == {}
+
+        def it_should_add_a_batch_of_flashcards_in_one_tool_call(load_fixture, chat, ai):
+            chat.profile = Profile.objects.create(user=chat.user)
+            chat.save()
+            deck = Deck.create_with_cards([{"front": "a", "back": "1"}], profile=chat.profile, name="Bio")
+            ai.bind_tools.return_value.invoke.side_effect = [
+                AIMessage(content="", tool_calls=[{
+                    "name": "add_flashcards",
+                    "args": {"deck_name": "Bio", "flashcards": [{"front": "b", "back": "2"}, {"front": "c", "back": "3"}]},
+                    "id": "call_1",
+                }]),
+                AIMessage(content="Added them!"),
+            ]
+            chat.messages.create(text="Add more cards", role="user")
+            assert chat.get_response(ai=ai) == "Added them!"
+            assert list(deck.flashcards.order_by('order').values_list('front', 'order')) == [("a", 0), ("b", 1), ("c", 2)]
+            tool_message = ai.bind_tools.return_value.invoke.call_args.args[0][-2]
+            assert tool_message.content.startswith("Added 2 flashcards to deck 'Bio' (cards 2-3)")
+
+        def it_should_meter_every_model_call_of_a_turn(load_fixture, chat, ai):
+            ai.bind_tools.return_value.invoke.side_effect = [
+                AIMessage(content="", tool_calls=[{"name": "web_search", "args": {"query": "x"}, "id": "call_1"}],
+                          usage_metadata={"input_tokens": 10, "output_tokens": 4, "total_tokens": 14}),
+                AIMessage(content="Done!", usage_metadata={"input_tokens": 20, "output_tokens": 6, "total_tokens": 26}),
+            ]
+            chat.messages.create(text="Hello", role="user")
+            chat.get_response(ai=ai)
+            message = chat.messages.last()
+            assert (message.input_tokens, message.output_tokens) == (30, 10)
+            assert (chat.input_tokens, chat.output_tokens) == (30, 10)
+            assert [(step["input_tokens"], step["tool_calls"]) for step in message.usage_breakdown] == [
+                (10, ["web_search"]),
+                (20, []),
+            ]
+
+        def it_should_force_a_final_answer_when_the_time_budget_runs_out(load_fixture, chat, ai, settings):
+            settings.AGENT_FINAL_ANSWER_RESERVE = 5
+            ai.invoke.return_value = AIMessage(content="Short answer.")
+            chat.messages.create(text="Hello", role="user")
+            assert chat.get_response(ai=ai, time_budget=1) == "Short answer."
+            ai.bind_tools.return_value.invoke.assert_not_called()
+            assert ai.invoke.call_args.args[0][-1].content.startswith("You are out of time for tools.")
+
+        def it_should_flatten_tool_results_when_the_time_budget_runs_out_after_a_tool_call(load_fixture, chat, ai, settings):
+            settings.TAVILY_API_KEY = "test-key"
+            chat.bot = Bot.objects.create(user=chat.user, name="Search Bot", enable_web_search=True)
+            chat.save()
+            ai.bind_tools.return_value.invoke.return_value = AIMessage(
+                content="", tool_calls=[{"name": "web_search", "args": {"query": "x"}, "id": "call_1"}]
+            )
+            ai.invoke.return_value = AIMessage(content="Short answer.")
+            chat.messages.create(text="Hello", role="user")
+            search = MagicMock(return_value="- Result: found it")
+            with patch('bots.services.chat_agent.web_search_cache.get_or_search', search), \
+                    patch.object(Deadline, 'expired', lambda self, reserve=0: search.called):
+                assert chat.get_response(ai=ai) == "Short answer."
+            ai.bind_tools.return_value.invoke.assert_called_once()
+            final_input = ai.invoke.call_args.args[0]
+            assert not any(isinstance(message, ToolMessage) or getattr(message, "tool_calls", None)
+                           for message in final_input)
+            assert final_input[-2].content[0]["text"] == "Hello"
+            assert final_input[-1].content.startswith(
+                'You called web_search with {"query": "x"}.\n\nweb_search returned:\n- Result: found it\n\n'
+                "You are out of time for tools."
+            )
+
+        def it_should_report_slow_tools_as_unavailable(load_fixture, chat, ai, settings):
+            settings.AGENT_FINAL_ANSWER_RESERVE = 0
+            settings.TAVILY_API_KEY = "test-key"
+            chat.bot = Bot.objects.create(user=chat.user, name="Search Bot", enable_web_search=True)
+            chat.save()
+            ai.bind_tools.return_value.invoke.side_effect = [
+                AIMessage(content="", tool_calls=[{"name": "web_search", "args": {"query": "x"}, "id": "call_1"}]),
+                AIMessage(content="Done!"),
+            ]
+            chat.messages.create(text="Hello", role="user")
+            slow_search = MagicMock(side_effect=lambda *args, **kwargs: time.sleep(0.5))
+            with patch('bots.services.chat_agent.web_search_cache.get_or_search', slow_search), \
+                    patch.object(ChatAgentService, '_tool_time_left', return_value=0.05):
+                chat.get_response(ai=ai)
+            tool_message = ai.bind_tools.return_value.invoke.call_args.args[0][-2]
+            assert tool_message.content == "web_search is unavailable: it did not finish in time."
+
+        def it_should_add_reply_tokens_to_todays_usage(load_fixture, chat, ai):
+            chat.messages.create(text="Hello", role="user")
+            chat.get_response(ai=ai)
+            chat.get_response(ai=ai)
+            usage = chat.user.daily_usage.get()
+            assert (usage.model_id, usage.day) == ('us.amazon.nova-2-lite-v1:0', chat.user.user_account.today())
+            assert (usage.input_tokens, usage.output_tokens) == (2, 4)
+            assert chat.user.user_account.remaining_budget() == round(MAX_COST_DAILY[0] * NANO_DOLLARS) - 2 * 540
+
         def it_should_roll_up_input_and_output_tokens_to_chat(load_fixture, chat, ai):
             chat.messages.create(text="Hello", role="user")
             chat.get_response(ai=ai)
@@ -114,24 +299,41 @@ def describe_chat_model():
             assert chat.input_tokens == 2
             assert chat.output_tokens == 4
 
+        def it_should_not_lose_token_counts_from_concurrent_turns(load_fixture, chat, ai):
+            chat.messages.create(text="Hello", role="user")
+            other_copy = Chat.objects.get(pk=chat.pk)
+            chat.get_response(ai=ai)
+            other_copy.get_response(ai=ai)
+            chat.refresh_from_db()
+            assert chat.input_tokens == 2
+            assert chat.output_tokens == 4
+
         def it_should_rate_limit_if_cost_goes_over_daily_limit(load_fixture, chat, ai):
-            chat.input_tokens = 142855
-            chat.output_tokens = 35715
-            chat.save()
+            DailyUsage.record(chat.user, 'us.amazon.nova-2-lite-v1:0', input_tokens=142855, output_tokens=35715)
             result = chat.get_response(ai=ai)
             assert result == "You have exceeded your daily limit. Please try again tomorrow or upgrade your subscription."
 
         def it_should_record_rate_limit_if_cost_goes_over_daily_limit(load_fixture, chat, ai):
-            chat.input_tokens = 14285500
-            chat.output_tokens = 3571500
+            DailyUsage.record(chat.user, 'us.amazon.nova-2-lite-v1:0', input_tokens=14285500, output_tokens=3571500)
             chat.user.user_account.subscription_level = 1
-            chat.save()
             chat.get_response(ai=ai)
             assert chat.user.user_account.usage_limit_hits.count() == 1
             assert chat.user.user_account.usage_limit_hits.first().total_input_tokens == 14285500
             assert chat.user.user_account.usage_limit_hits.first().total_output_tokens == 3571500
             assert chat.user.user_account.usage_limit_hits.first().subscription_level == 1
 
+        def it_should_count_repeated_blocked_requests_on_one_row(load_fixture, chat, ai):
+            DailyUsage.record(chat.user, 'us.amazon.nova-2-lite-v1:0', input_tokens=142855, output_tokens=35715)
+            chat.get_response(ai=ai)
+            with patch.object(UserAccount, 'cost_for_today') as cost_for_today:
+                chat.get_response(ai=ai)
+                chat.get_response(ai=ai)
+            cost_for_today.assert_not_called()
+            hit = chat.user.user_account.usage_limit_hits.get()
+            assert hit.hit_count == 3
+            assert hit.day == chat.user.user_account.today()
+            assert hit.modified_at > hit.created_at
+
         def it_should_not_use_web_search_when_disabled(load_fixture, chat, ai):
             bot = Bot.objects.create(
                 user=chat.user,
@@ -147,6 +349,282 @@ def describe_chat_model():
             
             assert result == "Hello! How can I assist you today?"
 
+    def describe_time_budget():
+        def it_should_use_the_bots_budget_over_the_default(settings):
+            settings.AGENT_TIME_BUDGET = 25
+            chat = Chat(bot=Bot(response_time_budget=10))
+            assert chat.time_budget() == 10
+
+        def it_should_let_the_client_shorten_the_budget(settings):
+            settings.AGENT_TIME_BUDGET = 25
+            assert Chat().time_budget(requested=5) == 5
+
+        def it_should_not_let_the_client_extend_the_budget(settings):
+            settings.AGENT_TIME_BUDGET = 25
+            assert Chat().time_budget(requested=600) == 25
+            assert Chat(bot=Bot(response_time_budget=10)).time_budget(requested=600) == 10
+
+        def it_should_use_the_requested_budget_when_the_server_has_none(settings):
+            settings.AGENT_TIME_BUDGET = 0
+            assert Chat().time_budget() is None
+            assert Chat().time_budget(requested=30) == 30
+
+    def describe_add_message():
+        def it_should_assign_increasing_order_positions():
+            chat = Chat.objects.create()
+            orders = [chat.add_message(text=str(i), role="user").order for i in range(3)]
+            assert orders == [0, 1, 2]
+            assert chat.next_message_order == 3
+
+        def it_should_copy_the_chat_owner():
+            chat = Chat.objects.create(user=User.objects.create())
+            assert chat.add_message(text="Hi", role="user").user == chat.user
+
+        def it_should_not_reuse_positions_from_a_stale_instance():
+            chat = Chat.objects.create()
+            stale_copy = Chat.objects.get(pk=chat.pk)
+            chat.add_message(text="first", role="user")
+            assert stale_copy.add_message(text="second", role="user").order == 1
+
+    def describe_get_input():
+        @pytest.fixture
+        def chat():
+            return Chat.objects.create(user=User.objects.create())
+
+        def it_should_fetch_each_image_once_across_turns(chat):
+            with patch.object(Chat, 'get_image_data', return_value='imagedata') as get_image_data:
+                chat.add_message(text="Look", role="user", image_filename="photo.jpg")
+                chat.get_input()
+                chat.add_message(text="Nice", role="assistant")
+                chat.add_message(text="What is it?", role="user")
+                message_list, contains_image = chat.get_input()
+            get_image_data.assert_called_once_with("photo.jpg")
+            assert contains_image
+            assert [message.content for message in message_list[2:]] == ["Nice", [{"type": "text", "text": "What is it?"}]]
+
+        def it_should_drop_the_oldest_messages_beyond_the_token_budget(chat):
+            for i in range(4):
+                chat.add_message(text=f"{i}" * 40, role="user")
+            chat.get_input(token_budget=30)
+            chat.add_message(text="4" * 40, role="user")
+            message_list, _ = chat.get_input(token_budget=30)
+            assert [message.content[0]["text"][0] for message in message_list[1:]] == ["3", "4"]
+
+        def it_should_keep_the_newest_message_even_if_it_exceeds_the_budget(chat):
+            chat.add_message(text="x" * 400, role="user")
+            message_list, _ = chat.get_input(token_budget=10)
+            assert len(message_list) == 2
+
+    def describe_update_summary():
+        @pytest.fixture
+        def chat():
+            return Chat.objects.create(user=User.objects.create())
+
+        @pytest.fixture
+        def summarizer():
+            summarizer = MagicMock()
+            summarizer.invoke.return_value = AIMessage(
+                content="They talked about cats.",
+                usage_metadata={"input_tokens": 5, "output_tokens": 7, "total_tokens": 12}
+            )
+            return summarizer
+
+        def _prepare(chat, summarizer, token_budget):
+            chat.get_input(token_budget=token_budget)
+            chat.ai = AiClientWrapper(model_id='us.amazon.nova-2-lite-v1:0', client=summarizer)
+
+        def it_should_fold_messages_outside_the_window_into_the_summary(chat, summarizer):
+            chat.add_message(text="I like cats " * 10, role="user")
+            reply = chat.add_message(text="Cats are great " * 10, role="assistant")
+            chat.add_message(text="Tell me more", role="user")
+            _prepare(chat, summarizer, token_budget=20)
+            chat.update_summary()
+            chat.refresh_from_db()
+            assert chat.summary == "They talked about cats."
+            assert chat.summary_message_id == reply.id
+            assert chat.input_tokens == 5
+            assert chat.output_tokens == 7
+            assert (chat.user.daily_usage.get().input_tokens, chat.user.daily_usage.get().output_tokens) == (5, 7)
+            assert "They talked about cats." in chat.get_system_message()
+
+        def it_should_only_fold_new_overflow_on_later_turns(chat, summarizer):
+            chat.add_message(text="I like cats " * 10, role="user")
+            chat.add_message(text="Tell me more", role="user")
+            _prepare(chat, summarizer, token_budget=20)
+            chat.update_summary()
+            chat.update_summary()
+            assert summarizer.invoke.call_count == 1
+
+        def it_should_update_the_summary_after_the_reply_off_the_request_path(load_fixture, chat, summarizer):
+            chat.add_message(text="I like cats " * 10, role="user")
+            chat.add_message(text="Cats are great " * 10, role="assistant")
+            chat.add_message(text="Tell me more", role="user")
+            summarizer.bind_tools.return_value.invoke.return_value = AIMessage(content="More cats.")
+            with patch.object(Chat, 'context_token_budget', return_value=20), \
+                    patch('bots.models.chat.run_in_background') as run_in_background:
+                assert chat.get_response(ai=summarizer) == "More cats."
+            summarizer.invoke.assert_not_called()
+            run_in_background.assert_called_once_with(Chat.update_summary_for, chat.pk, chat.window_start_id, chat.ai)
+
+        def it_should_skip_a_fold_while_another_is_running_for_the_chat(chat, summarizer):
+            chat.add_message(text="I like cats " * 10, role="user")
+            chat.add_message(text="Tell me more", role="user")
+            _prepare(chat, summarizer, token_budget=20)
+            cache.add(f'summary_update:{chat.pk}', True)
+            Chat.update_summary_for(chat.pk, chat.window_start_id, chat.ai)
+            summarizer.invoke.assert_not_called()
+            cache.delete(f'summary_update:{chat.pk}')
+            Chat.update_summary_for(chat.pk, chat.window_start_id, chat.ai)
+            chat.refresh_from_db()
+            assert chat.summary == "They talked about cats."
+
+        def it_should_not_summarize_when_everything_fits(chat, summarizer):
+            chat.add_message(text="Hello", role="user")
+            _prepare(chat, summarizer, token_budget=1000)
+            chat.update_summary()
+            summarizer.invoke.assert_not_called()
+            assert chat.summary == ""
+
+    def describe_aget_response():
+        @pytest.fixture
+        def chat():
+            return Chat.objects.create(user=User.objects.create())
+
+        @pytest.fixture
+        def ai():
+            client = MagicMock()
+            client.bind_tools.return_value.ainvoke = AsyncMock(return_value=AIMessage(
+                content="Hello! How can I assist you today?",
+                usage_metadata={"input_tokens": 1, "output_tokens": 2, "total_tokens": 3}
+            ))
+            return client
+
+        def it_should_add_message_from_ai(load_fixture, chat, ai):
+            chat.messages.create(text="Hello", role="user")
+            result = async_to_sync(chat.aget_response)(ai=ai)
+            assert result == "Hello! How can I assist you today?"
+            assert chat.messages.last().role == "assistant"
+            assert chat.messages.last().output_tokens == 2
+            assert chat.output_tokens == 2
+
+        def it_should_use_model_from_bot(chat, ai):
+            ai_model = AiModel.objects.create(model_id="my-custom-model")
+            chat.bot = Bot.objects.create(ai_model=ai_model, system_prompt="Be brief.")
+            chat.save()
+            chat.messages.create(text="Hello", role="user")
+            async_to_sync(chat.aget_response)(ai=ai)
+            assert chat.ai.model_id == "my-custom-model"
+            system_message = ai.bind_tools.return_value.ainvoke.call_args.args[0][0]
+            assert system_message.content == "Be brief."
+
+        def it_should_run_flashcard_tools_in_a_sync_context(load_fixture, chat, ai):
+            chat.profile = Profile.objects.create(user=chat.user)
+            chat.save()
+            ai.bind_tools.return_value.ainvoke.side_effect = [
+                AIMessage(content="", tool_calls=[{
+                    "name": "create_flashcard_deck",
+                    "args": {"name": "Bio", "flashcards": [{"front": "a", "back": "b"}]},
+                    "id": "call_1",
+                }]),
+                AIMessage(content="Done!"),
+            ]
+            chat.messages.create(text="Make flashcards", role="user")
+            assert async_to_sync(chat.aget_response)(ai=ai) == "Done!"
+            assert Deck.objects.get(name="Bio").flashcards.count() == 1
+
+    def describe_stream_response():
+        @pytest.fixture
+        def chat():
+            return Chat.objects.create(user=User.objects.create())
+
+        @pytest.fixture
+        def ai():
+            client = MagicMock()
+            client.bind_tools.return_value.stream.return_value = iter([
+                AIMessageChunk(content="Hello"),
+                AIMessageChunk(content=" there!", usage_metadata={
+                    "input_tokens": 3,
+                    "output_tokens": 4,
+                    "total_tokens": 7
+                }),
+            ])
+            return client
+
+        def it_should_yield_tokens_as_they_arrive(load_fixture, chat, ai):
+            chat.messages.create(text="Hello", role="user")
+            events = list(chat.stream_response(ai=ai))
+            assert events[:2] == [("token", {"text": "Hello"}), ("token", {"text": " there!"})]
+
+        def it_should_save_the_final_message_with_usage(load_fixture, chat, ai):
+            chat.messages.create(text="Hello", role="user")
+            event, data = list(chat.stream_response(ai=ai))[-1]
+            message = chat.messages.last()
+            assert event == "done"
+            assert data["message_id"] == str(message.message_id)
+            assert message.text == "Hello there!"
+            assert message.role == "assistant"
+            assert message.input_tokens == 3
+            assert message.output_tokens == 4
+            assert chat.input_tokens == 3
+
+        def it_should_schedule_the_summary_update_before_the_done_event(load_fixture, chat, ai):
+            chat.messages.create(text="Hello", role="user")
+            events = chat.stream_response(ai=ai)
+            with patch.object(Chat, 'schedule_summary_update') as schedule_summary_update:
+                next(event for event in events if event[0] == "done")
+                events.close()
+            schedule_summary_update.assert_called_once()
+
+        def it_should_report_tool_progress(load_fixture, chat, ai):
+            tool_call = AIMessageChunk(content="", tool_call_chunks=[{
+                "name": "create_flashcard_deck",
+                "args": '{"name": "Bio", "flashcards": [{"front": "a", "back": "b"}]}',
+                "id": "call_1",
+                "index": 0,
+            }])
+            ai.bind_tools.return_value.stream.side_effect = [
+                iter([tool_call]),
+                iter([AIMessageChunk(content="Done!")]),
+            ]
+            chat.messages.create(text="Make flashcards", role="user")
+            events = list(chat.stream_response(ai=ai))
+            assert ("tool", {"name": "create_flashcard_deck", "status": "Creating deck"}) in events
+            assert events[-1][1]["response"] == "Done!"
+
+        def it_should_reset_text_streamed_before_a_tool_call(load_fixture, chat, ai):
+            tool_call = AIMessageChunk(content="", tool_call_chunks=[{
+                "name": "create_flashcard_deck",
+                "args": '{"name": "Bio", "flashcards": [{"front": "a", "back": "b"}]}',
+                "id": "call_1",
+                "index": 0,
+            }])
+            ai.bind_tools.return_value.stream.side_effect = [
+                iter([AIMessageChunk(content="Let me make those."), tool_call]),
+                iter([AIMessageChunk(content="Done!")]),
+            ]
+            chat.messages.create(text="Make flashcards", role="user")
+            events = [(event, data) for event, data in chat.stream_response(ai=ai) if event != "tool"]
+            assert events[:3] == [
+                ("token", {"text": "Let me make those."}),
+                ("reset", {}),
+                ("token", {"text": "Done!"}),
+            ]
+            assert events[-1][1]["response"] == chat.messages.last().text == "Done!"
+
+
+@pytest.mark.django_db
+def describe_create_with_cards():
+    def it_should_create_the_deck_and_cards_in_order():
+        profile = Profile.objects.create(user=User.objects.create())
+        deck = Deck.create_with_cards([{"front": "a", "back": "1"}, {"front": "b", "back": "2"}], profile=profile, name="Bio")
+        assert list(deck.flashcards.order_by('order').values_list('front', 'order')) == [("a", 0), ("b", 1)]
+
+    def it_should_not_create_anything_when_a_card_is_invalid():
+        profile = Profile.objects.create(user=User.objects.create())
+        with pytest.raises(ValueError):
+            Deck.create_with_cards([{"front": "a", "back": "1"}, {"front": ""}], profile=profile, name="Bio")
+        assert not Deck.objects.filter(name="Bio").exists()
+
 
 @pytest.mark.django_db
 def test_flashcard_order_increments():
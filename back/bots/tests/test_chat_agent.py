@@ -0,0 +1,110 @@
+import asyncio
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from langchain_core.tools import StructuredTool
+
+from bots.models import Bot, Chat
+from bots.services.chat_agent import ChatAgentService
+from bots.services.fake_chat_model import FakeChatModel
+from bots.services.search_client import search_clients
+
+
+def _tool_call(name, query, call_id):
+    return {"name": name, "args": {"query": query}, "id": call_id}
+
+
+def describe_invoke_tools():
+    def it_runs_web_searches_concurrently_and_keeps_call_order():
+        # Both searches must be running at once to get past the barrier
+        barrier = threading.Barrier(2, timeout=5)
+
+        def web_search(query: str) -> str:
+            """Search."""
+            barrier.wait()
+            return f"results for {query}"
+
+        def create_flashcard_deck(query: str) -> str:
+            """Create a deck."""
+            return f"deck {query}"
+
+        tools = {
+            "web_search": StructuredTool.from_function(web_search),
+            "create_flashcard_deck": StructuredTool.from_function(create_flashcard_deck),
+        }
+        tool_calls = [
+            _tool_call("web_search", "a", "1"),
+            _tool_call("create_flashcard_deck", "b", "2"),
+            _tool_call("web_search", "c", "3"),
+        ]
+
+        results = ChatAgentService(MagicMock(), MagicMock())._invoke_tools(tool_calls, tools)
+
+        assert results == ["results for a", "deck b", "results for c"]
+
+    def it_awaits_web_searches_concurrently_on_the_async_path():
+        barrier = asyncio.Barrier(2)
+
+        async def aweb_search(query: str) -> str:
+            """Search."""
+            await asyncio.wait_for(barrier.wait(), timeout=5)
+            return f"results for {query}"
+
+        tools = {"web_search": StructuredTool.from_function(func=None, coroutine=aweb_search, name="web_search")}
+        tool_calls = [_tool_call("web_search", "a", "1"), _tool_call("web_search", "b", "2")]
+
+        results = async_to_sync(ChatAgentService(MagicMock(), MagicMock())._ainvoke_tools)(tool_calls, tools)
+
+        assert results == ["results for a", "results for b"]
+
+
+@pytest.mark.django_db
+def describe_speculative_web_search():
+    @pytest.fixture
+    def tavily(settings):
+        settings.TAVILY_API_KEY = "test-key"
+        client = MagicMock()
+        client.search.return_value = {"results": [{"title": "Argentina", "url": "https://example.com", "content": "Won"}]}
+        with patch.object(search_clients, "get", return_value=client):
+            yield client
+
+    @pytest.fixture
+    def chat(load_fixture):
+        user = User.objects.create()
+        bot = Bot.objects.create(user=user, name="Sports", enable_web_search=True, speculative_web_search=True)
+        chat = Chat.objects.create(user=user, bot=bot)
+        chat.messages.create(text="Who won the World Cup in 2022?", role="user")
+        return chat
+
+    def _model(query):
+        return FakeChatModel(script=[
+            {"tool_calls": [{"name": "web_search", "args": {"query": query}}]},
+            {"content": "Argentina won."},
+        ])
+
+    def it_answers_a_similar_web_search_from_the_users_question(chat, tavily):
+        with patch.object(ChatAgentService, "_tool_message", wraps=ChatAgentService._tool_message) as tool_message:
+            assert chat.get_response(ai=_model("2022 World Cup winner")) == "Argentina won."
+
+        tavily.search.assert_called_once_with(query="Who won the World Cup in 2022?")
+        tool_call, tool_result = tool_message.call_args.args
+        assert tool_call["args"] == {"query": "2022 World Cup winner"}
+        assert "Argentina" in tool_result
+
+    def it_searches_again_when_the_model_asks_something_else(chat, tavily):
+        chat.get_response(ai=_model("Eiffel tower height"))
+
+        assert [call.kwargs["query"] for call in tavily.search.call_args_list] == [
+            "Who won the World Cup in 2022?", "Eiffel tower height",
+        ]
+
+    def it_does_not_speculate_unless_the_bot_opts_in(chat, tavily):
+        chat.bot.speculative_web_search = False
+        chat.bot.save()
+
+        chat.get_response(ai=_model("2022 World Cup winner"))
+
+        tavily.search.assert_called_once_with(query="2022 World Cup winner")
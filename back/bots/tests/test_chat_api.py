@@ -0,0 +1,188 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from django.contrib.auth.models import User
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from bots.models import Chat, IdempotencyKey
+
+
+@pytest.fixture
+def user(db):
+    return User.objects.create_user(username='chatuser', email='chat@example.com', password='pass')
+
+
+@pytest.fixture
+def client(user):
+    client = APIClient()
+    refresh = RefreshToken.for_user(user)
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+    return client
+
+
+@pytest.mark.django_db
+def describe_stream_chat_response():
+    def it_streams_events_as_server_sent_events(client, user):
+        chat = Chat.objects.create(user=user, title='Chat')
+        events = iter([('token', {'text': 'Hi'}), ('done', {'response': 'Hi'})])
+
+        with patch.object(Chat, 'stream_response', return_value=events):
+            response = client.post(f'/api/chats/{chat.chat_id}/stream', {'message': 'hello'})
+            body = b''.join(response.streaming_content).decode()
+
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'text/event-stream'
+        assert body == 'event: token\ndata: {"text": "Hi"}\n\nevent: done\ndata: {"response": "Hi"}\n\n'
+        assert chat.messages.get(role='user').text == 'hello'
+
+    def it_reports_failures_as_an_error_event(client, user):
+        chat = Chat.objects.create(user=user, title='Chat')
+
+        def failing_stream():
+            yield 'token', {'text': 'Hi'}
+            raise ValueError('boom')
+
+        with patch.object(Chat, 'stream_response', return_value=failing_stream()):
+            response = client.post(f'/api/chats/{chat.chat_id}/stream', {'message': 'hello'})
+            body = b''.join(response.streaming_content).decode()
+
+        assert body.endswith('event: error\ndata: {"error": "Unable to get response: boom"}\n\n')
+
+    def it_returns_404_for_another_users_chat(client):
+        other = User.objects.create_user(username='other', password='pass')
+        chat = Chat.objects.create(user=other, title='Chat')
+
+        response = client.post(f'/api/chats/{chat.chat_id}/stream', {'message': 'hello'})
+
+        assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def describe_aget_chat_response():
+    def it_responds_to_authenticated_users(client, user):
+        chat = Chat.objects.create(user=user, title='Chat')
+
+        with patch.object(Chat, 'aget_response', return_value='Hi there', autospec=True) as aget_response:
+            response = client.post(f'/api/chats/{chat.chat_id}/async', {'message': 'hello'})
+
+        assert response.status_code == 200
+        assert response.json() == {'response': 'Hi there', 'chat_id': str(chat.chat_id)}
+        assert chat.messages.get(role='user').text == 'hello'
+        aget_response.assert_called_once()
+
+    def it_creates_new_chats(client, user):
+        with patch.object(Chat, 'aget_response', return_value='Hi there', autospec=True):
+            response = client.post('/api/chats/new/async', {'message': 'hello'})
+
+        chat = Chat.objects.get(user=user)
+        assert response.status_code == 200
+        assert chat.title == 'hello'
+        assert list(chat.messages.values_list('role', 'order')) == [('system', 0), ('user', 1)]
+
+    @pytest.mark.parametrize('method', ['put', 'patch', 'delete'])
+    def it_only_accepts_get_and_post(client, user, method):
+        chat = Chat.objects.create(user=user, title='Chat')
+
+        with patch.object(Chat, 'aget_response', autospec=True) as aget_response:
+            response = getattr(client, method)(f'/api/chats/{chat.chat_id}/async')
+
+        assert response.status_code == 405
+        assert chat.messages.count() == 0
+        aget_response.assert_not_called()
+
+    def it_rejects_anonymous_requests():
+        response = APIClient().post('/api/chats/new/async', {'message': 'hello'})
+
+        assert response.status_code == 401
+        assert Chat.objects.count() == 0
+
+    def it_returns_404_for_another_users_chat(client):
+        other = User.objects.create_user(username='other', password='pass')
+        chat = Chat.objects.create(user=other, title='Chat')
+
+        response = client.post(f'/api/chats/{chat.chat_id}/async', {'message': 'hello'})
+
+        assert response.status_code == 404
+        assert chat.messages.count() == 0
+
+
+@pytest.mark.django_db
+def describe_idempotent_chat_response():
+    def it_replays_the_stored_response_to_a_retry(client, user):
+        chat = Chat.objects.create(user=user, title='Chat')
+
+        with patch.object(Chat, 'get_response', return_value='Hi there') as get_response:
+            first = client.post(f'/api/chats/{chat.chat_id}', {'message': 'hello'}, HTTP_IDEMPOTENCY_KEY='abc')
+            retry = client.post(f'/api/chats/{chat.chat_id}', {'message': 'hello'}, HTTP_IDEMPOTENCY_KEY='abc')
+
+        assert retry.status_code == 200
+        assert retry.json() == first.json() == {'response': 'Hi there', 'chat_id': str(chat.chat_id)}
+        assert retry['Idempotent-Replayed'] == 'true'
+        assert chat.messages.filter(role='user').count() == 1
+        get_response.assert_called_once()
+
+    def it_rejects_a_key_reused_for_a_different_request(client, user):
+        chat = Chat.objects.create(user=user, title='Chat')
+
+        with patch.object(Chat, 'get_response', return_value='Hi there'):
+            client.post(f'/api/chats/{chat.chat_id}', {'message': 'hello'}, HTTP_IDEMPOTENCY_KEY='abc')
+            response = client.post(f'/api/chats/{chat.chat_id}', {'message': 'bye'}, HTTP_IDEMPOTENCY_KEY='abc')
+
+        assert response.status_code == 422
+
+    def it_runs_a_retry_again_when_the_original_failed(client, user):
+        chat = Chat.objects.create(user=user, title='Chat')
+
+        with patch.object(Chat, 'get_response', side_effect=[ValueError('boom'), 'Hi there']):
+            with pytest.raises(ValueError):
+                client.post(f'/api/chats/{chat.chat_id}', {'message': 'hello'}, HTTP_IDEMPOTENCY_KEY='abc')
+            retry = client.post(f'/api/chats/{chat.chat_id}', {'message': 'hello'}, HTTP_IDEMPOTENCY_KEY='abc')
+
+        assert retry.json()['response'] == 'Hi there'
+        assert chat.messages.filter(role='user').count() == 1
+
+    def it_answers_the_stored_message_when_retrying_a_failed_new_chat(client, user):
+        with patch.object(Chat, 'get_response', side_effect=[ValueError('boom'), 'Hi there']) as get_response:
+            with pytest.raises(ValueError):
+                client.post('/api/chats/new', {'message': 'hello'}, HTTP_IDEMPOTENCY_KEY='abc')
+            retry = client.post('/api/chats/new', {'message': 'hello'}, HTTP_IDEMPOTENCY_KEY='abc')
+
+        chat = Chat.objects.get(user=user)
+        message = chat.messages.get(role='user')
+        assert retry.json() == {'response': 'Hi there', 'chat_id': str(chat.chat_id)}
+        assert get_response.call_args.kwargs['reply_to'] == message
+
+    def it_reuses_the_message_of_an_abandoned_original(client, user, settings):
+        chat = Chat.objects.create(user=user, title='Chat')
+
+        def die(**kwargs):
+            raise SystemExit  # the worker died mid-turn, so the key was never marked failed
+
+        with patch.object(Chat, 'get_response', side_effect=die), pytest.raises(SystemExit):
+            client.post(f'/api/chats/{chat.chat_id}', {'message': 'hello'}, HTTP_IDEMPOTENCY_KEY='abc')
+        IdempotencyKey.objects.update(modified_at=timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT + 1))
+
+        with patch.object(Chat, 'get_response', return_value='Hi there'):
+            retry = client.post(f'/api/chats/{chat.chat_id}', {'message': 'hello'}, HTTP_IDEMPOTENCY_KEY='abc')
+
+        assert retry.json()['response'] == 'Hi there'
+        assert chat.messages.filter(role='user').count() == 1
+
+    def it_does_not_run_a_retry_while_the_original_is_in_flight(client, user, settings):
+        settings.IDEMPOTENCY_MAX_WAIT = 0
+        chat = Chat.objects.create(user=user, title='Chat')
+        retries = []
+
+        def respond_while_retried(**kwargs):
+            retries.append(client.post(f'/api/chats/{chat.chat_id}', {'message': 'hello'}, HTTP_IDEMPOTENCY_KEY='abc'))
+            return 'Hi there'
+
+        with patch.object(Chat, 'get_response', side_effect=respond_while_retried) as get_response:
+            client.post(f'/api/chats/{chat.chat_id}', {'message': 'hello'}, HTTP_IDEMPOTENCY_KEY='abc')
+
+        assert retries[0].status_code == 409
+        assert chat.messages.filter(role='user').count() == 1
+        get_response.assert_called_once()
@@ -0,0 +1,166 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from bots.models import Chat, ChatJob
+
+
+@pytest.fixture
+def user(db):
+    return User.objects.create_user(username='jobuser', email='job@example.com', password='pass')
+
+
+@pytest.fixture
+def client(user):
+    client = APIClient()
+    refresh = RefreshToken.for_user(user)
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+    return client
+
+
+@pytest.fixture
+def chat(user):
+    return Chat.objects.create(user=user, title='Chat')
+
+
+def enqueue(chat, text='hello'):
+    return ChatJob.enqueue(chat, chat.messages.create(text=text, role='user'))
+
+
+@pytest.mark.django_db
+def describe_chat_job():
+    def describe_claim_next():
+        def it_claims_the_oldest_queued_job(chat):
+            first = enqueue(chat)
+            enqueue(Chat.objects.create(user=chat.user))
+
+            job = ChatJob.claim_next()
+
+            assert job == first
+            assert job.status == ChatJob.RUNNING
+            assert job.attempts == 1
+            assert job.locked_at is not None
+
+        def it_returns_none_when_the_queue_is_empty():
+            assert ChatJob.claim_next() is None
+
+        def it_does_not_run_two_jobs_for_the_same_chat(chat):
+            enqueue(chat)
+            enqueue(chat)
+
+            assert ChatJob.claim_next() is not None
+            assert ChatJob.claim_next() is None
+
+        def it_does_not_claim_a_job_when_another_worker_claims_the_same_chat_first(chat):
+            first = enqueue(chat)
+            second = enqueue(chat, 'are you there?')
+
+            def other_worker_claims(chat_id):
+                ChatJob.objects.filter(pk=second.pk).update(status=ChatJob.RUNNING, locked_at=timezone.now())
+
+            with patch.object(ChatJob, '_lock_chat', side_effect=other_worker_claims):
+                assert ChatJob.claim_next() is None
+            first.refresh_from_db()
+            assert first.status == ChatJob.QUEUED
+
+        def it_reclaims_jobs_whose_lock_went_stale(chat):
+            job = enqueue(chat)
+            ChatJob.objects.filter(pk=job.pk).update(
+                status=ChatJob.RUNNING, locked_at=timezone.now() - timedelta(hours=1), attempts=1)
+
+            assert ChatJob.claim_next() == job
+
+        @override_settings(CHAT_JOB_MAX_ATTEMPTS=2)
+        def it_fails_stale_jobs_that_used_all_their_attempts(chat):
+            job = enqueue(chat)
+            ChatJob.objects.filter(pk=job.pk).update(
+                status=ChatJob.RUNNING, locked_at=timezone.now() - timedelta(hours=1), attempts=2)
+
+            assert ChatJob.claim_next() is None
+            job.refresh_from_db()
+            assert job.status == ChatJob.FAILED
+            assert job.error == 'The worker stopped responding on every attempt'
+            assert job.locked_at is None
+
+    def describe_run():
+        def it_stores_the_response(chat):
+            enqueue(chat)
+            job = ChatJob.claim_next()
+
+            with patch.object(Chat, 'get_response', return_value='Hi there'):
+                job.run()
+
+            job.refresh_from_db()
+            assert job.status == ChatJob.DONE
+            assert job.response == 'Hi there'
+            assert job.locked_at is None
+
+        def it_answers_its_own_message(chat):
+            first = enqueue(chat, 'first')
+            enqueue(chat, 'second')
+            job = ChatJob.claim_next()
+
+            with patch.object(Chat, 'get_response', return_value='Hi there') as get_response:
+                job.run()
+
+            assert job == first
+            get_response.assert_called_once_with(reply_to=first.message)
+
+        @override_settings(CHAT_JOB_MAX_ATTEMPTS=2)
+        def it_requeues_failed_jobs_until_attempts_run_out(chat):
+            enqueue(chat)
+
+            with patch.object(Chat, 'get_response', side_effect=ValueError('boom')):
+                ChatJob.claim_next().run()
+                assert ChatJob.objects.get().status == ChatJob.QUEUED
+                ChatJob.claim_next().run()
+
+            job = ChatJob.objects.get()
+            assert job.status == ChatJob.FAILED
+            assert job.error == 'boom'
+
+
+@pytest.mark.django_db
+def describe_background_chat_response():
+    def it_queues_a_job_when_the_client_prefers_async(client, chat):
+        with patch.object(Chat, 'get_response') as get_response:
+            response = client.post(f'/api/chats/{chat.chat_id}', {'message': 'hello'}, HTTP_PREFER='respond-async')
+
+        job = ChatJob.objects.get()
+        assert response.status_code == 202
+        assert response.json()['job_id'] == str(job.job_id)
+        assert response.json()['message_id'] == str(job.message.message_id)
+        assert response['Location'] == f'/api/jobs/{job.job_id}'
+        get_response.assert_not_called()
+
+    def it_returns_the_job_result(client, chat):
+        job = enqueue(chat)
+        ChatJob.objects.filter(pk=job.pk).update(status=ChatJob.DONE, response='Hi there')
+
+        response = client.get(f'/api/jobs/{job.job_id}?wait=5')
+
+        assert response.status_code == 200
+        assert response.json()['status'] == 'done'
+        assert response.json()['response'] == 'Hi there'
+
+    def it_hides_other_users_jobs(client):
+        other = User.objects.create_user(username='other', password='pass')
+        job = enqueue(Chat.objects.create(user=other))
+
+        assert client.get(f'/api/jobs/{job.job_id}').status_code == 404
+
+    def it_processes_jobs_with_the_worker_command(chat):
+        enqueue(chat)
+        enqueue(Chat.objects.create(user=chat.user))
+
+        with patch.object(Chat, 'get_response', return_value='Hi there'):
+            call_command('process_chat_jobs', once=True, concurrency=1)
+
+        assert list(ChatJob.objects.values_list('status', flat=True)) == [ChatJob.DONE, ChatJob.DONE]
@@ -0,0 +1,54 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from bots.services.context_cache import ConversationContext, ConversationContextCache
+
+
+def _context(message_id, text="hi", image=None):
+    message = SimpleNamespace(id=message_id, text=text, image_filename="photo.jpg" if image else None)
+    return ConversationContext([(message, None)], {"photo.jpg": image} if image else {})
+
+
+def describe_conversation_context_cache():
+    def it_should_evict_the_least_recently_used_chat():
+        cache = ConversationContextCache(max_chats=2, max_bytes=1000)
+        cache.put("a", _context(1))
+        cache.put("b", _context(2))
+        cache.get("a")
+        cache.put("c", _context(3))
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.get("c") is not None
+
+    def it_should_evict_to_stay_under_the_byte_limit():
+        cache = ConversationContextCache(max_chats=10, max_bytes=100)
+        cache.put("a", _context(1, image="x" * 60))
+        cache.put("b", _context(2, image="y" * 60))
+        assert cache.get("a") is None
+        assert len(cache) == 1
+
+    def it_should_replace_an_existing_entry():
+        cache = ConversationContextCache(max_chats=10, max_bytes=100)
+        cache.put("a", _context(1, image="x" * 60))
+        cache.put("a", _context(2, image="x" * 60))
+        assert cache.get("a").last_message_id == 2
+        assert len(cache) == 1
+
+
+def describe_conversation_context():
+    def it_should_fit_the_newest_messages_into_the_budget():
+        context = _context(1, text="x" * 40)
+        message = SimpleNamespace(id=2, text="y" * 40, image_filename=None)
+        assert context.fit([message], token_budget=20) == [message]
+
+    def it_should_reuse_cached_conversions_and_drop_images_that_leave_the_window():
+        context = ConversationContext(
+            [(SimpleNamespace(id=1, text="hi", image_filename="photo.jpg"), "cached")], {"photo.jpg": "data"}
+        )
+        kept = SimpleNamespace(id=2, text="next", image_filename=None)
+        convert = MagicMock(return_value="converted")
+        extended = context.extend([kept], {"photo.jpg": "data"}, token_budget=20, convert=convert)
+        assert extended.window == [(kept, "converted")]
+        assert extended.images == {}
+        assert context.images == {"photo.jpg": "data"}
+        assert context.extend([context.window[0][0]], {"photo.jpg": "data"}, 20, convert).window[0][1] == "cached"
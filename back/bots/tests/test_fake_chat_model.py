@@ -0,0 +1,100 @@
+import json
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.tools import tool
+
+from bots.models import Chat, Deck, Profile
+from bots.services.ai_clients import build_client
+from bots.services.fake_chat_model import FakeChatModel
+
+
+@tool
+def lookup(query: str) -> str:
+    """Look something up."""
+    return query
+
+
+def describe_fake_chat_model():
+    @pytest.fixture
+    def messages():
+        return [SystemMessage(content="Be brief."), HumanMessage(content="Tell me about volcanoes")]
+
+    def it_replies_the_same_way_to_the_same_conversation(messages):
+        reply = FakeChatModel(seed=1).invoke(messages)
+
+        assert FakeChatModel(seed=1).invoke(messages).content == reply.content
+        assert FakeChatModel(seed=2).invoke(messages).content != reply.content
+
+    def it_reports_usage_for_the_conversation(messages):
+        reply = FakeChatModel(output_tokens=12, output_tokens_jitter=0).invoke(messages)
+
+        assert reply.usage_metadata["output_tokens"] == 12
+        assert len(reply.content.split(" ")) == 12
+        assert reply.usage_metadata["input_tokens"] == 3 + 6
+        assert reply.usage_metadata["total_tokens"] == 21
+
+    def it_plays_scripted_tool_calls_for_bound_tools(messages):
+        model = FakeChatModel(script=[{"tool_calls": [{"name": "lookup", "args": {"query": "volcano"}}]}])
+
+        reply = model.bind_tools([lookup]).invoke(messages)
+
+        assert reply.tool_calls[0]["name"] == "lookup"
+        assert reply.tool_calls[0]["args"] == {"query": "volcano"}
+        assert model.invoke(messages).tool_calls == []
+
+    def it_streams_the_reply_it_would_return(messages):
+        model = FakeChatModel(seed=3)
+
+        chunks = list(model.stream(messages))
+        streamed = chunks[0]
+        for chunk in chunks[1:]:
+            streamed += chunk
+
+        reply = model.invoke(messages)
+        assert len(chunks) > 1
+        assert streamed.content == reply.content
+        assert streamed.usage_metadata == reply.usage_metadata
+
+    def it_supports_async_calls(messages):
+        model = FakeChatModel(seed=4)
+
+        assert async_to_sync(model.ainvoke)(messages).content == model.invoke(messages).content
+
+    def it_is_built_by_the_registry_when_selected(settings):
+        settings.AI_BACKEND = "fake"
+        settings.FAKE_AI_SEED = 7
+
+        client = build_client("us.amazon.nova-lite-v1:0")
+
+        assert isinstance(client, FakeChatModel)
+        assert client.model_id == "us.amazon.nova-lite-v1:0"
+        assert client.seed == 7
+
+    def it_reads_the_script_inline_or_from_a_file(settings, tmp_path):
+        script = [{"tool_calls": [{"name": "lookup", "args": {"query": "volcanoes"}}]}]
+        settings.FAKE_AI_SCRIPT = json.dumps(script)
+        assert FakeChatModel.from_settings("fake").script == script
+
+        script_file = tmp_path / "script.json"
+        script_file.write_text(json.dumps(script))
+        settings.FAKE_AI_SCRIPT = str(script_file)
+        assert FakeChatModel.from_settings("fake").script == script
+
+    @pytest.mark.django_db
+    def it_runs_the_chat_agent_offline(load_fixture):
+        user = User.objects.create()
+        chat = Chat.objects.create(user=user, profile=Profile.objects.create(user=user))
+        chat.messages.create(text="Make me a volcano flashcard", role="user")
+        model = FakeChatModel(script=[
+            {"tool_calls": [{"name": "create_flashcard_deck", "args": {
+                "name": "Volcanoes", "flashcards": [{"front": "Magma", "back": "Molten rock"}],
+            }}]},
+            {"content": "I made you a deck."},
+        ])
+
+        assert chat.get_response(ai=model) == "I made you a deck."
+        assert Deck.objects.get(name="Volcanoes").flashcards.count() == 1
+        assert chat.output_tokens == 10 + 5
@@ -234,6 +234,53 @@ class TestFlashcardDetailAPI:
         assert data['front'] == 'Front'
 
 
+@pytest.mark.django_db
+class TestFlashcardBulkCreateAPI:
+    """Tests for /api/decks/{deck_id}/flashcards/bulk/ endpoint"""
+
+    def test_bulk_create_appends_cards_in_order(self, auth_client, test_profile, db):
+        """Bulk-created cards should follow the deck's existing cards"""
+        deck = Deck.objects.create(profile=test_profile, name='Test Deck')
+        Flashcard.objects.create(deck=deck, front='Existing', back='Card', order=0)
+
+        response = auth_client.post(
+            f'/api/decks/{deck.deck_id}/flashcards/bulk/',
+            [{'front': 'A', 'back': '1'}, {'front': 'B', 'back': '2'}],
+            format='json'
+        )
+
+        assert response.status_code == 201
+        assert [card['order'] for card in response.json()] == [1, 2]
+        assert list(deck.flashcards.order_by('order').values_list('front', flat=True)) == ['Existing', 'A', 'B']
+
+    def test_bulk_create_rejects_invalid_cards_without_writing(self, auth_client, test_profile, db):
+        """A single invalid card should reject the whole batch"""
+        deck = Deck.objects.create(profile=test_profile, name='Test Deck')
+
+        response = auth_client.post(
+            f'/api/decks/{deck.deck_id}/flashcards/bulk/',
+            [{'front': 'A', 'back': '1'}, {'front': 'B'}],
+            format='json'
+        )
+
+        assert response.status_code == 400
+        assert deck.flashcards.count() == 0
+
+    def test_bulk_create_requires_deck_owner(self, auth_client, db):
+        """Users should not be able to add cards to another user's deck"""
+        other_user = User.objects.create_user(username='other', password='pass')
+        deck = Deck.objects.create(profile=Profile.objects.create(user=other_user, name='Other'), name='Deck')
+
+        response = auth_client.post(
+            f'/api/decks/{deck.deck_id}/flashcards/bulk/',
+            [{'front': 'A', 'back': '1'}],
+            format='json'
+        )
+
+        assert response.status_code in (403, 404)
+        assert deck.flashcards.count() == 0
+
+
 @pytest.mark.django_db
 class TestAPIErrorResponses:
     """Tests for error response formats"""
@@ -0,0 +1,64 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+from asgiref.sync import async_to_sync
+
+from bots.services.search_cache import normalize_query, web_search_cache
+
+
+def describe_web_search_cache():
+    def it_normalizes_equivalent_queries():
+        assert normalize_query("  What is  Photosynthesis? ") == normalize_query("what is photosynthesis")
+
+    def it_serves_repeated_queries_from_the_cache():
+        search = MagicMock(return_value="- Result")
+
+        first = web_search_cache.get_or_search("What is photosynthesis?", search)
+        second = web_search_cache.get_or_search("what is photosynthesis", search)
+
+        assert first == second == "- Result"
+        search.assert_called_once()
+        assert web_search_cache.stats() == {'hits': 1, 'misses': 1}
+
+    def it_does_not_cache_failed_searches():
+        search = MagicMock(side_effect=[ValueError("boom"), "- Result"])
+
+        try:
+            web_search_cache.get_or_search("query", search)
+        except ValueError:
+            pass
+
+        assert web_search_cache.get_or_search("query", search) == "- Result"
+        assert search.call_count == 2
+
+    def it_collapses_concurrent_identical_queries():
+        release = threading.Event()
+        search = MagicMock(side_effect=lambda query: release.wait(5) and "- Result")
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(web_search_cache.get_or_search("query", search)))
+            for _ in range(3)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.3)  # let the other threads find the first one's lock
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert results == ["- Result"] * 3
+        search.assert_called_once()
+
+    def it_caches_async_searches():
+        calls = []
+
+        async def search(query):
+            calls.append(query)
+            return "- Result"
+
+        async_to_sync(web_search_cache.aget_or_search)("query", search)
+        result = async_to_sync(web_search_cache.aget_or_search)("Query?", search)
+
+        assert result == "- Result"
+        assert calls == ["query"]
@@ -0,0 +1,57 @@
+from unittest.mock import patch
+
+import httpx
+import pytest
+import requests
+from asgiref.sync import async_to_sync
+from requests.adapters import HTTPAdapter
+
+from bots.services.search_client import search_clients
+
+
+def describe_search_clients():
+    @pytest.fixture(autouse=True)
+    def tavily_settings(settings):
+        settings.TAVILY_API_KEY = "test-key"
+        settings.WEB_SEARCH_CONNECT_TIMEOUT = 2
+        settings.WEB_SEARCH_READ_TIMEOUT = 5
+        settings.WEB_SEARCH_RETRIES = 3
+
+    def it_shares_one_pooled_client_per_process():
+        client = search_clients.get()
+
+        assert search_clients.get() is client
+        adapter = client.session.get_adapter("https://api.tavily.com/search")
+        assert adapter.max_retries.total == 3
+        assert client.session.headers["Authorization"] == "Bearer test-key"
+
+    def it_applies_the_configured_timeouts_to_every_request():
+        adapter = search_clients.get().session.get_adapter("https://api.tavily.com/search")
+        request = requests.Request("POST", "https://api.tavily.com/search").prepare()
+
+        with patch.object(HTTPAdapter, "send") as send:
+            adapter.send(request, timeout=60)
+
+        assert send.call_args.kwargs["timeout"] == (2, 5)
+
+    def it_keeps_one_async_client_per_event_loop():
+        async def get_clients():
+            return search_clients.aget(), search_clients.aget()
+
+        first, second = async_to_sync(get_clients)()
+        other_loop, _ = async_to_sync(get_clients)()
+
+        assert first is second
+        assert other_loop is not first
+
+    def it_applies_the_configured_timeouts_to_async_requests():
+        async def search():
+            return await search_clients.aget().search(query="volcanoes")
+
+        async def respond(transport, request):
+            assert request.extensions["timeout"] == {"connect": 2, "read": 5, "write": 5, "pool": 5}
+            assert request.url == "https://api.tavily.com/search"
+            return httpx.Response(200, json={"results": []})
+
+        with patch.object(httpx.AsyncHTTPTransport, "handle_async_request", respond):
+            assert async_to_sync(search)() == {"results": []}
@@ -2,6 +2,7 @@ import json
 
 import pytest
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import override_settings
 from rest_framework.test import APIClient
@@ -143,6 +144,16 @@ class TestRevenueCatWebhookAuth:
         assert user_a.user_account.subscription_level == 2
         assert RevenueCatWebhookEvent.objects.count() == 1
 
+    def test_subscription_change_resets_cached_budget(self, user_a):
+        account = user_a.user_account
+        cache.set(account.remaining_budget_key(), 0)
+        with override_settings(REVENUECAT_WEBHOOK_AUTH_HEADER=self.secret):
+            APIClient().post(
+                self.url, self.payload(user_a),
+                content_type='application/json', HTTP_AUTHORIZATION=self.secret)
+
+        assert cache.get(account.remaining_budget_key()) is None
+
 
 @pytest.mark.django_db
 class TestDeviceNotificationTokenQuery:
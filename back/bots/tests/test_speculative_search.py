@@ -0,0 +1,49 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from bots.services.speculative_search import (
+    SpeculativeSearch,
+    looks_like_search,
+    query_similarity,
+)
+
+
+def describe_looks_like_search():
+    @pytest.mark.parametrize("text", [
+        "Who won the World Cup in 2022?",
+        "what is the capital of Australia",
+        "latest news about the Mars rover",
+    ])
+    def it_accepts_factual_and_current_events_questions(text):
+        assert looks_like_search(text)
+
+    @pytest.mark.parametrize("text", [
+        "thanks!",
+        "Make me flashcards for my spelling words",
+        "Write a story about a dragon " * 10 + "?",
+    ])
+    def it_skips_chatter_and_long_requests(text):
+        assert not looks_like_search(text)
+
+
+def describe_query_similarity():
+    def it_compares_content_words():
+        assert query_similarity("Who won the World Cup in 2022?", "2022 World Cup winner won") == 0.8
+        assert query_similarity("What is the weather today?", "what is it") == 0.0
+
+
+def describe_speculative_search():
+    def it_hands_its_result_to_the_first_similar_query_only():
+        speculation = SpeculativeSearch("Who won the World Cup in 2022?", MagicMock())
+
+        assert not speculation.claim("Eiffel tower height")
+        assert speculation.claim("world cup 2022 won")
+        assert not speculation.claim("world cup 2022 won")
+
+    def it_cancels_an_unclaimed_search():
+        pending = MagicMock()
+
+        SpeculativeSearch("Who won the World Cup in 2022?", pending).cancel()
+
+        pending.cancel.assert_called_once()
@@ -0,0 +1,129 @@
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from bots.models import AiModel, Bot, Chat, Message, Profile
+
+
+@pytest.fixture
+def user(db, load_fixture):
+    return User.objects.create_user(username='parent', email='parent@example.com', password='pass')
+
+
+@pytest.fixture
+def client(user):
+    client = APIClient()
+    refresh = RefreshToken.for_user(user)
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+    return client
+
+
+def _reply(chat, when, input_tokens, output_tokens, ai_model=None):
+    if ai_model is None:
+        ai_model = chat.bot.ai_model if chat.bot else AiModel.objects.get(is_default=True)
+    message = chat.messages.create(
+        role='assistant', text='Hi', user=chat.user, ai_model=ai_model,
+        input_tokens=input_tokens, output_tokens=output_tokens,
+    )
+    Message.objects.filter(pk=message.pk).update(created_at=when)
+
+
+@pytest.mark.django_db
+def describe_usage_api():
+    @pytest.fixture
+    def chats(user):
+        kid = Profile.objects.create(user=user, name='Kid')
+        micro = Bot.objects.create(user=user, name='Micro', ai_model=AiModel.objects.get(model_id='us.amazon.nova-micro-v1:0'))
+        micro_chat = Chat.objects.create(user=user, profile=kid, bot=micro)
+        default_chat = Chat.objects.create(user=user, profile=kid)
+        _reply(micro_chat, datetime(2026, 3, 2, 12, tzinfo=UTC), 100, 10)
+        _reply(micro_chat, datetime(2026, 3, 3, 6, tzinfo=UTC), 200, 20)
+        _reply(default_chat, datetime(2026, 3, 2, 15, tzinfo=UTC), 1000, 100)
+        _reply(default_chat, datetime(2026, 4, 1, 12, tzinfo=UTC), 5, 5)
+        return micro_chat, default_chat
+
+    def it_reports_daily_cost_per_model(client, chats):
+        response = client.get('/api/user/usage', {'from': '2026-03-01', 'to': '2026-03-31'})
+
+        assert response.status_code == 200
+        rows = response.json()['results']
+        assert [(row['period'], row['id'], row['inputTokens'], row['outputTokens']) for row in rows] == [
+            ('2026-03-02', 'us.amazon.nova-2-lite-v1:0', 1000, 100),
+            ('2026-03-02', 'us.amazon.nova-micro-v1:0', 100, 10),
+            ('2026-03-03', 'us.amazon.nova-micro-v1:0', 200, 20),
+        ]
+        assert rows[0]['cost'] == pytest.approx(1000 * 0.00000006 + 100 * 0.00000024)
+        assert rows[1]['cost'] == pytest.approx(100 * 0.000000035 + 10 * 0.00000014)
+
+    def it_groups_weeks_by_profile(client, chats):
+        response = client.get('/api/user/usage', {
+            'from': '2026-03-01', 'to': '2026-03-31', 'granularity': 'week', 'group_by': 'profile',
+        })
+
+        rows = response.json()['results']
+        assert [(row['period'], row['name'], row['inputTokens']) for row in rows] == [('2026-03-02', 'Kid', 1300)]
+        assert rows[0]['cost'] == pytest.approx(
+            300 * 0.000000035 + 30 * 0.00000014 + 1000 * 0.00000006 + 100 * 0.00000024
+        )
+
+    def it_buckets_days_in_the_users_timezone(client, user, chats):
+        user.user_account.timezone = 'Pacific/Honolulu'
+        user.user_account.save()
+
+        response = client.get('/api/user/usage', {'from': '2026-03-01', 'to': '2026-03-31', 'group_by': 'bot'})
+
+        # 06:00 UTC on March 3rd is still March 2nd in Honolulu
+        assert [(row['period'], row['name'], row['inputTokens']) for row in response.json()['results']] == [
+            ('2026-03-02', None, 1000), ('2026-03-02', 'Micro', 300),
+        ]
+
+    def it_only_reports_the_users_own_usage(client, chats):
+        other = User.objects.create_user(username='other', password='pass')
+        _reply(Chat.objects.create(user=other), datetime(2026, 3, 2, 12, tzinfo=UTC), 7, 7)
+
+        response = client.get('/api/user/usage', {'from': '2026-03-01', 'to': '2026-03-31', 'group_by': 'bot'})
+
+        assert sum(row['inputTokens'] for row in response.json()['results']) == 1300
+
+    def it_prices_replies_at_the_model_that_wrote_them(client, user, chats):
+        micro_chat, _ = chats
+        micro_chat.bot.ai_model = None
+        micro_chat.bot.save()
+
+        response = client.get('/api/user/usage', {'from': '2026-03-03', 'to': '2026-03-03'})
+
+        assert [(row['id'], row['inputTokens']) for row in response.json()['results']] == [
+            ('us.amazon.nova-micro-v1:0', 200),
+        ]
+
+    def it_prices_replies_from_a_deleted_model_at_the_default(client, chats):
+        AiModel.objects.filter(model_id='us.amazon.nova-micro-v1:0').delete()
+
+        response = client.get('/api/user/usage', {'from': '2026-03-03', 'to': '2026-03-03'})
+
+        row, = response.json()['results']
+        assert row['id'] == 'us.amazon.nova-2-lite-v1:0'
+        assert row['cost'] == pytest.approx(200 * 0.00000006 + 20 * 0.00000024)
+
+    def it_paginates_long_ranges(client, user):
+        chat = Chat.objects.create(user=user)
+        for day in range(60):
+            _reply(chat, datetime(2026, 1, 1, 12, tzinfo=UTC) + timedelta(days=day), 1, 1)
+
+        response = client.get('/api/user/usage', {'from': '2026-01-01', 'to': '2026-03-31'})
+
+        assert response.json()['count'] == 60
+        assert len(response.json()['results']) == 50
+        assert response.json()['next'] is not None
+
+    @pytest.mark.parametrize('params', [
+        {'granularity': 'month'},
+        {'group_by': 'device'},
+        {'from': 'yesterday'},
+        {'from': '2026-03-10', 'to': '2026-03-01'},
+    ])
+    def it_rejects_invalid_parameters(client, params):
+        assert client.get('/api/user/usage', params).status_code == 400
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.shortcuts import get_object_or_404
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+
+from bots.models import ChatJob
+from bots.serializers import ChatJobSerializer
+
+
+@api_view(['GET'])
+def get_chat_job(request, job_id):
+    job = get_object_or_404(ChatJob.objects.select_related('chat', 'message'), job_id=job_id, chat__user=request.user)
+
+    try:
+        wait = float(request.query_params.get('wait', 0))
+    except ValueError:
+        return Response({'error': 'wait must be a number of seconds'}, status=400)
+
+    job.wait(min(max(wait, 0), settings.CHAT_JOB_MAX_WAIT))
+    return Response(ChatJobSerializer(job).data)
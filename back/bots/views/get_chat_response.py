@@ -1,19 +1,37 @@
+import functools
+import hashlib
 import io
+import json
+import logging
+import re
 import uuid
 
 import boto3
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.http import JsonResponse
-from django.shortcuts import get_object_or_404
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404, get_object_or_404
+from django.urls import reverse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
 from PIL import Image
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, renderer_classes
+from rest_framework.exceptions import APIException, NotAuthenticated
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.request import Request
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
-from bots.models import Bot, Chat, Profile
+from bots.models import Bot, Chat, ChatJob, IdempotencyKey, Profile
+
+logger = logging.getLogger(__name__)
 
 # Allowed image extensions
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
 
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADERS = ('Location', 'Preference-Applied')
+
 # S3 bucket configuration
 S3_BUCKET = settings.AWS_STORAGE_BUCKET_NAME
 S3_CLIENT = boto3.client('s3')
@@ -43,49 +61,246 @@ def compress_and_upload_image(file):
     except Exception as e:
         raise ValueError(f'Unable to upload image: {e!s}')
 
-@api_view(['GET', 'POST'])
-def get_chat_response(request, chat_id):
+class EventStreamRenderer(BaseRenderer):
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return format_event('error', data).encode(self.charset)
+
+def format_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def event_stream(events):
+    try:
+        for event, data in events:
+            yield format_event(event, data)
+    except Exception as e:
+        logger.exception("Chat response stream failed")
+        yield format_event('error', {'error': f'Unable to get response: {e!s}'})
+
+def get_or_create_chat(request, chat_id):
     user_input = request.data.get('message')
     profile_id = request.data.get('profile')
     bot_id = request.data.get('bot')
     user = request.user
 
-    if chat_id == 'new':
-        if profile_id:
-            profile = get_object_or_404(Profile, profile_id=profile_id, user=user)
-        else:
-            profile = None
-        if bot_id:
-            bot = get_object_or_404(Bot, bot_id=bot_id, user=user)
-        else:
-            bot = None
-        chat = Chat.objects.create(title=user_input, profile=profile, bot=bot, user=user)
-        system_prompt = chat.get_system_message()
-        if bot and bot.system_prompt:
-            system_prompt = bot.system_prompt
-        chat.messages.create(text=system_prompt, role='system', order=0)
+    if chat_id != 'new':
+        return get_object_or_404(Chat, chat_id=chat_id, user=user)
 
+    if profile_id:
+        profile = get_object_or_404(Profile, profile_id=profile_id, user=user)
     else:
-        chat = get_object_or_404(Chat, chat_id=chat_id, user=user)
-    
-    # Handle image uploads if present
-    filename = None
-    if request.method == 'POST' and request.FILES:
-        file = request.FILES.get('image')  # Only allow one image
-        if file is None:
-            return JsonResponse({'error': 'No image file provided'}, status=400)
-        if file.size > 20 * 1024 * 1024:
-            return JsonResponse({'error': 'File size exceeds 20MB limit'}, status=400)
-        if not allowed_file(file.name):
-            return JsonResponse({'error': 'Invalid file type'}, status=400)
-        filename = compress_and_upload_image(file)
+        profile = None
+    if bot_id:
+        bot = get_object_or_404(Bot, bot_id=bot_id, user=user)
+    else:
+        bot = None
+    chat = Chat.objects.create(title=user_input, profile=profile, bot=bot, user=user)
+    system_prompt = chat.get_system_message()
+    if bot and bot.system_prompt:
+        system_prompt = bot.system_prompt
+    chat.add_message(text=system_prompt, role='system')
+    return chat
+
+def get_image_upload(request):
+    """Return the uploaded image (if any) and an error response if it is invalid."""
+    if request.method != 'POST' or not request.FILES:
+        return None, None
+    file = request.FILES.get('image')  # Only allow one image
+    if file is None:
+        return None, JsonResponse({'error': 'No image file provided'}, status=400)
+    if file.size > 20 * 1024 * 1024:
+        return None, JsonResponse({'error': 'File size exceeds 20MB limit'}, status=400)
+    if not allowed_file(file.name):
+        return None, JsonResponse({'error': 'Invalid file type'}, status=400)
+    return file, None
 
+def add_user_message(request, chat):
+    """Store the incoming user message (and image), returning it or an error response if the upload is invalid."""
+    file, error = get_image_upload(request)
+    if error:
+        return None, error
+    filename = compress_and_upload_image(file) if file else None
 
     # Save the message with the uploaded image filename
-    chat.messages.create(text=user_input, role='user', order=chat.messages.count(), image_filename=filename)
+    message = chat.add_message(text=request.data.get('message'), role='user', image_filename=filename)
+    return message, None
+
+async def aget_or_create_chat(request, chat_id):
+    user_input = request.data.get('message')
+    profile_id = request.data.get('profile')
+    bot_id = request.data.get('bot')
+    user = request.user
+
+    if chat_id != 'new':
+        return await aget_object_or_404(Chat, chat_id=chat_id, user=user)
+
+    profile = await aget_object_or_404(Profile, profile_id=profile_id, user=user) if profile_id else None
+    bot = await aget_object_or_404(Bot, bot_id=bot_id, user=user) if bot_id else None
+    chat = await Chat.objects.acreate(title=user_input, profile=profile, bot=bot, user=user)
+    system_prompt = bot.system_prompt if bot and bot.system_prompt else chat.get_system_message()
+    await chat.aadd_message(text=system_prompt, role='system')
+    return chat
+
+async def aadd_user_message(request, chat):
+    file, error = get_image_upload(request)
+    if error:
+        return None, error
+    filename = None
+    if file:
+        filename = await sync_to_async(compress_and_upload_image, thread_sensitive=False)(file)
+
+    message = await chat.aadd_message(text=request.data.get('message'), role='user', image_filename=filename)
+    return message, None
 
-    response = chat.get_response()
+def authenticate_request(request):
+    """Authenticate and parse a plain Django request the way DRF views do."""
+    drf_request = Request(
+        request,
+        parsers=[parser() for parser in api_settings.DEFAULT_PARSER_CLASSES],
+        authenticators=[authenticator() for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+    )
+    if not drf_request.user.is_authenticated:
+        raise NotAuthenticated()
+    drf_request.data  # parse the body while still in a sync context
+    return drf_request
+
+def prefers_async(request):
+    return 'respond-async' in request.headers.get('Prefer', '')
+
+def requested_time_budget(request):
+    """Seconds the client is prepared to wait, from a ``Prefer: wait=<seconds>`` header (RFC 7240).
+
+    This only shortens the server's budget; see ``Chat.time_budget``.
+    """
+    match = re.search(r'\bwait=(\d+)', request.headers.get('Prefer', ''))
+    return int(match.group(1)) if match else None
+
+def enqueue_response(chat, message):
+    job = ChatJob.enqueue(chat, message)
+    return Response({
+        'job_id': job.job_id,
+        'message_id': message.message_id,
+        'chat_id': chat.chat_id,
+        'status': job.status,
+    }, status=202, headers={
+        'Location': reverse('get_chat_job', kwargs={'job_id': job.job_id}),
+        'Preference-Applied': 'respond-async',
+    })
+
+def request_fingerprint(request, chat_id):
+    """Hash the parts of a chat post that decide its outcome, to detect a key reused for another request."""
+    file = request.FILES.get('image') if request.FILES else None
+    payload = {
+        'chat_id': chat_id,
+        'message': request.data.get('message'),
+        'profile': request.data.get('profile'),
+        'bot': request.data.get('bot'),
+        'image': [file.name, file.size] if file else None,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+def replay_response(record):
+    headers = {**record.response_headers, 'Idempotent-Replayed': 'true'}
+    return Response(record.response_body, status=record.response_status, headers=headers)
+
+def idempotent(view):
+    """Run a POST sent with an Idempotency-Key header once, replaying its response to retries.
+
+    A retry that arrives while the original is still running waits for it
+    (up to IDEMPOTENCY_MAX_WAIT seconds) instead of adding another message.
+    The view receives the key's record, so a retry after a failure can reuse
+    the user message the original stored.
+    """
+    @functools.wraps(view)
+    def wrapper(request, chat_id):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if request.method != 'POST' or not key:
+            return view(request, chat_id)
+        if len(key) > 255:
+            return Response({'error': f'{IDEMPOTENCY_HEADER} must be at most 255 characters'}, status=400)
+
+        request_hash = request_fingerprint(request, chat_id)
+        record, created = IdempotencyKey.begin(request.user, key, request_hash)
+        if not created:
+            if record.request_hash != request_hash:
+                return Response({'error': f'{IDEMPOTENCY_HEADER} was already used for a different request'}, status=422)
+            record = record.wait(settings.IDEMPOTENCY_MAX_WAIT)
+            if record is None or record.failed:
+                return wrapper(request, chat_id)  # the original failed; run this retry instead
+            if not record.finished:
+                return Response({'error': 'The original request is still in progress'}, status=409,
+                                headers={'Retry-After': '1'})
+            return replay_response(record)
+
+        try:
+            response = view(request, chat_id, idempotency_key=record)
+        except Exception:
+            record.fail()
+            raise
+        if response.status_code >= 500:
+            record.fail()
+        else:
+            body = response.data if hasattr(response, 'data') else json.loads(response.content)
+            headers = {name: response[name] for name in REPLAYED_HEADERS if response.has_header(name)}
+            record.complete(response.status_code, body, headers)
+        return response
+    return wrapper
+
+@api_view(['GET', 'POST'])
+@idempotent
+def get_chat_response(request, chat_id, idempotency_key=None):
+    if idempotency_key and idempotency_key.message:
+        message = idempotency_key.message  # stored by an earlier attempt that then failed
+        chat = message.chat
+    else:
+        chat = get_or_create_chat(request, chat_id)
+        message, error = add_user_message(request, chat)
+        if error:
+            return error
+        if idempotency_key:
+            idempotency_key.attach(message)
+
+    if prefers_async(request):
+        return enqueue_response(chat, message)
+
+    response = chat.get_response(time_budget=requested_time_budget(request), reply_to=message)
     return Response({'response': response, 'chat_id': chat.chat_id})
 
+@api_view(['POST'])
+@renderer_classes([EventStreamRenderer, JSONRenderer])
+def stream_chat_response(request, chat_id):
+    chat = get_or_create_chat(request, chat_id)
+    _message, error = add_user_message(request, chat)
+    if error:
+        return error
+
+    response = StreamingHttpResponse(event_stream(chat.stream_response(time_budget=requested_time_budget(request))), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+@csrf_exempt
+@require_http_methods(['GET', 'POST'])
+async def aget_chat_response(request, chat_id):
+    """Async variant of ``get_chat_response`` that keeps no worker thread busy while the model responds."""
+    try:
+        drf_request = await sync_to_async(authenticate_request)(request)
+    except APIException as e:
+        return JsonResponse({'detail': str(e.detail)}, status=e.status_code)
+
+    try:
+        chat = await aget_or_create_chat(drf_request, chat_id)
+    except Http404:
+        return JsonResponse({'detail': 'Not found.'}, status=404)
+    _message, error = await aadd_user_message(drf_request, chat)
+    if error:
+        return error
+
+    response = await chat.aget_response(time_budget=requested_time_budget(request))
+    return JsonResponse({'response': response, 'chat_id': chat.chat_id})
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -56,5 +56,6 @@ def revenuecat_webhook(request):
     
     user.user_account.subscription_level = subscription_level
     user.user_account.save()
+    user.user_account.invalidate_remaining_budget()
     
     return Response({'status': 'success'})
@@ -0,0 +1,45 @@
+from datetime import date, timedelta
+
+from rest_framework.decorators import api_view
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+
+GRANULARITIES = ('day', 'week')
+GROUPS = ('profile', 'bot', 'model')
+DEFAULT_RANGE_DAYS = 30
+
+
+@api_view(['GET'])
+def usage_view(request):
+    account = request.user.user_account
+    params = request.query_params
+    granularity = params.get('granularity', 'day')
+    group_by = params.get('group_by', 'model')
+
+    if granularity not in GRANULARITIES:
+        return Response({'error': f'granularity must be one of: {", ".join(GRANULARITIES)}'}, status=400)
+    if group_by not in GROUPS:
+        return Response({'error': f'group_by must be one of: {", ".join(GROUPS)}'}, status=400)
+    try:
+        end = date.fromisoformat(params['to']) if params.get('to') else account.today()
+        start = date.fromisoformat(params['from']) if params.get('from') else end - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    except ValueError:
+        return Response({'error': 'from and to must be dates (YYYY-MM-DD)'}, status=400)
+    if start > end:
+        return Response({'error': 'from must not be after to'}, status=400)
+
+    paginator = PageNumberPagination()
+    page = paginator.paginate_queryset(account.usage_report(start, end, granularity, group_by), request)
+    return paginator.get_paginated_response([
+        {
+            'period': row['period'],
+            'id': row['group_id'],
+            'name': row['group_name'],
+            'inputTokens': row['total_input_tokens'],
+            'outputTokens': row['total_output_tokens'],
+            'cacheReadTokens': row['total_cache_read_tokens'],
+            'cacheWriteTokens': row['total_cache_write_tokens'],
+            'cost': row['cost'],
+        }
+        for row in page
+    ])
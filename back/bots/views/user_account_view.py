@@ -12,8 +12,11 @@ def user_account_view(request):
     if request.method == "GET":
         timezone = request.query_params.get('timezone')
         if timezone and timezone != user.user_account.timezone:
+            # Cached budgets are keyed by the local day, so drop both the old and the new one
+            user.user_account.invalidate_remaining_budget()
             user.user_account.timezone = timezone
             user.user_account.save()
+            user.user_account.invalidate_remaining_budget()
 
         accountInfo = {
                 'userId': user.id,
@@ -1,13 +1,19 @@
 import uuid
 
+from django.db import transaction
 from django.db.models import Count, Max
-from rest_framework import viewsets
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
 
 from bots.models import Deck, Flashcard, Profile
 from bots.permissions import IsOwner
 from bots.serializers import DeckListSerializer, DeckSerializer, FlashcardSerializer
 from bots.viewsets.mixins import get_object_by_uuid_or_id
 
+MAX_BULK_FLASHCARDS = 500
+
 
 class FlashcardViewSet(viewsets.ModelViewSet):
     permission_classes = [IsOwner]
@@ -47,6 +53,24 @@ class FlashcardViewSet(viewsets.ModelViewSet):
         max_order = Flashcard.objects.filter(deck=deck).aggregate(Max('order'))['order__max'] or -1
         serializer.save(deck=deck, order=max_order + 1)
 
+    @action(detail=False, methods=['post'])
+    def bulk(self, request, deck_pk=None):
+        """Append a list of flashcards to the deck with a single insert."""
+        deck = get_object_by_uuid_or_id(Deck.objects.all(), 'deck_id', deck_pk)
+
+        self.check_object_permissions(request, deck)
+
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        if len(serializer.validated_data) > MAX_BULK_FLASHCARDS:
+            raise ValidationError(f"At most {MAX_BULK_FLASHCARDS} flashcards can be added at once")
+
+        with transaction.atomic():
+            flashcards = deck.add_cards([
+                {'front': card['front'], 'back': card['back']} for card in serializer.validated_data
+            ])
+        return Response(self.get_serializer(flashcards, many=True).data, status=status.HTTP_201_CREATED)
+
 
 class DeckViewSet(viewsets.ModelViewSet):
     permission_classes = [IsOwner]
@@ -126,6 +126,44 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Point CACHE_URL at a shared backend (e.g. redis://) so every worker sees the same entries.
+
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+    # web_search results. Local memory evicts least recently used entries past
+    # MAX_ENTRIES; a shared redis cache should use an allkeys-lru maxmemory-policy.
+    'web_search': env.cache('WEB_SEARCH_CACHE_URL', default='locmemcache://web-search'),
+}
+CACHES['web_search'].setdefault('OPTIONS', {})['MAX_ENTRIES'] = env.int('WEB_SEARCH_CACHE_MAX_ENTRIES', default=5000)
+
+# Signals drop the AiModel catalog in the process that saved the change; the TTL
+# bounds how long other workers can serve a stale copy from a per-process cache.
+AI_MODEL_CATALOG_TTL = env.int('AI_MODEL_CATALOG_TTL', default=300)
+
+# 'bedrock' talks to AWS; 'fake' swaps in bots.services.fake_chat_model.FakeChatModel
+# for offline load tests and benchmarks. Replies are seeded, so runs are reproducible.
+AI_BACKEND = env('AI_BACKEND', default='bedrock')
+FAKE_AI_SEED = env.int('FAKE_AI_SEED', default=0)
+FAKE_AI_LATENCY_MS = env.float('FAKE_AI_LATENCY_MS', default=0)
+FAKE_AI_LATENCY_JITTER_MS = env.float('FAKE_AI_LATENCY_JITTER_MS', default=0)
+FAKE_AI_TOKEN_INTERVAL_MS = env.float('FAKE_AI_TOKEN_INTERVAL_MS', default=0)
+FAKE_AI_OUTPUT_TOKENS = env.int('FAKE_AI_OUTPUT_TOKENS', default=60)
+FAKE_AI_OUTPUT_TOKENS_JITTER = env.int('FAKE_AI_OUTPUT_TOKENS_JITTER', default=20)
+# Scripted steps per turn: a JSON list, or the path of a file holding one,
+# e.g. [{"tool_calls": [{"name": "web_search", "args": {"query": "..."}}]}]
+FAKE_AI_SCRIPT = env('FAKE_AI_SCRIPT', default='')
+
+# Users' remaining daily budgets are cached and decremented as replies are saved. With a
+# per-process cache each worker only sees its own replies, so the TTL bounds the drift.
+USAGE_BUDGET_CACHE_TTL = env.int('USAGE_BUDGET_CACHE_TTL', default=300)
+
+# Per-process LRU of recent conversation windows (including base64 image payloads)
+CHAT_CONTEXT_CACHE_MAX_CHATS = env.int('CHAT_CONTEXT_CACHE_MAX_CHATS', default=500)
+CHAT_CONTEXT_CACHE_MAX_BYTES = env.int('CHAT_CONTEXT_CACHE_MAX_BYTES', default=64 * 1024 * 1024)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -250,6 +288,41 @@ AWS_STORAGE_BUCKET_NAME = env('AWS_STORAGE_BUCKET_NAME', default='test-bucket')
 
 TAVILY_API_KEY = env('TAVILY_API_KEY', default='')
 
+WEB_SEARCH_CACHE_TTL = env.int('WEB_SEARCH_CACHE_TTL', default=15 * 60)
+# How long identical concurrent searches wait on the first one before searching themselves
+WEB_SEARCH_CACHE_LOCK_TIMEOUT = env.int('WEB_SEARCH_CACHE_LOCK_TIMEOUT', default=10)
+# Shared Tavily connection pools: seconds to connect and to wait for a response, and how
+# many times a failed connection or a 5xx response is retried (with backoff)
+WEB_SEARCH_CONNECT_TIMEOUT = env.float('WEB_SEARCH_CONNECT_TIMEOUT', default=3.05)
+WEB_SEARCH_READ_TIMEOUT = env.float('WEB_SEARCH_READ_TIMEOUT', default=10)
+WEB_SEARCH_RETRIES = env.int('WEB_SEARCH_RETRIES', default=2)
+# Bots with speculative_web_search answer the model's first web_search from a search started
+# on the user's message when the two queries share at least this share of their words
+SPECULATIVE_SEARCH_SIMILARITY = env.float('SPECULATIVE_SEARCH_SIMILARITY', default=0.5)
+
+# Wall-clock budget (seconds) for an assistant reply, unless the bot or request sets one; 0 disables it.
+# Once less than the reserve is left, the agent stops calling tools and asks the model for a final answer.
+AGENT_TIME_BUDGET = env.int('AGENT_TIME_BUDGET', default=25)
+AGENT_FINAL_ANSWER_RESERVE = env.int('AGENT_FINAL_ANSWER_RESERVE', default=6)
+
+# Threads shared by all requests for running a model turn's web searches concurrently
+AGENT_TOOL_CONCURRENCY = env.int('AGENT_TOOL_CONCURRENCY', default=8)
+
+# Threads for work that runs after a reply has been sent, such as folding old messages into a chat's summary
+BACKGROUND_TASK_CONCURRENCY = env.int('BACKGROUND_TASK_CONCURRENCY', default=4)
+
+# Background assistant replies (Prefer: respond-async), processed by `manage.py process_chat_jobs`
+CHAT_JOB_CONCURRENCY = env.int('CHAT_JOB_CONCURRENCY', default=4)
+CHAT_JOB_LOCK_TIMEOUT = env.int('CHAT_JOB_LOCK_TIMEOUT', default=300)
+CHAT_JOB_MAX_ATTEMPTS = env.int('CHAT_JOB_MAX_ATTEMPTS', default=3)
+CHAT_JOB_MAX_WAIT = env.int('CHAT_JOB_MAX_WAIT', default=25)
+
+# Idempotency-Key handling for chat posts: how long responses are replayed,
+# how long a retry waits on the original, and when an unfinished key is abandoned
+IDEMPOTENCY_KEY_TTL = env.int('IDEMPOTENCY_KEY_TTL', default=24 * 60 * 60)
+IDEMPOTENCY_MAX_WAIT = env.int('IDEMPOTENCY_MAX_WAIT', default=60)
+IDEMPOTENCY_LOCK_TIMEOUT = env.int('IDEMPOTENCY_LOCK_TIMEOUT', default=300)
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Bots API',
     'DESCRIPTION': 'API for the Bots application',
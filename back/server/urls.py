@@ -26,10 +26,16 @@ from rest_framework_simplejwt.views import (
 )
 
 from bots.views.auto_login import auto_apple_login, auto_google_login
-from bots.views.get_chat_response import get_chat_response
+from bots.views.chat_job_view import get_chat_job
+from bots.views.get_chat_response import (
+    aget_chat_response,
+    get_chat_response,
+    stream_chat_response,
+)
 from bots.views.get_jwt import get_jwt, start_web_login
 from bots.views.revenuecat_webhook import revenuecat_webhook
 from bots.views.support import support_view
+from bots.views.usage_view import usage_view
 from bots.views.user_account_view import DeleteUserAccountView, user_account_view
 from bots.viewsets.ai_model_viewset import AiModelViewSet
 from bots.viewsets.bot_viewset import BotViewSet
@@ -71,6 +77,9 @@ urlpatterns = [
         path('schema', SpectacularAPIView.as_view(), name='schema'),
         path('docs', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
         path('chats/<str:chat_id>', get_chat_response, name='get_chat_response'),
+        path('chats/<str:chat_id>/stream', stream_chat_response, name='stream_chat_response'),
+        path('chats/<str:chat_id>/async', aget_chat_response, name='aget_chat_response'),
+        path('jobs/<uuid:job_id>', get_chat_job, name='get_chat_job'),
         path('login', get_jwt, name='get_jwt'),
         path('login/web', start_web_login, name='start_web_login'),
         path('accounts/', include('allauth.urls')),
@@ -78,6 +87,7 @@ urlpatterns = [
         path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
         path('user', user_account_view, name='user_account'),
         path('user/delete', DeleteUserAccountView.as_view(), name='delete_user_account'),
+        path('user/usage', usage_view, name='user_usage'),
         path('accounts/google/auto-login/', auto_google_login, name='google-auto-login'),
         path('accounts/apple/auto-login/', auto_apple_login, name='apple-auto-login'),
         path('revenuecat/webhook', revenuecat_webhook, name='revenuecat-webhook')